@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Xác thực phiên đăng nhập dùng chung cho dashboard tổng và các dashboard con
+Mật khẩu chỉ được kiểm tra (PBKDF2) lúc đăng nhập; các lần rerun sau chỉ kiểm tra token phiên đã ký
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import secrets
+import time
+from datetime import datetime
+
+import streamlit as st
+
+
+PBKDF2_ALGORITHM = "pbkdf2_sha256"
+PBKDF2_ITERATIONS = 240000
+SESSION_TTL_SECONDS = 8 * 60 * 60  # Phiên hết hạn sau 8 giờ
+SESSION_TOKEN_KEY = "auth_token"
+
+# Thông tin xác thực: tài khoản -> "pbkdf2_sha256$<iterations>$<salt hex>$<hash hex>"
+# Có thể ghi đè bằng mục [auth_credentials] trong secrets.toml
+CREDENTIAL_HASHES = {
+    "phonghc.umc": "pbkdf2_sha256$240000$540828f75cae874f204a3c1962c319d9$14d4af3d102e5c15493ba42b4458926b2d3f2c0ce45442a78ba3da6fc35db39e",
+}
+
+
+def hash_password(password, salt=None, iterations=PBKDF2_ITERATIONS):
+    """Hash a password with PBKDF2-SHA256 and return the encoded string"""
+    salt = salt or secrets.token_hex(16)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), bytes.fromhex(salt), iterations)
+    return f"{PBKDF2_ALGORITHM}${iterations}${salt}${digest.hex()}"
+
+
+def verify_password(password, encoded):
+    """Check a password against an encoded PBKDF2 hash (constant-time compare)"""
+    try:
+        algorithm, iterations, salt, expected = encoded.split("$")
+    except (AttributeError, ValueError):
+        return False
+    if algorithm != PBKDF2_ALGORITHM:
+        return False
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), bytes.fromhex(salt), int(iterations))
+    return hmac.compare_digest(digest.hex(), expected)
+
+
+def _get_credentials():
+    """Lấy bảng tài khoản từ secrets (nếu có), mặc định CREDENTIAL_HASHES"""
+    try:
+        if "auth_credentials" in st.secrets:
+            return dict(st.secrets["auth_credentials"])
+    except Exception:
+        pass
+    return CREDENTIAL_HASHES
+
+
+@st.cache_resource(show_spinner=False)
+def _get_signing_key():
+    """Return the HMAC key for session tokens (secrets.toml or a per-process random key)"""
+    try:
+        if "auth_secret" in st.secrets:
+            return str(st.secrets["auth_secret"]).encode()
+    except Exception:
+        pass
+    return secrets.token_bytes(32)
+
+
+def _sign(payload):
+    return hmac.new(_get_signing_key(), payload, hashlib.sha256).hexdigest()
+
+
+def _issue_token(username):
+    """Create a signed token: base64(json payload) + '.' + HMAC signature"""
+    now = int(time.time())
+    payload = json.dumps({"u": username, "iat": now, "exp": now + SESSION_TTL_SECONDS}, separators=(",", ":"))
+    encoded = base64.urlsafe_b64encode(payload.encode()).decode()
+    return f"{encoded}.{_sign(encoded.encode())}"
+
+
+def _read_token(token):
+    """Return the token payload if the signature is valid and not expired, else None"""
+    try:
+        encoded, signature = token.split(".")
+    except (AttributeError, ValueError):
+        return None
+    if not hmac.compare_digest(_sign(encoded.encode()), signature):
+        return None
+    payload = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+    if payload.get("exp", 0) < time.time():
+        return None
+    return payload
+
+
+def login(username, password):
+    """Kiểm tra tài khoản (KDF chậm, chỉ chạy khi đăng nhập) và tạo phiên mới"""
+    encoded = _get_credentials().get(username)
+    if encoded is None or not verify_password(password, encoded):
+        return False
+
+    st.session_state[SESSION_TOKEN_KEY] = _issue_token(username)
+    st.session_state.authenticated = True
+    st.session_state.username = username
+    st.session_state.login_time = datetime.now()
+    return True
+
+
+def is_authenticated():
+    """Kiểm tra phiên hiện tại - chỉ xác minh chữ ký và hạn của token (O(1))"""
+    token = st.session_state.get(SESSION_TOKEN_KEY)
+    payload = _read_token(token) if token else None
+
+    if payload is None or payload.get("u") != st.session_state.get("username"):
+        if token:
+            # Token hết hạn/không hợp lệ -> xóa phiên
+            logout()
+        st.session_state.authenticated = False
+        st.session_state.setdefault("username", "")
+        return False
+
+    st.session_state.authenticated = True
+    return True
+
+
+def logout(extra_keys=()):
+    """Xóa phiên đăng nhập (và các key phụ nếu có)"""
+    for key in (SESSION_TOKEN_KEY, 'authenticated', 'username', 'login_time') + tuple(extra_keys):
+        if key in st.session_state:
+            del st.session_state[key]
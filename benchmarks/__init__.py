@@ -0,0 +1 @@
+"""Benchmark các hàm xử lý dữ liệu của dashboard trên dữ liệu giả lập (xem benchmarks/run.py)"""
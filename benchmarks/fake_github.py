@@ -0,0 +1,458 @@
+"""
+Server GitHub REST API giả lập (localhost) cho benchmark và kiểm thử offline
+
+Hỗ trợ phần API mà repo đang dùng:
+- GET  /user, /repos/{owner}/{repo}, /repos/{owner}/{repo}/commits/{ref}
+- GET/PUT/DELETE /repos/{owner}/{repo}/contents/{path}  (Accept raw, giới hạn 1 MB như GitHub)
+- Git Data API: git/ref(s)/heads/{branch}, git/commits, git/trees, git/blobs
+- GET /raw/{owner}/{repo}/{branch}/{path}  (download_url)
+
+Mô phỏng độ trễ, header X-RateLimit-* và lỗi 403 khi hết quota.
+
+    with FakeGitHub(latency=0.05, rate_limit=5000) as fake:
+        fake.add_repo("owner", "repo", {"data.json": b"{}"})
+        os.environ["GITHUB_API_BASE"] = fake.base_url
+"""
+
+import base64
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+
+# Contents API chỉ trả nội dung file <= 1 MB; file lớn hơn: content rỗng, encoding "none"
+CONTENTS_MAX_BYTES = 1024 * 1024
+RAW_ACCEPT = "application/vnd.github.v3.raw"
+
+
+def git_sha(kind, data):
+    """Git object id: sha1("<kind> <len>\\0<data>"), giống SHA thật của GitHub cho blob"""
+    return hashlib.sha1(f"{kind} {len(data)}\0".encode() + data).hexdigest()
+
+
+class FakeRepo:
+    """Kho object git trong bộ nhớ (blob, tree, commit) + các branch"""
+
+    def __init__(self, owner, repo, branch="main"):
+        self.owner = owner
+        self.repo = repo
+        self.default_branch = branch
+        self.blobs = {}
+        self.trees = {}
+        self.commits = {}
+        self.refs = {}
+        root = self.write_tree({})
+        self.refs[branch] = self.write_commit("Initial commit", root, [])
+
+    # ----- object store -----
+    def write_blob(self, data):
+        sha = git_sha("blob", data)
+        self.blobs[sha] = data
+        return sha
+
+    def write_tree(self, entries):
+        """entries: tên -> {"type", "sha", "mode"}"""
+        body = json.dumps(sorted((name, e["type"], e["sha"]) for name, e in entries.items())).encode()
+        sha = git_sha("tree", body)
+        self.trees[sha] = dict(entries)
+        return sha
+
+    def write_commit(self, message, tree_sha, parents):
+        body = json.dumps([message, tree_sha, parents, time.time()]).encode()
+        sha = git_sha("commit", body)
+        self.commits[sha] = {"message": message, "tree": tree_sha, "parents": list(parents)}
+        return sha
+
+    # ----- path helpers -----
+    def flatten(self, tree_sha, prefix=""):
+        """Đường dẫn đầy đủ -> blob SHA của toàn bộ tree (đệ quy)"""
+        files = {}
+        for name, entry in self.trees[tree_sha].items():
+            path = f"{prefix}{name}"
+            if entry["type"] == "tree":
+                files.update(self.flatten(entry["sha"], f"{path}/"))
+            else:
+                files[path] = entry["sha"]
+        return files
+
+    def build_tree(self, files):
+        """Dựng lại cây thư mục lồng nhau từ dict đường dẫn -> blob SHA; trả về SHA tree gốc"""
+        children = {}
+        entries = {}
+        for path, sha in files.items():
+            head, _, rest = path.partition("/")
+            if rest:
+                children.setdefault(head, {})[rest] = sha
+            else:
+                entries[head] = {"type": "blob", "sha": sha, "mode": "100644"}
+        for name, sub_files in children.items():
+            entries[name] = {"type": "tree", "sha": self.build_tree(sub_files), "mode": "040000"}
+        return self.write_tree(entries)
+
+    def head_tree(self, branch):
+        return self.commits[self.refs[branch]]["tree"]
+
+    def resolve(self, branch, path):
+        """Trả về ("blob"|"tree", sha) của path trên branch, hoặc None"""
+        sha, kind = self.head_tree(branch), "tree"
+        for part in [p for p in path.strip("/").split("/") if p]:
+            if kind != "tree" or part not in self.trees[sha]:
+                return None
+            entry = self.trees[sha][part]
+            kind, sha = entry["type"], entry["sha"]
+        return kind, sha
+
+    def commit_paths(self, branch, changes, message):
+        """Ghi/xóa các path (None = xóa) thành một commit trên branch"""
+        files = self.flatten(self.head_tree(branch))
+        for path, blob_sha in changes.items():
+            if blob_sha is None:
+                files.pop(path, None)
+            else:
+                files[path] = blob_sha
+        commit_sha = self.write_commit(message, self.build_tree(files), [self.refs[branch]])
+        self.refs[branch] = commit_sha
+        return commit_sha
+
+
+class FakeGitHub:
+    """
+    Server HTTP giả lập GitHub chạy trong thread nền
+
+    Args:
+        latency: Độ trễ cố định mỗi request (giây)
+        jitter: Độ trễ ngẫu nhiên thêm vào, trong [0, jitter] (seed cố định)
+        rate_limit: Số request tối đa mỗi cửa sổ; None = không giới hạn
+        rate_window: Độ dài cửa sổ rate limit (giây)
+        contents_max_bytes: Giới hạn nội dung contents API (mặc định 1 MB)
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, rate_limit=5000, rate_window=3600,
+                 contents_max_bytes=CONTENTS_MAX_BYTES, host="127.0.0.1", port=0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.contents_max_bytes = contents_max_bytes
+        self.repos = {}
+        self.lock = threading.RLock()
+        self.request_counts = Counter()
+        self._rng = random.Random(seed)
+        self._rate_used = 0
+        self._rate_reset = time.time() + rate_window
+
+        self.server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self.server.daemon_threads = True
+        self.base_url = f"http://{host}:{self.server.server_address[1]}"
+        self._thread = None
+
+    # ----- lifecycle -----
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # ----- setup -----
+    def add_repo(self, owner, repo, files=None, branch="main"):
+        """Tạo repo (files: đường dẫn -> str/bytes) và trả về FakeRepo"""
+        with self.lock:
+            fake_repo = FakeRepo(owner, repo, branch)
+            self.repos[(owner, repo)] = fake_repo
+            if files:
+                changes = {
+                    path: fake_repo.write_blob(content.encode("utf-8") if isinstance(content, str) else content)
+                    for path, content in files.items()
+                }
+                fake_repo.commit_paths(branch, changes, "Seed data")
+            return fake_repo
+
+    def reset_counts(self):
+        with self.lock:
+            self.request_counts.clear()
+            self._rate_used = 0
+
+    # ----- request plumbing -----
+    def _delay(self):
+        with self.lock:
+            delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            time.sleep(delay)
+
+    def _consume_rate(self):
+        """Trả về (còn quota hay không, header X-RateLimit-*)"""
+        with self.lock:
+            now = time.time()
+            if now >= self._rate_reset:
+                self._rate_used = 0
+                self._rate_reset = now + self.rate_window
+            if self.rate_limit is None:
+                return True, {}
+            allowed = self._rate_used < self.rate_limit
+            if allowed:
+                self._rate_used += 1
+            headers = {
+                "X-RateLimit-Limit": str(self.rate_limit),
+                "X-RateLimit-Remaining": str(self.rate_limit - self._rate_used),
+                "X-RateLimit-Used": str(self._rate_used),
+                "X-RateLimit-Reset": str(int(self._rate_reset)),
+                "X-RateLimit-Resource": "core",
+            }
+            return allowed, headers
+
+
+def _make_handler(fake):
+    """Tạo lớp request handler gắn với một FakeGitHub"""
+
+    repo_route = re.compile(r"^/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)(?P<rest>/.*)?$")
+    raw_route = re.compile(r"^/raw/(?P<owner>[^/]+)/(?P<repo>[^/]+)/(?P<branch>[^/]+)/(?P<path>.+)$")
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        # ----- responses -----
+        def _send(self, status, body=b"", content_type="application/json", headers=None):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _json(self, status, payload, headers=None):
+            self._send(status, json.dumps(payload).encode("utf-8"), headers=headers)
+
+        def _error(self, status, message, headers=None):
+            self._json(status, {"message": message, "documentation_url": "https://docs.github.com/rest"}, headers)
+
+        def _body(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(length) or b"{}") if length else {}
+
+        # ----- dispatch -----
+        def _handle(self, method):
+            fake._delay()
+            parsed = urlparse(self.path)
+            path = unquote(parsed.path)
+            query = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+
+            allowed, rate_headers = fake._consume_rate()
+            if not allowed:
+                return self._error(403, "API rate limit exceeded", rate_headers)
+
+            with fake.lock:
+                try:
+                    status, payload, extra = self._route(method, path, query)
+                except KeyError:
+                    # Repo/branch/object không tồn tại
+                    status, payload, extra = 404, {"message": "Not Found"}, {}
+                fake.request_counts[f"{method} {extra.get('route', path)}"] += 1
+
+            if isinstance(payload, bytes):
+                return self._send(status, payload, "application/octet-stream", rate_headers)
+            return self._json(status, payload, rate_headers)
+
+        def _route(self, method, path, query):
+            if path == "/user" and method == "GET":
+                return 200, {"login": "fake-user"}, {"route": "/user"}
+
+            match = raw_route.match(path)
+            if match and method == "GET":
+                repo = fake.repos[(match["owner"], match["repo"])]
+                kind, sha = repo.resolve(match["branch"], match["path"]) or (None, None)
+                if kind != "blob":
+                    return 404, {"message": "Not Found"}, {"route": "/raw"}
+                return 200, repo.blobs[sha], {"route": "/raw"}
+
+            match = repo_route.match(path)
+            if not match:
+                return 404, {"message": "Not Found"}, {}
+            repo = fake.repos[(match["owner"], match["repo"])]
+            rest = (match["rest"] or "").rstrip("/")
+
+            if rest == "" and method == "GET":
+                return 200, {
+                    "name": repo.repo, "full_name": f"{repo.owner}/{repo.repo}",
+                    "private": True, "default_branch": repo.default_branch,
+                }, {"route": "/repos/{repo}"}
+            if rest == "/contents" or rest.startswith("/contents/"):
+                return self._contents(method, repo, rest[len("/contents/"):], query)
+            if rest.startswith("/commits/") and method == "GET":
+                return self._commit_info(repo, rest[len("/commits/"):])
+            if rest.startswith("/git/"):
+                return self._git(method, repo, rest[len("/git/"):])
+            return 404, {"message": "Not Found"}, {}
+
+        # ----- contents API -----
+        def _content_entry(self, repo, branch, path, kind, sha):
+            name = path.rsplit("/", 1)[-1]
+            return {
+                "name": name, "path": path, "sha": sha,
+                "type": "file" if kind == "blob" else "dir",
+                "size": len(repo.blobs[sha]) if kind == "blob" else 0,
+                "url": f"{fake.base_url}/repos/{repo.owner}/{repo.repo}/contents/{path}",
+                "download_url": f"{fake.base_url}/raw/{repo.owner}/{repo.repo}/{branch}/{path}"
+                if kind == "blob" else None,
+            }
+
+        def _contents(self, method, repo, path, query):
+            route = {"route": "/contents"}
+            branch = query.get("ref") or repo.default_branch
+
+            if method == "GET":
+                found = repo.resolve(branch, path)
+                if found is None:
+                    return 404, {"message": "Not Found"}, route
+                kind, sha = found
+                if kind == "tree":
+                    listing = [
+                        self._content_entry(repo, branch, f"{path}/{name}".strip("/"), entry["type"], entry["sha"])
+                        for name, entry in sorted(repo.trees[sha].items())
+                    ]
+                    return 200, listing, route
+                data = repo.blobs[sha]
+                if RAW_ACCEPT in (self.headers.get("Accept") or ""):
+                    return 200, data, route
+                entry = self._content_entry(repo, branch, path, kind, sha)
+                if len(data) > fake.contents_max_bytes:
+                    entry.update(content="", encoding="none")
+                else:
+                    entry.update(content=base64.encodebytes(data).decode(), encoding="base64")
+                return 200, entry, route
+
+            body = self._body()
+            branch = body.get("branch") or branch
+            current = repo.resolve(branch, path)
+            current_sha = current[1] if current and current[0] == "blob" else None
+
+            if method == "PUT":
+                if current_sha and body.get("sha") != current_sha:
+                    return 409, {"message": f"{path} does not match {body.get('sha')}"}, route
+                blob_sha = repo.write_blob(base64.b64decode(body.get("content", "")))
+                commit_sha = repo.commit_paths(branch, {path: blob_sha}, body.get("message", ""))
+                return (200 if current_sha else 201), {
+                    "content": self._content_entry(repo, branch, path, "blob", blob_sha),
+                    "commit": {"sha": commit_sha},
+                }, route
+
+            if method == "DELETE":
+                if not current_sha:
+                    return 404, {"message": "Not Found"}, route
+                if body.get("sha") != current_sha:
+                    return 409, {"message": f"{path} does not match {body.get('sha')}"}, route
+                commit_sha = repo.commit_paths(branch, {path: None}, body.get("message", ""))
+                return 200, {"content": None, "commit": {"sha": commit_sha}}, route
+
+            return 405, {"message": "Method Not Allowed"}, route
+
+        def _commit_info(self, repo, ref):
+            commit_sha = repo.refs.get(ref, ref)
+            commit = repo.commits[commit_sha]
+            return 200, {
+                "sha": commit_sha,
+                "commit": {"message": commit["message"], "tree": {"sha": commit["tree"]}},
+                "parents": [{"sha": parent} for parent in commit["parents"]],
+            }, {"route": "/commits/{ref}"}
+
+        # ----- Git Data API -----
+        def _git(self, method, repo, rest):
+            kind, _, ident = rest.partition("/")
+            route = {"route": f"/git/{kind}"}
+
+            if kind in ("ref", "refs") and ident.startswith("heads/"):
+                branch = ident[len("heads/"):]
+                if method == "GET":
+                    return 200, {"ref": f"refs/heads/{branch}", "object": {"sha": repo.refs[branch], "type": "commit"}}, route
+                if method == "PATCH":
+                    body = self._body()
+                    new_sha = body["sha"]
+                    # force=False: chỉ chấp nhận fast-forward (head hiện tại là parent của commit mới)
+                    if not body.get("force") and repo.refs[branch] not in repo.commits[new_sha]["parents"]:
+                        return 422, {"message": "Update is not a fast forward"}, route
+                    repo.refs[branch] = new_sha
+                    return 200, {"ref": f"refs/heads/{branch}", "object": {"sha": new_sha, "type": "commit"}}, route
+
+            if kind == "commits":
+                if method == "GET":
+                    commit = repo.commits[ident]
+                    return 200, {
+                        "sha": ident, "message": commit["message"], "tree": {"sha": commit["tree"]},
+                        "parents": [{"sha": parent} for parent in commit["parents"]],
+                    }, route
+                if method == "POST":
+                    body = self._body()
+                    if body["tree"] not in repo.trees:
+                        return 422, {"message": "Tree SHA does not exist"}, route
+                    sha = repo.write_commit(body.get("message", ""), body["tree"], body.get("parents", []))
+                    return 201, {"sha": sha, "tree": {"sha": body["tree"]}}, route
+
+            if kind == "trees":
+                if method == "GET":
+                    tree = [
+                        {"path": name, "mode": entry["mode"], "type": entry["type"], "sha": entry["sha"],
+                         **({"size": len(repo.blobs[entry["sha"]])} if entry["type"] == "blob" else {})}
+                        for name, entry in sorted(repo.trees[ident].items())
+                    ]
+                    return 200, {"sha": ident, "tree": tree, "truncated": False}, route
+                if method == "POST":
+                    body = self._body()
+                    files = repo.flatten(body["base_tree"]) if body.get("base_tree") else {}
+                    for item in body.get("tree", []):
+                        if item.get("sha") is None and "content" not in item:
+                            files.pop(item["path"], None)
+                        elif "content" in item:
+                            files[item["path"]] = repo.write_blob(item["content"].encode("utf-8"))
+                        elif item["sha"] in repo.blobs:
+                            files[item["path"]] = item["sha"]
+                        else:
+                            return 422, {"message": f"Object {item['sha']} not found"}, route
+                    return 201, {"sha": repo.build_tree(files)}, route
+
+            if kind == "blobs":
+                if method == "GET":
+                    data = repo.blobs[ident]
+                    return 200, {"sha": ident, "size": len(data), "encoding": "base64",
+                                 "content": base64.encodebytes(data).decode()}, route
+                if method == "POST":
+                    body = self._body()
+                    content = body.get("content", "")
+                    data = base64.b64decode(content) if body.get("encoding") == "base64" else content.encode("utf-8")
+                    return 201, {"sha": repo.write_blob(data)}, route
+
+            return 404, {"message": "Not Found"}, route
+
+        def do_GET(self):
+            self._handle("GET")
+
+        def do_POST(self):
+            self._handle("POST")
+
+        def do_PUT(self):
+            self._handle("PUT")
+
+        def do_PATCH(self):
+            self._handle("PATCH")
+
+        def do_DELETE(self):
+            self._handle("DELETE")
+
+    return Handler
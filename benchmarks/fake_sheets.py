@@ -0,0 +1,107 @@
+"""
+Nguồn Google Sheets giả lập cho ManualFleetSync (không cần credentials, chạy được trong CI)
+
+Phục vụ các sheet theo xe từ benchmarks.generators (có hàng lệch số cột), mô phỏng:
+- Độ trễ mỗi request + chi phí theo số hàng trả về
+- Quota đọc theo cửa sổ thời gian (Google: 60 request/phút/người dùng)
+
+    backend = FakeSheetsBackend.from_generated(scale=10, latency=0.2, quota=60)
+    sync = ManualFleetSync(sheets_backend=backend)
+    sync.read_all_sheets(mode="parallel")
+"""
+
+import threading
+import time
+from collections import Counter, deque
+
+from benchmarks import generators
+from manual_fleet_sync import SheetsBackend
+
+
+class SheetsQuotaError(Exception):
+    """Hết quota đọc (tương đương HTTP 429 RESOURCE_EXHAUSTED)"""
+
+
+class FakeSheetsBackend(SheetsBackend):
+    """
+    Args:
+        sheets: dict tên sheet -> các hàng (hàng 1 là header)
+        latency: Độ trễ cố định mỗi request (giây)
+        row_latency: Độ trễ thêm cho mỗi hàng trả về (giây), mô phỏng kích thước response
+        quota: Số request tối đa trong mỗi quota_window giây; None = không giới hạn
+        quota_mode: "wait" = chờ đến khi có quota (như client thử lại có backoff), "error" = raise SheetsQuotaError
+    """
+
+    def __init__(self, sheets, latency=0.0, row_latency=0.0, quota=None, quota_window=60.0, quota_mode="wait"):
+        self.sheets = {name: [list(row) for row in rows] for name, rows in sheets.items()}
+        self.latency = latency
+        self.row_latency = row_latency
+        self.quota = quota
+        self.quota_window = quota_window
+        self.quota_mode = quota_mode
+        self.request_counts = Counter()
+        self.quota_wait_seconds = 0.0
+        self._request_times = deque()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_generated(cls, scale=1, seed=0, **kwargs):
+        return cls(generators.make_fleet_sheets(scale, seed), **kwargs)
+
+    # ----- mô phỏng quota / độ trễ -----
+    def _acquire_quota(self):
+        if self.quota is None:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._request_times and now - self._request_times[0] >= self.quota_window:
+                    self._request_times.popleft()
+                if len(self._request_times) < self.quota:
+                    self._request_times.append(now)
+                    return
+                if self.quota_mode == "error":
+                    raise SheetsQuotaError("Quota exceeded for 'Read requests per minute per user'")
+                wait = self.quota_window - (now - self._request_times[0])
+                self.quota_wait_seconds += wait
+            time.sleep(wait)
+
+    def _request(self, kind, rows_returned):
+        self._acquire_quota()
+        with self._lock:
+            self.request_counts[kind] += 1
+        delay = self.latency + self.row_latency * rows_returned
+        if delay:
+            time.sleep(delay)
+
+    def _rows(self, sheet_name, first_row):
+        # Bản sao từng hàng: ManualFleetSync chuẩn hóa trực tiếp trên các hàng trả về
+        return [list(row) for row in self.sheets[sheet_name][max(first_row, 1) - 1:]]
+
+    # ----- SheetsBackend -----
+    def list_sheets(self):
+        self._request("spreadsheets.get", 0)
+        return list(self.sheets)
+
+    def get_values(self, sheet_name, first_row=1):
+        rows = self._rows(sheet_name, first_row)
+        self._request("values.get", len(rows))
+        return rows
+
+    def batch_get_values(self, first_rows):
+        result = {name: self._rows(name, first_row) for name, first_row in first_rows.items()}
+        self._request("values.batchGet", sum(len(rows) for rows in result.values()))
+        return result
+
+    # ----- tiện ích cho benchmark -----
+    def append_rows(self, rows_per_sheet, seed=1):
+        """Thêm hàng mới vào cuối mỗi sheet (như phản hồi Google Form mới)"""
+        extra = generators.make_fleet_sheets(1, seed)
+        with self._lock:
+            for name, rows in self.sheets.items():
+                rows.extend(list(row) for row in extra.get(name, [])[1:rows_per_sheet + 1])
+
+    def reset_counts(self):
+        with self._lock:
+            self.request_counts.clear()
+            self.quota_wait_seconds = 0.0
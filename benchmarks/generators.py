@@ -0,0 +1,163 @@
+"""
+Sinh dữ liệu giả lập (xác định, theo seed) cho benchmark
+
+Kích thước gốc (scale=1) xấp xỉ dữ liệu thực hiện nay:
+- Tổ xe: 13 xe x ~150 chuyến/năm
+- Phòng Hành chính: 1 năm báo cáo tuần (52 tuần x danh sách nội dung)
+- PHC: các file JSON mẫu ở thư mục gốc (tonghop/vbden/vbdi/cviec/phop/lhop)
+"""
+
+import copy
+import functools
+import json
+import os
+import random
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cùng danh sách xe với ManualFleetSync (để phân loại Hành chính/Cứu thương)
+ADMIN_VEHICLES = ["51B-330.67", "50A-012.59", "50A-007.20", "51A-1212", "50A-004.55"]
+AMBULANCE_VEHICLES = ["50A-007.39", "50M-004.37", "50A-009.44", "50A-010.67",
+                      "50M-002.19", "51B-509.51", "50A-019.90", "50A-018.35"]
+BASE_TRIPS_PER_VEHICLE = 150
+
+FLEET_SHEET_HEADERS = [
+    "Timestamp", "Email Address", "Ngày ghi nhận", "start_time", "end_time", "Thời gian",
+    "Điểm đến", "Phân loại công tác", "Nội thành/ngoại thành", "Quãng đường",
+    "Đổ nhiên liệu", "Doanh thu", "Chi tiết chuyến xe", "Ghi chú",
+    "Chỉ số đồng hồ sau khi kết thúc chuyến xe",
+]
+DESTINATIONS = ["Bệnh viện Chợ Rẫy", "Sở Y tế", "Bộ Y tế", "Sân bay Tân Sơn Nhất", "Cơ sở 2", "Bình Dương"]
+WORK_CATEGORIES = ["Đưa đón", "Công tác", "Cấp cứu", "Chuyển viện", "Vận chuyển hàng"]
+
+# File PHC mẫu ở thư mục gốc
+PHC_FILES = {
+    "tonghop": "tonghop.json",
+    "vbden": "vbden.json",
+    "vbdi": "vbdi.json",
+    "cviec": "cviec.json",
+    "phop": "phop.json",
+    "lhop": "lhop.json",
+}
+
+
+def _fleet_row(rng, trip_date, email, ambulance):
+    start = datetime(trip_date.year, trip_date.month, trip_date.day, rng.randint(6, 18), rng.choice([0, 15, 30, 45]))
+    duration = timedelta(minutes=rng.randint(20, 300))
+    end = start + duration
+    row = [
+        start.strftime("%m/%d/%Y %H:%M:%S"),
+        email,
+        trip_date.strftime("%m/%d/%Y"),
+        start.strftime("%H:%M"),
+        end.strftime("%H:%M"),
+        f"{duration.seconds // 3600}:{duration.seconds % 3600 // 60:02d}",
+        rng.choice(DESTINATIONS),
+        rng.choice(WORK_CATEGORIES),
+        rng.choice(["Nội thành", "Ngoại thành"]),
+        str(rng.randint(3, 250)),
+        str(rng.choice(["", "", "", rng.randint(20, 60)])),
+        f"{rng.randint(3, 60) * 100000:,}" if ambulance else "",
+        "Chuyển bệnh nhân" if ambulance else "",
+        "",
+        str(rng.randint(10000, 90000)),
+    ]
+    # Hàng lệch số cột như dữ liệu Google Sheets thực: thiếu ô cuối hoặc thừa ô
+    shape = rng.random()
+    if shape < 0.15:
+        row = row[:rng.randint(8, len(row) - 1)]
+    elif shape < 0.18:
+        row = row + [""]
+    return row
+
+
+@functools.lru_cache(maxsize=4)
+def _fleet_sheets(scale, seed):
+    rng = random.Random(seed)
+    emails = [f"driver{i}@example.com" for i in range(20)]
+    last_date = datetime(2025, 12, 31)
+    trips = BASE_TRIPS_PER_VEHICLE * scale
+
+    sheets = {}
+    for vehicle in ADMIN_VEHICLES + AMBULANCE_VEHICLES:
+        ambulance = vehicle in AMBULANCE_VEHICLES
+        rows = [list(FLEET_SHEET_HEADERS)]
+        for i in range(trips):
+            # BASE_TRIPS_PER_VEHICLE chuyến mỗi năm, lùi dần về quá khứ
+            trip_date = last_date - timedelta(days=i * 365 // BASE_TRIPS_PER_VEHICLE)
+            rows.append(_fleet_row(rng, trip_date, rng.choice(emails), ambulance))
+        sheets[vehicle] = rows
+    return sheets
+
+
+def make_fleet_sheets(scale=1, seed=0):
+    """Per-vehicle Google Sheets values (header + ragged rows), as returned by values().get"""
+    # Bản sao sâu: chuẩn hóa sheet sửa trực tiếp các hàng
+    return copy.deepcopy(_fleet_sheets(scale, seed))
+
+
+def make_admin_weekly(scale=1, contents_by_category=None, seed=0):
+    """
+    Dữ liệu báo cáo tuần Phòng Hành chính (Tuần, Tháng, Năm, Danh mục, Nội dung, Số liệu)
+
+    scale = số năm dữ liệu; contents_by_category: dict danh mục -> danh sách nội dung
+    """
+    rng = random.Random(seed)
+    if contents_by_category is None:
+        contents_by_category = {f"Danh mục {c}": [f"Nội dung {c}.{i}" for i in range(4)] for c in range(13)}
+
+    records = []
+    first_year = 2025 - scale + 1
+    for year in range(first_year, 2026):
+        for week in range(1, 53):
+            month = min(12, (week - 1) * 12 // 52 + 1)
+            for category, contents in contents_by_category.items():
+                for content in contents:
+                    records.append((week, month, year, category, content, rng.randint(0, 500)))
+
+    return pd.DataFrame(records, columns=["Tuần", "Tháng", "Năm", "Danh mục", "Nội dung", "Số liệu"])
+
+
+def split_contents_by_category(category_priority, content_priority):
+    """Chia danh sách nội dung (theo thứ tự ưu tiên) đều cho các danh mục"""
+    categories = sorted(category_priority, key=category_priority.get)
+    contents = sorted(content_priority, key=content_priority.get)
+    per_category = max(1, len(contents) // len(categories))
+    groups = {}
+    for i, category in enumerate(categories):
+        # Danh mục cuối nhận phần nội dung còn dư
+        end = (i + 1) * per_category if i < len(categories) - 1 else len(contents)
+        groups[category] = contents[i * per_category:end] or [f"{category} - tổng"]
+    return groups
+
+
+@functools.lru_cache(maxsize=8)
+def load_phc_base(name):
+    """Load one of the sample PHC payloads from the repo root"""
+    with open(os.path.join(REPO_ROOT, PHC_FILES[name]), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def make_phc_payload(name, scale=1):
+    """
+    Nhân bản payload PHC mẫu scale lần, mỗi bản lùi về quá khứ một khoảng bằng số năm của mẫu
+    (giữ nguyên schema date/month/year hoặc Date/Month/Year)
+    """
+    base = load_phc_base(name)
+    rows = base.get("data") or []
+    year_key = "year" if rows and "year" in rows[0] else "Year"
+    years = [row[year_key] for row in rows] or [2025]
+    span = max(years) - min(years) + 1
+
+    data = []
+    for k in range(scale):
+        for row in rows:
+            shifted = dict(row)
+            shifted[year_key] = row[year_key] - k * span
+            data.append(shifted)
+
+    return dict(base, data=data)
@@ -0,0 +1,329 @@
+"""
+Chạy benchmark các hàm xử lý chính (không cần `streamlit run`)
+
+    python -m benchmarks.run                      # scale 10, 100
+    python -m benchmarks.run --scales 10 100 1000 --repeat 5
+    python -m benchmarks.run --only fleet admin   # lọc theo tiền tố tên benchmark
+    python -m benchmarks.run --update-baseline    # ghi kết quả vào benchmarks/baselines.json
+    python -m benchmarks.run --only github --github-latency 0.1   # đọc/ghi GitHub qua server giả lập
+    python -m benchmarks.run --only sheets --sheets-quota 60      # các chế độ đọc Google Sheets giả lập
+
+Kết quả được so với baselines.json; benchmark chậm hơn baseline quá --tolerance bị đánh dấu REGRESSION.
+"""
+
+import argparse
+import importlib.util
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import time
+
+from benchmarks import generators
+
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+
+# Độ trễ mỗi request của server GitHub giả lập (giây), đổi bằng --github-latency
+GITHUB_LATENCY = 0.02
+
+# Google Sheets giả lập: độ trễ mỗi request, chi phí mỗi hàng, quota request/phút (None = không giới hạn)
+SHEETS_LATENCY = 0.05
+SHEETS_ROW_LATENCY = 2e-6
+SHEETS_QUOTA = None
+# Số hàng mới mỗi sheet giữa hai lần đọc ở benchmark incremental
+SHEETS_NEW_ROWS = 5
+
+
+def load_module(module_name, relative_path):
+    """Import a repo script by path (dashboard-to-xe.py has a dash in its name)"""
+    path = os.path.join(generators.REPO_ROOT, relative_path)
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_modules():
+    # Chạy Streamlit ở chế độ "bare": bỏ các cảnh báo thiếu ScriptRunContext
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    logging.getLogger("manual_fleet_sync").setLevel(logging.WARNING)
+    sys.path.insert(0, generators.REPO_ROOT)
+    return {
+        "admin": load_module("dash_phonghc", "dash_phonghc.py"),
+        "fleet": load_module("dashboard_to_xe", "dashboard-to-xe.py"),
+        "sync": load_module("manual_fleet_sync", "manual_fleet_sync.py"),
+        "phc": load_module("api_handler", os.path.join("test", "api_handler.py")),
+        "columnar": load_module("columnar_json", "columnar_json.py"),
+    }
+
+
+# ===== BENCHMARK DEFINITIONS =====
+# Mỗi benchmark: setup(modules, scale) -> state (không tính giờ), run(modules, state) (tính giờ)
+
+def _fleet_frame(modules, scale):
+    import pandas as pd
+    sync = modules["sync"].ManualFleetSync()
+    frames = [sync.normalize_sheet_values(name, values)
+              for name, values in generators.make_fleet_sheets(scale).items()]
+    return pd.concat(frames, ignore_index=True)
+
+
+def _admin_dashboard(modules, scale):
+    dashboard = modules["admin"].PivotTableDashboard()
+    contents = generators.split_contents_by_category(dashboard.category_priority, dashboard.content_priority)
+    dashboard.load_data_from_dataframe(generators.make_admin_weekly(scale, contents))
+    return dashboard
+
+
+def setup_sheets(modules, scale):
+    return modules["sync"].ManualFleetSync(), generators.make_fleet_sheets(scale)
+
+
+def run_sheets(modules, state):
+    sync, sheets = state
+    for name, values in sheets.items():
+        sync.normalize_sheet_values(name, values)
+
+
+def setup_process_dataframe(modules, scale):
+    return _fleet_frame(modules, scale)
+
+
+def run_process_dataframe(modules, frame):
+    modules["fleet"].process_dataframe(frame.copy())
+
+
+def run_fleet_records_json(modules, frame):
+    frame.to_json(orient="records", indent=2)
+
+
+def run_fleet_columnar(modules, frame):
+    modules["columnar"].encode_frame(frame)
+
+
+def setup_admin_raw(modules, scale):
+    dashboard = modules["admin"].PivotTableDashboard()
+    contents = generators.split_contents_by_category(dashboard.category_priority, dashboard.content_priority)
+    return dashboard, generators.make_admin_weekly(scale, contents)
+
+
+def run_admin_load(modules, state):
+    dashboard, frame = state
+    dashboard.load_data_from_dataframe(frame)
+
+
+def run_week_over_week(modules, dashboard):
+    dashboard._calculate_week_over_week_ratio()
+
+
+def run_smart_aggregation(modules, dashboard):
+    dashboard.apply_smart_aggregation(dashboard.data, ["Danh mục", "Nội dung"], ["Tuần"], "Số liệu")
+
+
+def run_hierarchical_pivot(modules, dashboard):
+    dashboard.create_hierarchical_pivot_table_with_ratio(
+        dashboard.data, ["Danh mục", "Nội dung"], ["Tuần"], "Số liệu", "sum", True
+    )
+
+
+def run_aggregate_quarter(modules, dashboard):
+    dashboard.aggregate_data_by_report_type(dashboard.data, "Theo Quý")
+
+
+def setup_phc_windows(modules, scale):
+    # Chia payload thành các "cửa sổ tháng" như fetch_phc_dataset_chunked trả về
+    payload = generators.make_phc_payload("tonghop", scale)
+    windows = {}
+    for row in payload["data"]:
+        windows.setdefault(modules["phc"].phc_row_date_key(row)[:2], []).append(row)
+    return [dict(payload, data=window_rows) for window_rows in windows.values()]
+
+
+def run_phc_merge(modules, windows):
+    modules["phc"].merge_phc_payloads(windows)
+
+
+def setup_phc_json(modules, scale):
+    return {name: json.dumps(generators.make_phc_payload(name, scale), ensure_ascii=False)
+            for name in generators.PHC_FILES}
+
+
+def run_phc_json_load(modules, texts):
+    import pandas as pd
+    for text in texts.values():
+        pd.DataFrame(json.loads(text)["data"])
+
+
+def _fake_github(modules):
+    """Start the fake GitHub server once and point every manager at it (GITHUB_API_BASE)"""
+    if "_fake_github" not in modules:
+        from benchmarks.fake_github import FakeGitHub
+        fake = FakeGitHub(latency=GITHUB_LATENCY, rate_limit=None).start()
+        os.environ["GITHUB_API_BASE"] = fake.base_url
+        os.environ.setdefault("GITHUB_TOKEN", "fake-benchmark-token")
+        modules["_fake_github"] = fake
+    return modules["_fake_github"]
+
+
+def setup_fleet_save(modules, scale):
+    _fake_github(modules).add_repo("corner-25", "vehicle-storage")
+    return modules["sync"].ManualFleetSync(), _fleet_frame(modules, scale)
+
+
+def run_fleet_save(modules, state):
+    sync, frame = state
+    if not sync.save_to_github(frame):
+        raise RuntimeError("save_to_github thất bại trên server giả lập")
+
+
+def setup_fleet_load(modules, scale):
+    payload = modules["columnar"].encode_frame(_fleet_frame(modules, scale))
+    _fake_github(modules).add_repo("corner-25", "vehicle-storage", {"data/latest/fleet_data_latest.json": payload})
+    modules["fleet"].load_data_from_github.clear()
+
+
+def run_fleet_load(modules, state):
+    if modules["fleet"].load_data_from_github().empty:
+        raise RuntimeError("load_data_from_github không đọc được dữ liệu từ server giả lập")
+
+
+def _fake_sheets_sync(modules, scale):
+    from benchmarks.fake_sheets import FakeSheetsBackend
+    backend = FakeSheetsBackend.from_generated(
+        scale, latency=SHEETS_LATENCY, row_latency=SHEETS_ROW_LATENCY, quota=SHEETS_QUOTA
+    )
+    return modules["sync"].ManualFleetSync(sheets_backend=backend)
+
+
+def _read_sheets(mode, incremental=False):
+    def run(modules, sync):
+        if sync.read_all_sheets(mode=mode, incremental=incremental) is None:
+            raise RuntimeError(f"read_all_sheets({mode}) không đọc được dữ liệu")
+    return run
+
+
+def setup_sheets_incremental(modules, scale):
+    # Lần đọc đầy đủ (không tính giờ), sau đó mỗi sheet có thêm vài phản hồi mới
+    sync = _fake_sheets_sync(modules, scale)
+    sync.read_all_sheets(mode="batch", incremental=True)
+    sync.sheets_backend.append_rows(SHEETS_NEW_ROWS)
+    return sync
+
+
+BENCHMARKS = [
+    ("fleet.read_all_sheets_normalize", setup_sheets, run_sheets),
+    ("fleet.process_dataframe", setup_process_dataframe, run_process_dataframe),
+    ("fleet.encode_records_json", setup_process_dataframe, run_fleet_records_json),
+    ("fleet.encode_columnar_json", setup_process_dataframe, run_fleet_columnar),
+    ("admin.load_data_from_dataframe", setup_admin_raw, run_admin_load),
+    ("admin.calculate_week_over_week_ratio", _admin_dashboard, run_week_over_week),
+    ("admin.apply_smart_aggregation", _admin_dashboard, run_smart_aggregation),
+    ("admin.create_hierarchical_pivot_table_with_ratio", _admin_dashboard, run_hierarchical_pivot),
+    ("admin.aggregate_quarter", _admin_dashboard, run_aggregate_quarter),
+    ("phc.merge_month_windows", setup_phc_windows, run_phc_merge),
+    ("phc.json_to_frame", setup_phc_json, run_phc_json_load),
+    ("sheets.read_sequential", _fake_sheets_sync, _read_sheets("sequential")),
+    ("sheets.read_batch", _fake_sheets_sync, _read_sheets("batch")),
+    ("sheets.read_parallel", _fake_sheets_sync, _read_sheets("parallel")),
+    ("sheets.read_incremental_batch", setup_sheets_incremental, _read_sheets("batch", incremental=True)),
+    ("github.fleet_save_to_github", setup_fleet_save, run_fleet_save),
+    ("github.fleet_load_data_from_github", setup_fleet_load, run_fleet_load),
+]
+
+
+# ===== RUNNER =====
+def time_benchmark(modules, setup, run, scale, repeat):
+    """Return per-repeat durations (seconds); setup is rebuilt before each repeat and not timed"""
+    durations = []
+    for _ in range(repeat):
+        state = setup(modules, scale)
+        started = time.perf_counter()
+        run(modules, state)
+        durations.append(time.perf_counter() - started)
+    return durations
+
+
+def load_baselines():
+    if not os.path.exists(BASELINE_FILE):
+        return {}
+    with open(BASELINE_FILE, "r", encoding="utf-8") as f:
+        return json.load(f).get("results", {})
+
+
+def save_baselines(results):
+    import pandas as pd
+    payload = {
+        "environment": {
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+            "recorded_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        },
+        "results": results,
+    }
+    with open(BASELINE_FILE, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+
+def main(argv=None):
+    global GITHUB_LATENCY, SHEETS_LATENCY, SHEETS_QUOTA
+    parser = argparse.ArgumentParser(description="Dashboard benchmarks")
+    parser.add_argument("--scales", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", nargs="*", default=None, help="Chỉ chạy benchmark có tên bắt đầu bằng các tiền tố này")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Ngưỡng chậm hơn baseline (0.25 = 25%%)")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--github-latency", type=float, default=GITHUB_LATENCY,
+                        help="Độ trễ mỗi request của server GitHub giả lập (giây)")
+    parser.add_argument("--sheets-latency", type=float, default=SHEETS_LATENCY,
+                        help="Độ trễ mỗi request của Google Sheets giả lập (giây)")
+    parser.add_argument("--sheets-quota", type=int, default=SHEETS_QUOTA,
+                        help="Quota request/phút của Google Sheets giả lập (mặc định không giới hạn)")
+    args = parser.parse_args(argv)
+    GITHUB_LATENCY = args.github_latency
+    SHEETS_LATENCY = args.sheets_latency
+    SHEETS_QUOTA = args.sheets_quota
+
+    modules = load_modules()
+    baselines = load_baselines()
+    results = dict(baselines) if args.update_baseline else {}
+    regressions = []
+
+    print(f"{'benchmark':<52} {'scale':>6} {'median':>10} {'baseline':>10} {'ratio':>7}")
+    for name, setup, run in BENCHMARKS:
+        if args.only and not any(name.startswith(prefix) for prefix in args.only):
+            continue
+        for scale in args.scales:
+            key = f"{name}@{scale}x"
+            median = statistics.median(time_benchmark(modules, setup, run, scale, args.repeat))
+            baseline = baselines.get(key, {}).get("median_s")
+
+            ratio = median / baseline if baseline else None
+            flag = ""
+            if ratio is not None and ratio > 1 + args.tolerance:
+                flag = "  REGRESSION"
+                regressions.append(key)
+
+            print(f"{name:<52} {scale:>5}x {median:>9.3f}s "
+                  f"{(f'{baseline:.3f}s' if baseline else '-'):>10} "
+                  f"{(f'{ratio:.2f}' if ratio else '-'):>7}{flag}")
+            results[key] = {"median_s": round(median, 6), "repeat": args.repeat}
+
+    if args.update_baseline:
+        save_baselines(results)
+        print(f"\nBaseline saved to {BASELINE_FILE}")
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+        if args.fail_on_regression:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Định dạng JSON dạng cột (columnar) cho DataFrame lưu trên GitHub
+
+- Mỗi cột là một mảng, tên cột chỉ xuất hiện một lần trong schema
+- Cột chuỗi lặp nhiều (xe, tài xế, danh mục...) được mã hóa từ điển: danh sách giá trị + mã số nguyên
+- JSON gọn (không indent), có thể nén gzip; khi đọc tự nhận biết gzip/JSON
+"""
+
+import datetime
+import gzip
+import json
+
+import numpy as np
+import pandas as pd
+
+
+FORMAT_NAME = "columnar-json"
+FORMAT_VERSION = 1
+GZIP_MAGIC = b"\x1f\x8b"
+
+# Cột chuỗi có tỷ lệ giá trị khác nhau dưới ngưỡng này thì mã hóa từ điển
+DICTIONARY_THRESHOLD = 0.5
+
+
+def _to_list(values):
+    """Convert a numpy array to JSON-safe Python values (NaN/NaT -> None)"""
+    values = np.asarray(values, dtype=object)
+    return [None if pd.isna(v) else v for v in values.tolist()]
+
+
+def _json_default(value):
+    """json.dumps fallback: dates/timestamps as ISO strings, numpy scalars as Python values"""
+    if isinstance(value, (datetime.date, datetime.datetime, pd.Timestamp)):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def encode_column(series, dictionary_columns=None, threshold=DICTIONARY_THRESHOLD):
+    """Encode one column; return (schema entry, values list)"""
+    name = str(series.name)
+    entry = {"name": name}
+
+    # Cột object chứa date/Timestamp/bool (vd. đọc từ Google Sheets, Excel) cũng được giữ kiểu
+    inferred = pd.api.types.infer_dtype(series, skipna=True) if series.dtype == object else None
+
+    if pd.api.types.is_datetime64_any_dtype(series) or inferred in ("datetime", "datetime64"):
+        entry["dtype"] = "datetime"
+        return entry, _to_list(pd.to_datetime(series).dt.strftime("%Y-%m-%dT%H:%M:%S"))
+
+    if inferred == "date":
+        entry["dtype"] = "date"
+        return entry, [None if pd.isna(v) else v.isoformat() for v in series.tolist()]
+
+    if pd.api.types.is_bool_dtype(series) or inferred == "boolean":
+        entry["dtype"] = "bool"
+        return entry, _to_list(series)
+
+    if pd.api.types.is_numeric_dtype(series):
+        entry["dtype"] = "int" if pd.api.types.is_integer_dtype(series) else "float"
+        return entry, _to_list(series)
+
+    use_dictionary = (
+        name in dictionary_columns if dictionary_columns is not None
+        else len(series) > 0 and series.nunique(dropna=True) <= threshold * len(series)
+    )
+    if use_dictionary:
+        codes, categories = pd.factorize(series, sort=False)
+        entry["dtype"] = "dictionary"
+        entry["categories"] = _to_list(categories)
+        # -1 = giá trị rỗng
+        return entry, codes.tolist()
+
+    entry["dtype"] = "string"
+    return entry, _to_list(series)
+
+
+def frame_to_columnar(df, metadata=None, dictionary_columns=None):
+    """Build the columnar payload dict for a DataFrame"""
+    schema, data = [], []
+    for column in df.columns:
+        entry, values = encode_column(df[column], dictionary_columns)
+        schema.append(entry)
+        data.append(values)
+
+    payload = {
+        "format": FORMAT_NAME,
+        "version": FORMAT_VERSION,
+        "row_count": len(df),
+        "schema": schema,
+        "data": data,
+    }
+    if metadata is not None:
+        payload["metadata"] = metadata
+    return payload
+
+
+def dumps_payload(payload, compress=False):
+    """Serialize a payload to compact UTF-8 JSON bytes, optionally gzip-compressed"""
+    raw = json.dumps(payload, ensure_ascii=False, separators=(",", ":"), default=_json_default).encode("utf-8")
+    return gzip.compress(raw, compresslevel=6) if compress else raw
+
+
+def encode_frame(df, metadata=None, dictionary_columns=None, compress=False):
+    """DataFrame -> columnar JSON bytes"""
+    return dumps_payload(frame_to_columnar(df, metadata, dictionary_columns), compress)
+
+
+def loads_payload(raw):
+    """Parse bytes/str that may be gzip-compressed JSON"""
+    if isinstance(raw, str):
+        return json.loads(raw)
+    if raw[:2] == GZIP_MAGIC:
+        raw = gzip.decompress(raw)
+    return json.loads(raw.decode("utf-8"))
+
+
+def is_columnar(payload):
+    return isinstance(payload, dict) and payload.get("format") == FORMAT_NAME
+
+
+def columnar_to_frame(payload):
+    """Rebuild the DataFrame from a columnar payload"""
+    if payload.get("version", 0) > FORMAT_VERSION:
+        raise ValueError(f"Phiên bản {FORMAT_NAME} không hỗ trợ: {payload.get('version')}")
+
+    columns = {}
+    for entry, values in zip(payload["schema"], payload["data"]):
+        dtype = entry.get("dtype")
+        if dtype == "dictionary":
+            columns[entry["name"]] = pd.Categorical.from_codes(
+                values, categories=entry["categories"]
+            ).astype(object)
+        elif dtype == "datetime":
+            columns[entry["name"]] = pd.to_datetime(pd.Series(values, dtype=object))
+        elif dtype == "date":
+            columns[entry["name"]] = pd.Series(
+                [None if v is None else datetime.date.fromisoformat(v) for v in values], dtype=object
+            )
+        elif dtype == "bool" and None not in values:
+            columns[entry["name"]] = pd.Series(values, dtype="bool")
+        elif dtype == "bool":
+            # Cột bool có giá trị rỗng -> kiểu boolean có NA của pandas
+            columns[entry["name"]] = pd.Series(values, dtype="boolean")
+        elif dtype == "int" and None not in values:
+            columns[entry["name"]] = pd.Series(values, dtype="int64")
+        elif dtype in ("int", "float"):
+            # Cột số nguyên có giá trị rỗng -> float (NaN), giống pandas
+            columns[entry["name"]] = pd.Series(values, dtype="float64")
+        else:
+            columns[entry["name"]] = pd.Series(values, dtype=object)
+
+    return pd.DataFrame(columns, columns=[entry["name"] for entry in payload["schema"]])
@@ -0,0 +1,2 @@
+# test/ chứa các bản thử nghiệm của dashboard Streamlit (test_backup*.py), không phải unit test
+collect_ignore = ["test"]
@@ -5,486 +5,195 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import numpy as np
 from datetime import datetime
-import os, base64
+import os
+import hashlib
+import json
 
-# Cấu hình trang
-st.set_page_config(
-    page_title="Dashboard Bệnh Viện - Multi Department",
-    page_icon="🏥",
-    layout="wide",
-    initial_sidebar_state="collapsed"
-)
+from static_assets import inject_css, get_logo_data_uri
 
 # Custom CSS
-st.markdown("""
-<style>
-    .main-header {
-        font-size: 2.5rem;
-        font-weight: bold;
-        color: #1f77b4;
-        text-align: center;
-        margin-bottom: 2rem;
-        padding: 1rem;
-        background: #ffffff;
-        border-radius: 10px;
-        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-    }
-    
-    .metric-container {
-        background-color: #f8f9fa;
-        padding: 1rem;
-        border-radius: 10px;
-        border-left: 5px solid #1f77b4;
-        margin: 0.5rem 0;
-    }
-
-    /* Centered header container and text */
-    .header-container {
-        text-align: center;
-        display: flex;
-        flex-direction: row;
-        align-items: center;
-        justify-content: center;
-        margin-bottom: 2rem;
-    }
+def apply_custom_css():
+    """Inject the dashboard CSS (must be emitted on every rerun)"""
+    inject_css("""
+    <style>
+        .main-header {
+            font-size: 2.5rem;
+            font-weight: bold;
+            color: #1f77b4;
+            text-align: center;
+            margin-bottom: 2rem;
+            padding: 1rem;
+            background: #ffffff;
+            border-radius: 10px;
+            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+        }
+    
+        .metric-container {
+            background-color: #f8f9fa;
+            padding: 1rem;
+            border-radius: 10px;
+            border-left: 5px solid #1f77b4;
+            margin: 0.5rem 0;
+        }
 
-    .header-text {
-        font-size: 2.5rem;
-        font-weight: bold;
-        color: #1f77b4;
-        text-align: center;
-        margin-top: 0.5rem;
-    }
+        /* Centered header container and text */
+        .header-container {
+            text-align: center;
+            display: flex;
+            flex-direction: row;
+            align-items: center;
+            justify-content: center;
+            margin-bottom: 2rem;
+        }
 
-    .section-header {
-        background-color: #f6f8fa;
-        padding: 1.25rem;
-        border-radius: 10px;
-        margin-bottom: 1.5rem;
-        text-align: center;
-    }
-    .section-header h2 {
-        margin: 0;
-        font-size: 2rem;
-        font-weight: bold;
-        color: #1f77b4;
-    }
-    .section-header p {
-        margin: 0;
-        font-size: 1rem;
-        color: #555;
-    }
-</style>
-""", unsafe_allow_html=True)
+        .header-text {
+            font-size: 2.5rem;
+            font-weight: bold;
+            color: #1f77b4;
+            text-align: center;
+            margin-top: 0.5rem;
+        }
 
-# HEADER: logo + title on one line (flexbox)
-try:
-        # Encode logo to base64 for inline <img>
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        logo_base64 = ""
-        # Check for logo.png in current directory first, then in ./assets/
-        for p in [
-            os.path.join(script_dir, "logo.png"),                      # 1️⃣ same-level logo
-            os.path.join(script_dir, "assets", "logo.png")            # 2️⃣ assets folder
-        ]:
-            if os.path.exists(p):
-                with open(p, "rb") as f:
-                    logo_base64 = base64.b64encode(f.read()).decode()
-                break
-except Exception:
-        logo_base64 = ""
+        .section-header {
+            background-color: #f6f8fa;
+            padding: 1.25rem;
+            border-radius: 10px;
+            margin-bottom: 1.5rem;
+            text-align: center;
+        }
+        .section-header h2 {
+            margin: 0;
+            font-size: 2rem;
+            font-weight: bold;
+            color: #1f77b4;
+        }
+        .section-header p {
+            margin: 0;
+            font-size: 1rem;
+            color: #555;
+        }
+    </style>
+    """)
 
-    # Build logo HTML (fallback emoji if logo not found)
-if logo_base64:
-        logo_html = f"<img src='data:image/png;base64,{logo_base64}' style='height:150px; width:auto;' />"
-else:
+def render_header():
+    """Render logo + title header"""
+    # HEADER: logo + title on one line (flexbox)
+    # Logo: data URI được mã hóa một lần cho mỗi process
+    logo_uri = get_logo_data_uri(os.path.dirname(os.path.abspath(__file__)))
+    if logo_uri:
+        logo_html = f"<img src='{logo_uri}' style='height:150px; width:auto;' />"
+    else:
         logo_html = "<div style='font-size:2.5rem; margin-right:12px;'>🏥</div>"
 
-header_html = f"""
-    <div style='
-        width:100%;
-        display:flex;
-        align-items:center;
-        justify-content:center;
-        gap:12px;
-        padding:30px 0;
-        background:#ffffff;
-        border-radius:15px;
-        margin-bottom:30px;
-    '>
-        {logo_html}
-        <h1 style='
-            color:#1f77b4;
-            margin:0;
-            font-size:3.2rem;
-            font-weight:bold;
-            font-family:"Segoe UI", Arial, sans-serif;
-            text-shadow:2px 2px 4px rgba(0,0,0,0.1);
-            letter-spacing:1px;
-            text-align:center;
-        '>Dashboard Quản lý số liệu Bệnh viện Đại học Y Dược TP. Hồ Chí Minh</h1>
-    </div>
-    """
-st.markdown(header_html, unsafe_allow_html=True)
-
-# Dữ liệu Phòng VTTB
-vttb_data = {
-    "sua_chua": {
-        "phat_sinh": 2322,
-        "hoan_thanh": 1973,
-        "ty_le_hoan_thanh": round((1973/2322)*100, 1)
-    },
-    "trang_thai_tbyt": {
-        "khac_phuc_tam_thoi": 54,
-        "dang_sua_chua": 87,
-        "thanh_ly": 2574,
-        "tong_tam_ngung": 54 + 87 + 2574
-    },
-    "dau_thau": {
-        "dang_thuc_hien": 49,
-        "hoan_thanh": 51,
-        "tong_gia_tri": 1158385811271
-    },
-    "van_ban": {
-        "tong_den": 4965,
-        "hoan_thanh": 4695,
-        "chua_xu_ly": 144,
-        "dang_xu_ly": 126,
-        "ty_le_chua_xu_ly": 3,
-        "ty_le_dang_xu_ly": 3
-    },
-    "kho": {
-        "nhap_hcsk": 11150128821,
-        "nhap_lktm": 13134877542,
-        "xuat_hcsk": 11032099005,
-        "xuat_lktm": 12868396672,
-        "ton_hcsk": 833431469,
-        "ton_lktm": 1017249841
-    }
-}
+    header_html = f"""
+        <div style='
+            width:100%;
+            display:flex;
+            align-items:center;
+            justify-content:center;
+            gap:12px;
+            padding:30px 0;
+            background:#ffffff;
+            border-radius:15px;
+            margin-bottom:30px;
+        '>
+            {logo_html}
+            <h1 style='
+                color:#1f77b4;
+                margin:0;
+                font-size:3.2rem;
+                font-weight:bold;
+                font-family:"Segoe UI", Arial, sans-serif;
+                text-shadow:2px 2px 4px rgba(0,0,0,0.1);
+                letter-spacing:1px;
+                text-align:center;
+            '>Dashboard Quản lý số liệu Bệnh viện Đại học Y Dược TP. Hồ Chí Minh</h1>
+        </div>
+        """
+    st.markdown(header_html, unsafe_allow_html=True)
 
-# Dữ liệu Khoa KSKTYC
-ksktyc_data = {
-    "kham_khong_nn": {"value": 26794, "growth": 13.68},
-    "kham_co_nn": {"value": 383, "growth": 751.11},
-    "kham_lai_xe": {"value": 0, "growth": 0},
-    "kham_dinh_ky": {"value": 24458, "growth": 14.23},
-    "kham_hop_dong": {"value": 17803, "growth": 2.69},
-    "kham_khong_hop_dong": {"value": 6655, "growth": 63.31},
-    "kham_ca_nhan": {"value": 2719, "growth": 23.42},
-    "kham_noi_vien": {"value": 23554, "growth": 20.23},
-    "kham_ngoai_vien": {"value": 3623, "growth": -9.97}
-}
+# ================== DỮ LIỆU CÁC PHÒNG BAN (KPI STORE) ==================
+# Mỗi phòng ban một file JSON theo kỳ: kpi_data/<kỳ>/<phòng ban>.json
+# Cập nhật số liệu hằng tháng/kỳ = thêm thư mục kỳ mới, không cần sửa code.
+KPI_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "kpi_data")
+KPI_SCHEMA_VERSION = 1
 
-# Dữ liệu Phòng CNTT
-cntt_data = {
-    "thiet_bi": {
-        "laptop": {"name": "Laptop", "quantity": 115},
-        "may_vi_tinh": {"name": "Máy vi tính", "quantity": 1480},
-        "kiosk": {"name": "Kiosk điện tử", "quantity": 12},
-        "may_in_laser": {"name": "Máy in Laser trắng đen", "quantity": 611},
-        "may_in_mau": {"name": "Máy in màu", "quantity": 63},
-        "may_in_ma_vach": {"name": "Máy in mã vạch", "quantity": 362},
-        "dau_doc_ma_vach": {"name": "Đầu đọc mã vạch", "quantity": 482},
-        "may_in_nhiet": {"name": "Máy in nhiệt", "quantity": 101},
-        "switch": {"name": "Switch", "quantity": 247},
-        "access_point": {"name": "Access Point", "quantity": 416},
-        "server_vat_ly": {"name": "Server vật lý", "quantity": 16},
-        "server_ao_hoa": {"name": "Server ảo hóa", "quantity": 220},
-        "san": {"name": "SAN", "quantity": 5},
-        "das": {"name": "DAS", "quantity": 1},
-        "nas": {"name": "NAS", "quantity": 5},
-        "router": {"name": "Router", "quantity": 2},
-        "wifi_controller": {"name": "Wifi Controller", "quantity": 4},
-        "firewall_cisco": {"name": "Firewall trong Cisco", "quantity": 2},
-        "firewall_fortigate": {"name": "Firewall ngoài Fortigate", "quantity": 4},
-        "san_switch": {"name": "SAN switch", "quantity": 4},
-        "may_tinh_bang": {"name": "Máy tính bảng", "quantity": 404},
-        "may_scan": {"name": "Máy scan", "quantity": 111},
-        "may_in_the": {"name": "Máy in thẻ VietinBank", "quantity": 10}
-    },
-    "hoat_dong": {
-        "giai_quyet_de_nghi": {"name": "Giải quyết Đề nghị/Yêu cầu từ các Đơn vị", "value": 97.16, "unit": "%", "comparison": 97.56},
-        "ho_tro_phan_cung": {"name": "Hỗ trợ Phần cứng - Mạng", "value": 2546, "unit": "lượt", "comparison": 2734},
-        "ho_tro_phan_mem": {"name": "Hỗ trợ phần mềm và thống kê số liệu", "value": 2806, "unit": "lượt", "comparison": 2752},
-        "trien_khai_chuc_nang": {"name": "Triển khai chức năng phần mềm mới", "value": 87, "unit": "chức năng", "comparison": 71},
-        "dang_ky_kham_online": {"name": "Đăng ký khám trực tuyến UMC Care", "value": 515745, "unit": "lượt", "comparison": 166600},
-        "su_dung_app": {"name": "Sử dụng ứng dụng di động", "value": 1144937, "unit": "lượt", "comparison": 585431},
-        "ty_le_su_dung": {"name": "Tỷ lệ sử dụng trực tuyến", "value": 45.05, "unit": "%", "comparison": 28.46},
-        "tham_quan": {"name": "Tiếp đoàn tham quan, học tập về CNTT", "value": 10, "unit": "đoàn", "comparison": 12}
-    }
+# Các mục bắt buộc trong "data" của từng phòng ban
+KPI_REQUIRED_SECTIONS = {
+    "vttb": ["sua_chua", "trang_thai_tbyt", "dau_thau", "van_ban", "kho"],
+    "ksktyc": ["kham_khong_nn", "kham_co_nn", "kham_lai_xe", "kham_dinh_ky", "kham_hop_dong", "kham_khong_hop_dong", "kham_ca_nhan", "kham_noi_vien", "kham_ngoai_vien"],
+    "cntt": ["thiet_bi", "hoat_dong"],
+    "tttt": ["bai_viet_truyen_thong", "chuong_trinh_phong_su", "chuong_trinh_giao_duc", "website", "fanpage", "zalo", "youtube", "tiktok", "an_pham"],
+    "ctxh": ["ho_tro_nguoi_benh", "sinh_hoat_nha", "ho_tro_thuoc", "tiep_nhan_gop_y", "cham_soc_cong_dong", "van_dong_tai_tro"],
+    "tcbc": ["to_chuc", "nhan_su", "dao_tao", "khieu_nai_to_cao", "thi_dua_khen_thuong"],
+    "qttn": ["hieu_suat_hoat_dong", "chat_thai", "kho_khi_y_te"],
 }
 
-# Dữ liệu Trung Tâm Truyền Thông
-tttt_data = {
-    "bai_viet_truyen_thong": {
-        "2024": 1201,
-        "2025": 822,
-        "growth": -32
-    },
-    "chuong_trinh_phong_su": {
-        "2024": 390,
-        "2025": 204,
-        "growth": -48
-    },
-    "chuong_trinh_giao_duc": {
-        "2024": 10,
-        "2025": 4,
-        "growth": -60
-    },
-    "website": {
-        "luot_truy_cap_2024": 33855428,
-        "luot_truy_cap_2025": 36074074,
-        "luot_truy_cap_growth": 6.5,
-        "bai_viet_2024": 140,
-        "bai_viet_2025": 156,
-        "bai_viet_growth": 11
-    },
-    "fanpage": {
-        "luot_thich_2024": 186830,
-        "luot_thich_2025": 229832,
-        "luot_thich_growth": 23,
-        "bai_viet_2024": 270,
-        "bai_viet_2025": 239,
-        "bai_viet_growth": -11,
-        "hoi_dap_2024": 9015,
-        "hoi_dap_2025": 9255,
-        "hoi_dap_growth": 3
-    },
-    "zalo": {
-        "luot_quan_tam_2024": 7035,
-        "luot_quan_tam_2025": 10005,
-        "luot_quan_tam_growth": 42,
-        "bai_viet_2024": 221,
-        "bai_viet_2025": 251,
-        "bai_viet_growth": 14
-    },
-    "youtube": {
-        "luot_dang_ky_2024": 163111,
-        "luot_dang_ky_2025": 189403,
-        "luot_dang_ky_growth": 16,
-        "video_2024": 156,
-        "video_2025": 174,
-        "video_growth": 12
-    },
-    "tiktok": {
-        "luot_dang_ky_2024": 0,
-        "luot_dang_ky_2025": 3585,
-        "luot_dang_ky_growth": 100,
-        "video_2024": 0,
-        "video_2025": 23,
-        "video_growth": 100
-    },
-    "an_pham": {
-        "loai_an_pham_2024": 15,
-        "loai_an_pham_2025": 140,
-        "loai_an_pham_growth": 833,
-        "so_luong_2024": 0,
-        "so_luong_2025": 300713,
-        "so_luong_growth": 100
-    }
-}
+def list_kpi_periods():
+    """Return available KPI periods (sub-directories of kpi_data), newest last"""
+    if not os.path.isdir(KPI_DATA_DIR):
+        return []
+    return sorted(
+        name for name in os.listdir(KPI_DATA_DIR)
+        if os.path.isdir(os.path.join(KPI_DATA_DIR, name))
+    )
 
-# Dữ liệu Phòng Công Tác Xã Hội
-ctxh_data = {
-    "ho_tro_nguoi_benh": {
-        "tu_van_nhap_vien": {"value": 24136, "comparison": 89.92, "unit": "Trường hợp"},
-        "tu_van_xuat_vien": {"value": 23636, "comparison": 93.53, "unit": "Trường hợp"},
-        "goi_dien_thoai": {"value": 4599, "comparison": 86, "unit": "Cuộc gọi"},
-        "tin_nhan_tai_kham": {"value": 20743, "comparison": 103.84, "unit": "Tin nhắn"},
-        "cai_dat_app": {"value": 23248, "comparison": 103, "unit": "Lượt"},
-        "ho_tro_kho_khan": {"value": 86, "comparison": 661, "unit": "Lượt người"},
-        "kinh_phi_ho_tro": {"value": 8575712876, "comparison": 395, "unit": "Đồng"},
-        "ho_tro_tam_ly": {"value": 254, "comparison": 49, "unit": "Lượt người"},
-        "chuong_trinh_ho_tro": {"value": 5, "comparison": 83.33, "unit": "Chương trình"},
-        "hai_long_noi_tru": {"value": 99.20, "comparison": 100.61, "unit": "%"}
-    },
-    "sinh_hoat_nha": {
-        "lan_sinh_hoat_cc": {"value": 246, "comparison": 95, "unit": "Lần"},
-        "nguoi_tham_du_cc": {"value": 6950, "comparison": 116, "unit": "Lượt người"},
-        "lan_sinh_hoat_gmhs": {"value": 250, "comparison": 96, "unit": "Lần"},
-        "nguoi_tham_du_gmhs": {"value": 14953, "comparison": 94, "unit": "Lượt người"},
-        "tu_van_phau_thuat": {"value": 3118, "comparison": 78.84, "unit": "Lượt người"},
-        "videocall": {"value": 5719, "comparison": 94, "unit": "Lượt người"}
-    },
-    "ho_tro_thuoc": {
-        "so_chuong_trinh": {"value": 12, "comparison": 100, "unit": "Chương trình"},
-        "nguoi_benh_tham_gia": {"value": 313, "comparison": 148.34, "unit": "Lượt người"},
-        "tien_tai_tro": {"value": 57942065779, "comparison": 186.22, "unit": "Đồng"}
-    },
-    "tiep_nhan_gop_y": {
-        "thu_khen": {"value": 294, "comparison": 108, "unit": "Thư"},
-        "thu_gop_y": {"value": 9, "comparison": 450, "unit": "Thư"},
-        "duong_day_byt": {"value": 0, "comparison": 100, "unit": "Trường hợp"},
-        "duong_day_gd": {"value": 82, "comparison": 97.62, "unit": "Trường hợp"}
-    },
-    "cham_soc_cong_dong": {
-        "tong_kinh_phi": {"value": 2178690356, "comparison": 77, "unit": "Đồng"},
-        "so_chuong_trinh": {"value": 10, "comparison": 91, "unit": "Chương trình"},
-        "luot_dan": {"value": 4062, "comparison": 103, "unit": "Lượt người"},
-        "me_vnah_tb": {"value": 12, "comparison": 66.67, "unit": "Lượt người"},
-        "nan_nhan_da_cam": {"value": 1000, "comparison": 142.86, "unit": "Lượt người"},
-        "tang_bo": {"value": 0, "comparison": 0, "unit": "Con"},
-        "tang_xe_dap": {"value": 36, "comparison": 120, "unit": "Cái"},
-        "so_tiet_kiem": {"value": 0, "comparison": 0, "unit": "Cái"},
-        "hoc_bong": {"value": 0, "comparison": 100, "unit": "Suất"},
-        "cong_trinh": {"value": 1, "comparison": 0, "unit": "Công trình"}
-    },
-    "van_dong_tai_tro": {
-        "so_tien": {"value": 65.9, "comparison": 173.88, "unit": "Đồng"}
-    }
-}
+def _add_derived_kpis(department, data):
+    """Tính sẵn các chỉ số dẫn xuất (tỷ lệ, tổng) khi nạp file"""
+    if department == "vttb":
+        sua_chua = data["sua_chua"]
+        sua_chua["ty_le_hoan_thanh"] = (
+            round(sua_chua["hoan_thanh"] / sua_chua["phat_sinh"] * 100, 1)
+            if sua_chua["phat_sinh"] else 0.0
+        )
+        trang_thai = data["trang_thai_tbyt"]
+        trang_thai["tong_tam_ngung"] = (
+            trang_thai["khac_phuc_tam_thoi"] + trang_thai["dang_sua_chua"] + trang_thai["thanh_ly"]
+        )
+    return data
 
-tcbc_data = {
-    "to_chuc": {
-        "phong_trung_tam": {"value": 16, "change": 0},
-        "khoa": {"value": 54, "change": -1, "detail": {"chinh": 42, "lien_ket": 10, "phu_thuoc": 2}},
-        "trung_tam": {"value": 6, "change": 0, "detail": {"chinh": 4, "lien_ket": 1, "phu_thuoc": 1}},
-        "don_nguyen": {"value": 30, "change": +1, "detail": {"chinh": 28, "lien_ket": 2, "phu_thuoc": 0}},
-        "don_vi": {"value": 6, "change": 0, "detail": {"chinh": 1, "lien_ket": 2, "phu_thuoc": 3}},
-        "tram": {"value": 1, "change": +1},
-        "hoi_dong": {"value": 27, "change": 0, "detail": {"chinh": 26, "phu_thuoc": 1}},
-        "to": {"value": 14, "change": 0, "detail": {"chinh": 12, "lien_ket": 1, "phu_thuoc": 1}},
-        "ban_tieu_ban": {"value": 21, "change": 0},
-        "mang_luoi": {"value": 17, "change": 0},
-        "sap_xep_don_vi": {
-            "thanh_lap": {"value": 1, "change": +1},
-            "doi_ten": {"value": 30, "change": +30},
-            "giai_the": {"value": 7, "change": +7}
-        }
-    },
-    "nhan_su": {
-        "thuong_xuyen": {"value": 3598, "change": +135, "detail": {"chinh": 3155, "lien_ket": 364, "phu_thuoc": 79}},
-        "vu_viec_toan_tg": {"value": 144, "change": -5, "detail": {"chinh": 114, "lien_ket": 24, "phu_thuoc": 6}},
-        "vu_viec_ban_tg": {"value": 637, "change": +33, "detail": {"chinh": 475, "lien_ket": 128, "phu_thuoc": 34}},
-        "bo_nhiem": {"value": 3, "change": +1},
-        "bo_nhiem_lai": {"value": 9, "change": +6},
-        "giao_phu_trach": {"value": 5, "change": +5, "detail": {"chinh": 3, "lien_ket": 2}},
-        "thoi_chuc_vu": {"value": 4, "change": +2, "detail": {"chinh": 2, "lien_ket": 2}},
-        "tuyen_dung": {"value": 105, "change": -46, "detail": {"chinh": 80, "lien_ket": 21, "phu_thuoc": 4}},
-        "cham_dut_hdld": {"value": 36, "change": -6, "detail": {"chinh": 35, "phu_thuoc": 1}},
-        
-        # THÊM DỮ LIỆU MỚI - CƠ CẤU NHÂN SỰ CHI TIẾT
-        "tong_nhan_su_3_co_so": {
-            "t6_2024": 4216,
-            "t6_2025": 4379,
-            "tang_giam": 163,
-            "tang_giam_percent": 3.87
-        },
-        "co_cau_trinh_do": {
-            "sau_dai_hoc": {
-                "t6_2024": 1158,
-                "t6_2025": 1236,
-                "tang_giam": 78,
-                "tang_giam_percent": 6.7
-            },
-            "dai_hoc": {
-                "t6_2024": 1331,
-                "t6_2025": 1514,
-                "tang_giam": 183,
-                "tang_giam_percent": 13.7
-            },
-            "cao_dang_trung_hoc": {
-                "t6_2024": 1129,
-                "t6_2025": 998,
-                "tang_giam": -131,
-                "tang_giam_percent": -11.6
-            },
-            "pho_thong_trung_hoc": {
-                "t6_2024": 598,
-                "t6_2025": 631,
-                "tang_giam": 33,
-                "tang_giam_percent": 5.5
-            }
-        },
-        "co_cau_chi_tiet": {
-            "giao_su": {"so_luong": 12, "ty_le": 0.27},
-            "pho_giao_su": {"so_luong": 86, "ty_le": 1.96},
-            "tien_si": {"so_luong": 146, "ty_le": 3.33},
-            "bac_sy_ck2": {"so_luong": 135, "ty_le": 3.08},
-            "thac_si": {"so_luong": 642, "ty_le": 14.66},
-            "bac_sy_ck1": {"so_luong": 215, "ty_le": 4.91},
-            "dai_hoc_chi_tiet": {"so_luong": 1514, "ty_le": 34.57},
-            "cao_dang": {"so_luong": 80, "ty_le": 1.83},
-            "trung_hoc": {"so_luong": 918, "ty_le": 20.96},
-            "nhan_vien_yte_khac": {"so_luong": 631, "ty_le": 14.41}
-        }
-    },
-    "dao_tao": {
-        "cu_dao_tao": {"value": 301, "change": +112, "detail": {"trong_nuoc": 255, "nuoc_ngoai": 46}},
-        "dao_tao_noi_bo": {
-            "so_lop": {"value": 7, "change": +3},
-            "luot_tham_gia": {"value": 617, "change": +166}
-        }
-    },
-    "khieu_nai_to_cao": {
-        "don_thu_khieu_nai": {"value": 1, "change": 0},
-        "don_thu_to_cao": {"value": 0, "change": 0},
-        "vu_viec_khoi_kien": {"value": 0, "change": 0},
-        "da_giai_quyet": {"value": 0, "change": 0},
-        "chua_giai_quyet": {"value": 0, "change": 0}
-    },
-    "thi_dua_khen_thuong": {
-        "khen_dinh_ky": {"value": 49, "change": 0, "detail": {"tap_the": 48, "ca_nhan": 1}},
-        "khen_dot_xuat": {"value": 983, "change": 0, "detail": {"tap_the": 812, "ca_nhan": 170, "phu_thuoc": 1}},
-        "sang_kien": {"value": 0, "change": 0},
-        "danh_gia": {"value": 0, "change": 0}
-    }
-}
+@st.cache_data(show_spinner=False, max_entries=64)
+def parse_kpi_file(department, period, file_hash, _raw):
+    """Validate a KPI file and precompute derived values.
 
-qttn_data = {
-    "hieu_suat_hoat_dong": {
-        "ty_le_hoan_thanh_de_nghi": {"value": 63, "target": 80},
-        "ty_le_hoan_thanh_sua_chua": {"value": 100, "target": 95},
-        "ty_le_hoan_thanh_ke_hoach": {"value": 70, "target": 85},
-        "ty_le_hoan_thanh_mua_sam": {"value": 78, "target": 80}
-    },
-    "chat_thai": {
-        "rac_thai_thong_thuong": {"value": 655, "unit": "tấn"},
-        "chat_thai_nguy_hai_lay_nhiem": {"value": 218.7, "unit": "tấn"},
-        "chat_thai_nguy_hai": {"value": 12.5, "unit": "tấn"},
-        "tai_che": {
-            "giay": {"value": 86.4, "unit": "tấn"},
-            "nhua": {"value": 12.9, "unit": "tấn"}
-        }
-    },
-    "kho_khi_y_te": {
-        "tong_hop": {
-            "ton_dau_ky": 17342225,
-            "nhap_trong_ky": 1519526118,
-            "xuat_trong_ky": 1514080998,
-            "ton_cuoi_ky": 22787345
-        },
-        "chi_tiet_ton_cuoi_ky": {
-            "argon_1m3": {"value": 218000, "quantity": 2, "unit": "VND/bình"},
-            "co2_25kg": {"value": 17070625, "quantity": 65, "unit": "VND/bình"},
-            "co2_8kg": {"value": 1512720, "quantity": 18, "unit": "VND/bình"},
-            "nitro_6m3": {"value": 1925000, "quantity": 25, "unit": "VND/bình"},
-            "oxy_lon_6m3": {"value": 1863000, "quantity": 36, "unit": "VND/bình"},
-            "oxy_nho_2m3": {"value": 198000, "quantity": 6, "unit": "VND/bình"}
-        },
-        "theo_thang": {
-            "ton_dau_ky": [17342225, 16176124, 16005975, 23232700, 21811794, 22746944],
-            "nhap": [260105615, 271425594, 222402147, 344070650, 204267338, 217254774],
-            "xuat": [261271716, 271595743, 215175422, 345491556, 203332188, 217214373],
-            "ton_cuoi_ky": [16176124, 16005975, 23232700, 21811794, 22746944, 22787345]
-        }
-    }
-}
+    Cached by content hash; _raw is not hashed by Streamlit (file_hash identifies it).
+    """
+    payload = json.loads(_raw.decode("utf-8"))
+    
+    if payload.get("schema_version") != KPI_SCHEMA_VERSION:
+        raise ValueError(f"{department}: schema_version không hợp lệ ({payload.get('schema_version')})")
+    if payload.get("department") != department:
+        raise ValueError(f"{department}: file khai báo phòng ban '{payload.get('department')}'")
+    if payload.get("period") != period:
+        raise ValueError(f"{department}: file khai báo kỳ '{payload.get('period')}', thư mục là '{period}'")
+    
+    data = payload.get("data")
+    if not isinstance(data, dict):
+        raise ValueError(f"{department}: thiếu mục 'data'")
+    missing = [section for section in KPI_REQUIRED_SECTIONS.get(department, []) if section not in data]
+    if missing:
+        raise ValueError(f"{department}: thiếu các mục {', '.join(missing)}")
+    
+    return _add_derived_kpis(department, data)
 
-# TABS CHÍNH - MỖI PHÒNG BAN MỘT TAB
-tab_vttb, tab_ksktyc, tab_cntt, tab_ctxh, tab_tttt, tab_tcbc, tab_qttn = st.tabs([
-    "🔧 Vật Tư Thiết Bị", 
-    "🩺 Khám Sức Khỏe Theo Yêu Cầu",
-    "💻 Công Nghệ Thông Tin",
-    "🤝 Công Tác Xã Hội",
-    "📱 Truyền Thông",
-    "👥 Tổ chức Cán bộ",
-    "🏢 Quản trị Tòa nhà"
-])
+def load_department_data(period):
+    """Load every department KPI file for a period; returns (data, errors)"""
+    data = {}
+    errors = {}
+    for department in KPI_REQUIRED_SECTIONS:
+        path = os.path.join(KPI_DATA_DIR, period, f"{department}.json")
+        try:
+            with open(path, "rb") as f:
+                raw = f.read()
+            data[department] = parse_kpi_file(department, period, hashlib.md5(raw).hexdigest(), raw)
+        except FileNotFoundError:
+            errors[department] = f"Không tìm thấy file {path}"
+        except (ValueError, KeyError, TypeError) as e:
+            errors[department] = str(e)
+    return data, errors
 
 # ==================== TAB PHÒNG VTTB ====================
-with tab_vttb:
+def render_vttb(vttb_data):
     st.markdown("""
     <div class="section-header">
         <h2>🔧 VẬT TƯ THIẾT BỊ</h2>
@@ -996,7 +705,7 @@ with tab_vttb:
             st.write("• Theo dõi tồn kho để tránh ứ đọng")
 
 # ==================== TAB KHOA KSKTYC ====================
-with tab_ksktyc:
+def render_ksktyc(ksktyc_data):
     st.markdown("""
     <div class="section-header">
         <h2>🩺 KHÁM SỨC KHỎE THEO YÊU CẦU</h2>
@@ -1168,7 +877,7 @@ with tab_ksktyc:
         st.write("• Cần mở rộng dịch vụ ngoại viện")
 
 # ==================== TAB PHÒNG CNTT ====================
-with tab_cntt:
+def render_cntt(cntt_data):
     st.markdown("""
     <div class="section-header">
         <h2>💻 CÔNG NGHỆ THÔNG TIN</h2>
@@ -1401,7 +1110,7 @@ with tab_cntt:
         st.write("• Đào tạo nhân viên sử dụng CNTT")
 
 # ==================== TAB PHÒNG CTXH ====================
-with tab_ctxh:
+def render_ctxh(ctxh_data):
     st.markdown("""
     <div class="section-header">
         <h2>🤝 CÔNG TÁC XÃ HỘI</h2>
@@ -1772,7 +1481,7 @@ with tab_ctxh:
         st.write("• Cải thiện dịch vụ tư vấn tâm lý")
 
 # ==================== TAB TRUNG TÂM TRUYỀN THÔNG ====================
-with tab_tttt:
+def render_tttt(tttt_data):
     st.markdown("""
     <div class="section-header">
         <h2>📱 HOẠT ĐỘNG TRUYỀN THÔNG</h2>
@@ -2192,7 +1901,7 @@ with tab_tttt:
         
 
 # ==================== TAB PHÒNG TỔ CHỨC CÁN BỘ ====================
-with tab_tcbc:
+def render_tcbc(tcbc_data):
     st.markdown("""
     <div class="section-header">
         <h2>👥 TỔ CHỨC CÁN BỘ</h2>
@@ -3070,7 +2779,7 @@ with tab_tcbc:
         st.write("• Xây dựng văn hóa doanh nghiệp")
         st.write("• Tăng cường gắn kết nội bộ")
 
-with tab_qttn:
+def render_qttn(qttn_data):
     st.markdown("""
     <div class="section-header">
         <h2>🏢 QUẢN TRỊ TÒA NHÀ</h2>
@@ -3667,10 +3376,69 @@ with tab_qttn:
         st.write("• **Nâng cao năng lực** dự báo nhu cầu")
 
 # Footer
-st.markdown("---")
-st.markdown(f"""
-<div style='text-align: center; color: gray; padding: 20px;'>
-    <p>🏥 Dashboard Bệnh Viện Multi-Department - VTTB | KSKTYC | CNTT | CTXH | TTTT 📊 Dữ liệu 6 tháng đầu năm 2025</p>
-    <p>Cập nhật lần cuối: {datetime.now().strftime('%d/%m/%Y %H:%M')}</p>
-</div>
-""", unsafe_allow_html=True)
\ No newline at end of file
+def render_footer():
+    """Render dashboard footer"""
+    st.markdown("---")
+    st.markdown(f"""
+    <div style='text-align: center; color: gray; padding: 20px;'>
+        <p>🏥 Dashboard Bệnh Viện Multi-Department - VTTB | KSKTYC | CNTT | CTXH | TTTT 📊 Dữ liệu 6 tháng đầu năm 2025</p>
+        <p>Cập nhật lần cuối: {datetime.now().strftime('%d/%m/%Y %H:%M')}</p>
+    </div>
+    """, unsafe_allow_html=True)
+# ================== PHÒNG BAN & ENTRY POINT ==================
+# (key dữ liệu, nhãn hiển thị, hàm render) - theo thứ tự tab cũ
+DEPARTMENTS = [
+    ("vttb", "🔧 Vật Tư Thiết Bị", render_vttb),
+    ("ksktyc", "🩺 Khám Sức Khỏe Theo Yêu Cầu", render_ksktyc),
+    ("cntt", "💻 Công Nghệ Thông Tin", render_cntt),
+    ("ctxh", "🤝 Công Tác Xã Hội", render_ctxh),
+    ("tttt", "📱 Truyền Thông", render_tttt),
+    ("tcbc", "👥 Tổ chức Cán bộ", render_tcbc),
+    ("qttn", "🏢 Quản trị Tòa nhà", render_qttn),
+]
+
+def render():
+    """Render the UMC multi-department dashboard (only the selected department is built)"""
+    apply_custom_css()
+    render_header()
+    
+    # Chọn phòng ban - thay cho st.tabs để chỉ tạo biểu đồ của phòng ban đang xem
+    labels = [label for _, label, _ in DEPARTMENTS]
+    selected_label = st.radio(
+        "Phòng ban",
+        labels,
+        horizontal=True,
+        key="umc_department",
+        label_visibility="collapsed"
+    )
+    
+    # Kỳ số liệu: mặc định kỳ mới nhất trong kpi_data
+    periods = list_kpi_periods()
+    if not periods:
+        st.error(f"❌ Không tìm thấy dữ liệu KPI trong {KPI_DATA_DIR}")
+        render_footer()
+        return
+    period = periods[-1]
+    if len(periods) > 1:
+        period = st.selectbox("📅 Kỳ số liệu", periods, index=len(periods) - 1, key="umc_kpi_period")
+    
+    data, errors = load_department_data(period)
+    for data_key, label, render_department in DEPARTMENTS:
+        if label == selected_label:
+            if data_key in errors:
+                st.error(f"❌ Lỗi dữ liệu KPI {label}: {errors[data_key]}")
+            else:
+                render_department(data[data_key])
+            break
+    
+    render_footer()
+
+if __name__ == "__main__":
+    # Cấu hình trang
+    st.set_page_config(
+        page_title="Dashboard Bệnh Viện - Multi Department",
+        page_icon="🏥",
+        layout="wide",
+        initial_sidebar_state="collapsed"
+    )
+    render()
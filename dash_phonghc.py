@@ -7,14 +7,26 @@ import os
 from dotenv import load_dotenv
 import sys
 from datetime import datetime
+from collections import OrderedDict
 import json
 import base64
+import hashlib
+import threading
+import time
+from io import BytesIO
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
+from static_assets import inject_css, get_logo_data_uri
+from github_batch import GitHubBatchCommitter, GitHubBatchError, resolve_api_base
+import columnar_json
+from perf_timing import timed_run, timed_section
+
     
-st.markdown("""
+def apply_custom_css():
+    """Inject the dashboard CSS (must be emitted on every rerun)"""
+    inject_css("""
 <style>
     @import url('https://fonts.googleapis.com/css2?family=IBM+Plex+Serif:wght@400;700&display=swap');
     .stDataFrame {
@@ -166,7 +178,7 @@ st.markdown("""
     .status-loading { background-color: #ffc107; }
     .status-offline { background-color: #dc3545; }
 </style>
-""", unsafe_allow_html=True)
+    """)
 
 # ================== DATA MANAGER CLASS ==================
 class DataManager:
@@ -177,27 +189,39 @@ class DataManager:
     - Optimized cho storage
     """
     
-    def __init__(self):
+    def __init__(self, api_base=None):
         self.github_token = st.secrets.get("github_token", None)
         self.github_owner = st.secrets.get("github_owner", None)
         self.github_repo = st.secrets.get("github_repo", None)
+        # URL gốc GitHub API (ghi đè được để chạy với server giả lập)
+        self.api_base = resolve_api_base(api_base or st.secrets.get("github_api_base", None))
         
         # File naming strategy
-        self.current_data_file = "current_dashboard_data.json"
+        # Dữ liệu dạng cột nén gzip; file .json cũ (định dạng records) chỉ còn được đọc khi chưa có file mới
+        self.current_data_file = "current_dashboard_data.json.gz"
+        self.legacy_data_file = "current_dashboard_data.json"
         self.metadata_file = "upload_metadata.json"
         self.backup_prefix = "backup_"
+        self.backup_dir = "backups"
         
         # Settings
         self.keep_backups = 2
+        self.last_cleanup = None
         self.max_file_size_mb = 25
+        
+        # Phiên bản dữ liệu trên GitHub (đọc từ metadata), kiểm tra lại tối đa mỗi version_check_interval giây
+        self.version_check_interval = 60
+        self._data_version = None
+        self._version_checked_at = None
     
+    @timed_section()
     def check_github_connection(self):
         """Kiểm tra kết nối GitHub"""
         if not all([self.github_token, self.github_owner, self.github_repo]):
             return False, "❌ Chưa cấu hình GitHub credentials"
         
         try:
-            url = f"https://api.github.com/repos/{self.github_owner}/{self.github_repo}"
+            url = f"{self.api_base}/repos/{self.github_owner}/{self.github_repo}"
             headers = {"Authorization": f"token {self.github_token}"}
             response = requests.get(url, headers=headers, timeout=10)
             
@@ -212,7 +236,7 @@ class DataManager:
     def get_current_file_info(self):
         """Lấy thông tin file hiện tại"""
         try:
-            metadata_url = f"https://api.github.com/repos/{self.github_owner}/{self.github_repo}/contents/{self.metadata_file}"
+            metadata_url = f"{self.api_base}/repos/{self.github_owner}/{self.github_repo}/contents/{self.metadata_file}"
             headers = {"Authorization": f"token {self.github_token}"}
             
             response = requests.get(metadata_url, headers=headers)
@@ -228,17 +252,40 @@ class DataManager:
         
         return None
     
+    def get_data_version(self, force=False):
+        """Định danh bản dữ liệu hiện tại trên GitHub (lấy từ upload_metadata.json, không tải dữ liệu)
+        
+        Dùng làm khóa để biết có cần tải/xử lý lại dữ liệu hay không.
+        """
+        now = time.time()
+        if force or self._version_checked_at is None or now - self._version_checked_at > self.version_check_interval:
+            metadata = self.get_current_file_info() or {}
+            self._data_version = metadata.get('data_version') or (metadata.get('filename'), metadata.get('upload_time'))
+            self._version_checked_at = now
+        return self._data_version
+    
+    def _get_committer(self):
+        """Committer Git Data API: ghi nhiều file trong một commit"""
+        return GitHubBatchCommitter(self.github_token, self.github_owner, self.github_repo, api_base=self.api_base)
+    
     def create_backup_of_current_file(self):
-        """Backup file hiện tại trước khi xóa"""
+        """Chuẩn bị backup file hiện tại (được commit cùng lúc với file mới)
+        
+        Backup là một entry mới trong tree trỏ tới blob SHA của file hiện tại,
+        nên không phải tải xuống/tải lên lại nội dung dù dữ liệu lớn đến đâu.
+        
+        Returns:
+            (backup_filename, blob_sha) hoặc (None, None) nếu chưa có file hiện tại
+        """
         try:
-            current_url = f"https://api.github.com/repos/{self.github_owner}/{self.github_repo}/contents/{self.current_data_file}"
-            headers = {"Authorization": f"token {self.github_token}"}
-            
-            response = requests.get(current_url, headers=headers)
-            
-            if response.status_code == 200:
-                file_data = response.json()
-                
+            committer = self._get_committer()
+            source_file = self.current_data_file
+            blob_sha = committer.get_blob_sha(source_file)
+            if not blob_sha:
+                source_file = self.legacy_data_file
+                blob_sha = committer.get_blob_sha(source_file)
+            
+            if blob_sha:
                 current_metadata = self.get_current_file_info()
                 if current_metadata:
                     upload_time = current_metadata.get('upload_time', datetime.now().isoformat())
@@ -246,67 +293,72 @@ class DataManager:
                 else:
                     backup_timestamp = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
                 
-                backup_filename = f"{self.backup_prefix}{backup_timestamp}.json"
-                
-                backup_url = f"https://api.github.com/repos/{self.github_owner}/{self.github_repo}/contents/{backup_filename}"
-                
-                backup_payload = {
-                    "message": f"📦 Backup before new upload - {backup_timestamp}",
-                    "content": file_data['content'],
-                    "branch": "main"
-                }
-                
-                backup_response = requests.put(backup_url, headers=headers, json=backup_payload)
-                
-                if backup_response.status_code == 201:
-                    st.info(f"📦 Đã backup file cũ: {backup_filename}")
-                    return backup_filename
+                # Giữ đuôi file nguồn (.json.gz hoặc .json cũ) để biết định dạng của backup
+                extension = ".json.gz" if source_file.endswith(".gz") else ".json"
+                backup_filename = f"{self.backup_dir}/{self.backup_prefix}{backup_timestamp}{extension}"
+                return backup_filename, blob_sha
                     
         except Exception as e:
             st.warning(f"Không thể backup file cũ: {str(e)}")
         
-        return None
+        return None, None
+    
+    def list_backups(self, committer=None):
+        """Đường dẫn các backup, mới nhất trước
+        
+        Gồm thư mục backups/ và các file backup_*.json ở thư mục gốc do phiên bản cũ tạo ra.
+        """
+        committer = committer or self._get_committer()
+        root = committer.list_tree()
+        backups = [
+            name for name, entry in root.items()
+            if entry["type"] == "blob" and name.startswith(self.backup_prefix)
+        ]
+        backup_tree = root.get(self.backup_dir)
+        if backup_tree and backup_tree["type"] == "tree":
+            backups += [
+                f"{self.backup_dir}/{name}" for name, entry in committer.list_tree(tree_sha=backup_tree["sha"]).items()
+                if entry["type"] == "blob" and name.startswith(self.backup_prefix)
+            ]
+        # Tên file chứa timestamp (dạng 2025-01-02T03-04-05 hoặc 2025-01-02_03-04-05) -> sắp xếp theo tên file
+        return sorted(backups, key=lambda path: path.rpartition("/")[2].replace("T", "_"), reverse=True)
     
     def cleanup_old_backups(self):
-        """Xóa các backup cũ, chỉ giữ lại số lượng nhất định"""
-        try:
-            contents_url = f"https://api.github.com/repos/{self.github_owner}/{self.github_repo}/contents"
-            headers = {"Authorization": f"token {self.github_token}"}
-            
-            response = requests.get(contents_url, headers=headers)
-            
-            if response.status_code == 200:
-                files = response.json()
-                
-                backup_files = [f for f in files if f['name'].startswith(self.backup_prefix)]
-                backup_files.sort(key=lambda x: x['name'], reverse=True)
-                files_to_delete = backup_files[self.keep_backups:]
-                
-                deleted_count = 0
-                for file_to_delete in files_to_delete:
-                    try:
-                        delete_url = f"https://api.github.com/repos/{self.github_owner}/{self.github_repo}/contents/{file_to_delete['name']}"
-                        
-                        delete_payload = {
-                            "message": f"🗑️ Auto cleanup old backup: {file_to_delete['name']}",
-                            "sha": file_to_delete['sha'],
-                            "branch": "main"
-                        }
-                        
-                        delete_response = requests.delete(delete_url, headers=headers, json=delete_payload)
-                        
-                        if delete_response.status_code == 200:
-                            deleted_count += 1
-                            
-                    except Exception as e:
-                        continue
-                
-                if deleted_count > 0:
-                    st.info(f"🗑️ Đã xóa {deleted_count} backup cũ")
-                    
-        except Exception as e:
-            st.warning(f"Không thể cleanup backups: {str(e)}")
+        """Xóa các backup cũ, chỉ giữ lại số lượng nhất định
+        
+        Liệt kê backup (backups/ và backup_*.json cũ ở thư mục gốc) và xóa tất cả backup hết hạn trong một commit.
+        
+        Returns:
+            int: Số backup đã xóa
+        """
+        committer = self._get_committer()
+        expired = self.list_backups(committer)[self.keep_backups:]
+        
+        if expired:
+            committer.commit_files(
+                {},
+                f"🗑️ Auto cleanup {len(expired)} old backup(s)",
+                deletions=expired
+            )
+        return len(expired)
     
+    def cleanup_old_backups_async(self):
+        """Dọn backup trong thread nền để không chặn lượt chạy Streamlit
+        
+        Kết quả được lưu vào self.last_cleanup và hiển thị ở lượt chạy sau.
+        """
+        def worker():
+            try:
+                deleted_count = self.cleanup_old_backups()
+                self.last_cleanup = f"🗑️ Đã xóa {deleted_count} backup cũ" if deleted_count else None
+            except Exception as e:
+                self.last_cleanup = f"⚠️ Không thể cleanup backups: {str(e)}"
+        
+        thread = threading.Thread(target=worker, name="backup-cleanup", daemon=True)
+        thread.start()
+        return thread
+    
+    @timed_section()
     def upload_new_file(self, data, filename):
         """Upload file mới với auto-cleanup"""
         
@@ -319,69 +371,65 @@ class DataManager:
             st.info("🔄 Bắt đầu upload file mới...")
             
             with st.spinner("📦 Đang backup file cũ..."):
-                backup_filename = self.create_backup_of_current_file()
+                backup_filename, backup_sha = self.create_backup_of_current_file()
             
             with st.spinner("📊 Đang chuẩn bị dữ liệu..."):
-                new_data_package = {
-                    'data': data.to_dict('records'),
-                    'columns': list(data.columns),
-                    'metadata': {
-                        'filename': filename,
-                        'upload_time': datetime.now().isoformat(),
-                        'week_number': datetime.now().isocalendar()[1],
-                        'year': datetime.now().year,
-                        'row_count': len(data),
-                        'file_size_mb': round(len(str(data)) / (1024*1024), 2),
-                        'uploader': 'admin',
-                        'replaced_backup': backup_filename
-                    }
+                metadata = {
+                    'filename': filename,
+                    'upload_time': datetime.now().isoformat(),
+                    'week_number': datetime.now().isocalendar()[1],
+                    'year': datetime.now().year,
+                    'row_count': len(data),
+                    'file_size_mb': None,
+                    'uploader': 'admin',
+                    'replaced_backup': backup_filename,
+                    'format': columnar_json.FORMAT_NAME,
+                    # Phiên bản nội dung, dashboard dùng luôn khi tải lại (không phải hash lại dữ liệu)
+                    'data_version': source_data_version(data)
                 }
                 
-                json_content = json.dumps(new_data_package, ensure_ascii=False, indent=2)
-                size_mb = len(json_content.encode()) / (1024*1024)
+                # Dạng cột + mã hóa từ điển + gzip; kích thước thực (byte) ghi vào upload_metadata.json
+                json_content = columnar_json.encode_frame(data, metadata=metadata, compress=True)
+                size_mb = len(json_content) / (1024*1024)
+                metadata['file_size_mb'] = round(size_mb, 2)
                 
                 if size_mb > self.max_file_size_mb:
                     st.error(f"❌ File quá lớn ({size_mb:.1f}MB). Giới hạn {self.max_file_size_mb}MB")
                     return False
             
             with st.spinner("☁️ Đang upload file mới..."):
-                content_encoded = base64.b64encode(json_content.encode()).decode()
-                
-                current_url = f"https://api.github.com/repos/{self.github_owner}/{self.github_repo}/contents/{self.current_data_file}"
-                headers = {"Authorization": f"token {self.github_token}"}
-                
-                current_response = requests.get(current_url, headers=headers)
-                current_sha = None
-                if current_response.status_code == 200:
-                    current_sha = current_response.json()['sha']
-                
-                upload_payload = {
-                    "message": f"📊 Data update - Tuần {new_data_package['metadata']['week_number']}/{new_data_package['metadata']['year']}",
-                    "content": content_encoded,
-                    "branch": "main"
+                # Dữ liệu mới + metadata + backup (copy blob phía server) trong cùng một commit
+                files = {
+                    self.current_data_file: json_content,
+                    self.metadata_file: json.dumps(metadata, ensure_ascii=False, indent=2),
                 }
+                copies = {backup_filename: backup_sha} if backup_filename else None
                 
-                if current_sha:
-                    upload_payload["sha"] = current_sha
-                
-                upload_response = requests.put(current_url, headers=headers, json=upload_payload)
-                
-                if upload_response.status_code not in [200, 201]:
-                    st.error(f"❌ Lỗi upload: {upload_response.status_code}")
+                try:
+                    self._get_committer().commit_files(
+                        files,
+                        f"📊 Data update - Tuần {metadata['week_number']}/{metadata['year']}",
+                        copies=copies
+                    )
+                except GitHubBatchError as e:
+                    st.error(f"❌ Lỗi upload: {str(e)}")
                     return False
+                
+                if backup_filename:
+                    st.info(f"📦 Đã backup file cũ: {backup_filename}")
             
-            with st.spinner("📝 Đang cập nhật metadata..."):
-                self.update_metadata(new_data_package['metadata'])
+            # Dữ liệu đã đổi: lần rerun sau đọc lại phiên bản từ metadata
+            self._version_checked_at = None
             
-            with st.spinner("🗑️ Đang dọn dẹp backup cũ..."):
-                self.cleanup_old_backups()
+            # Dọn backup cũ ở thread nền
+            self.cleanup_old_backups_async()
             
             st.success(f"""
             🎉 **UPLOAD THÀNH CÔNG!**
             
             ✅ **File mới:** {filename}
             ✅ **Dữ liệu:** {len(data):,} dòng ({size_mb:.1f}MB)
-            ✅ **Tuần:** {new_data_package['metadata']['week_number']}/{new_data_package['metadata']['year']}
+            ✅ **Tuần:** {metadata['week_number']}/{metadata['year']}
             ✅ **Backup:** {backup_filename if backup_filename else 'Không có file cũ'}
             
             📱 **Dữ liệu đã được lưu trên cloud!**
@@ -396,45 +444,38 @@ class DataManager:
     def update_metadata(self, metadata):
         """Cập nhật file metadata"""
         try:
-            metadata_url = f"https://api.github.com/repos/{self.github_owner}/{self.github_repo}/contents/{self.metadata_file}"
-            headers = {"Authorization": f"token {self.github_token}"}
-            
-            current_response = requests.get(metadata_url, headers=headers)
-            current_sha = None
-            if current_response.status_code == 200:
-                current_sha = current_response.json()['sha']
-            
             metadata_content = json.dumps(metadata, ensure_ascii=False, indent=2)
-            content_encoded = base64.b64encode(metadata_content.encode()).decode()
-            
-            payload = {
-                "message": f"📝 Update metadata - Tuần {metadata['week_number']}/{metadata['year']}",
-                "content": content_encoded,
-                "branch": "main"
-            }
-            
-            if current_sha:
-                payload["sha"] = current_sha
-            
-            requests.put(metadata_url, headers=headers, json=payload)
+            self._get_committer().commit_files(
+                {self.metadata_file: metadata_content},
+                f"📝 Update metadata - Tuần {metadata['week_number']}/{metadata['year']}"
+            )
             
         except Exception as e:
             st.warning(f"Không thể update metadata: {str(e)}")
     
+    def _download_raw(self, path):
+        """Tải nội dung file trên GitHub (bytes), None nếu không có"""
+        url = f"{self.api_base}/repos/{self.github_owner}/{self.github_repo}/contents/{path}"
+        # raw: tải nội dung trực tiếp (không base64, không giới hạn 1MB của contents API)
+        headers = {"Authorization": f"token {self.github_token}", "Accept": "application/vnd.github.v3.raw"}
+        response = requests.get(url, headers=headers)
+        return response.content if response.status_code == 200 else None
+    
+    @timed_section()
     def load_current_data(self):
-        """Load dữ liệu hiện tại"""
+        """Load dữ liệu hiện tại (file .json.gz dạng cột; nếu chưa có thì đọc file .json định dạng cũ)"""
         try:
-            current_url = f"https://api.github.com/repos/{self.github_owner}/{self.github_repo}/contents/{self.current_data_file}"
-            headers = {"Authorization": f"token {self.github_token}"}
+            raw = self._download_raw(self.current_data_file)
+            if raw is None:
+                raw = self._download_raw(self.legacy_data_file)
             
-            response = requests.get(current_url, headers=headers)
-            
-            if response.status_code == 200:
-                file_data = response.json()
-                content = base64.b64decode(file_data['content']).decode()
-                data_package = json.loads(content)
+            if raw is not None:
+                data_package = columnar_json.loads_payload(raw)
                 
-                df = pd.DataFrame(data_package['data'], columns=data_package['columns'])
+                if columnar_json.is_columnar(data_package):
+                    df = columnar_json.columnar_to_frame(data_package)
+                else:
+                    df = pd.DataFrame(data_package['data'], columns=data_package['columns'])
                 
                 return df, data_package['metadata']
             
@@ -446,7 +487,7 @@ class DataManager:
     def get_storage_info(self):
         """Lấy thông tin storage usage"""
         try:
-            contents_url = f"https://api.github.com/repos/{self.github_owner}/{self.github_repo}/contents"
+            contents_url = f"{self.api_base}/repos/{self.github_owner}/{self.github_repo}/contents"
             headers = {"Authorization": f"token {self.github_token}"}
             
             response = requests.get(contents_url, headers=headers)
@@ -455,7 +496,7 @@ class DataManager:
                 files = response.json()
                 
                 total_size = sum(f.get('size', 0) for f in files)
-                backup_files = [f for f in files if f['name'].startswith(self.backup_prefix)]
+                backup_files = self.list_backups()
                 
                 return {
                     'total_files': len(files),
@@ -469,10 +510,295 @@ class DataManager:
         
         return None
 
+# ================== SPARKLINE (BATCHED, INLINE SVG) ==================
+def frame_version(df):
+    """Return a short content hash of a numeric frame, used as a cache key"""
+    if df is None:
+        return None
+    row_hashes = pd.util.hash_pandas_object(df, index=True).values
+    digest = hashlib.md5(row_hashes.tobytes())
+    digest.update(repr(list(df.columns)).encode('utf-8'))
+    return digest.hexdigest()
+
+
+# Các cột xác định nội dung dữ liệu (dùng cho data_version)
+VERSION_COLUMNS = ['Danh mục', 'Nội dung', 'Năm', 'Tháng', 'Tuần', 'Số liệu']
+
+
+def normalize_source_frame(df):
+    """
+    Chuẩn hóa DataFrame đọc từ Excel/GitHub: bỏ khoảng trắng tên cột, ép kiểu số, thêm cột Năm nếu thiếu
+    
+    Dùng chung cho lúc upload và lúc nạp dashboard để data_version tính ở hai nơi khớp nhau.
+    """
+    data = df.copy()
+    data.columns = data.columns.str.strip()
+    
+    # Chuyển đổi kiểu dữ liệu
+    data['Tuần'] = pd.to_numeric(data['Tuần'], errors='coerce')
+    data['Tháng'] = pd.to_numeric(data['Tháng'], errors='coerce')
+    data['Số liệu'] = pd.to_numeric(data['Số liệu'], errors='coerce')
+    
+    # Thêm cột năm (có thể điều chỉnh theo dữ liệu thực tế)
+    if 'Năm' not in data.columns:
+        data['Năm'] = datetime.now().year
+    
+    return data
+
+
+def source_data_version(df):
+    """data_version của dữ liệu gốc (sau chuẩn hóa, trước khi sắp xếp theo thứ tự ưu tiên)"""
+    return frame_version(normalize_source_frame(df)[VERSION_COLUMNS])
+
+
+def build_sparkline_svg(values, width=200, height=40):
+    """Build a sparkline as an inline SVG data URI (line + max/min markers)"""
+    values = np.nan_to_num(np.asarray(values, dtype=float))
+    if values.size == 0:
+        return ""
+    
+    pad = 4
+    if values.size == 1:
+        xs = np.array([width / 2])
+    else:
+        xs = np.linspace(pad, width - pad, values.size)
+    
+    v_min, v_max = values.min(), values.max()
+    span = v_max - v_min
+    if span == 0:
+        ys = np.full(values.size, height / 2)
+    else:
+        ys = height - pad - (values - v_min) / span * (height - 2 * pad)
+    
+    points = " ".join(f"{x:.1f},{y:.1f}" for x, y in zip(xs, ys))
+    parts = [
+        f"<svg xmlns='http://www.w3.org/2000/svg' width='{width}' height='{height}' viewBox='0 0 {width} {height}'>",
+        f"<polyline fill='none' stroke='royalblue' stroke-width='2' points='{points}'/>",
+    ]
+    
+    # Highlight max/min
+    if v_max > 0:
+        max_idx = int(np.argmax(values))
+        min_idx = int(np.argmin(values))
+        parts.append(f"<circle cx='{xs[max_idx]:.1f}' cy='{ys[max_idx]:.1f}' r='3' fill='green'/>")
+        parts.append(f"<circle cx='{xs[min_idx]:.1f}' cy='{ys[min_idx]:.1f}' r='3' fill='red'/>")
+    
+    parts.append("</svg>")
+    svg = "".join(parts)
+    return "data:image/svg+xml;base64," + base64.b64encode(svg.encode('utf-8')).decode('ascii')
+
+
+def format_number_array(values):
+    """Vectorised number formatting for the pivot view: '.' groups thousands, ',' marks decimals.
+
+    Whole numbers have no decimals, others keep one (1234 -> '1.234', 1234.5 -> '1.234,5').
+    Returns an object array of the same shape; non-finite values stay NaN.
+    """
+    arr = np.asarray(values, dtype=float)
+    out = np.full(arr.shape, np.nan, dtype=object)
+    finite = np.isfinite(arr)
+    if not finite.any():
+        return out
+    
+    rounded = np.round(arr[finite], 1)
+    magnitude = np.abs(rounded)
+    whole = np.floor(magnitude)
+    tenths = np.rint((magnitude - whole) * 10).astype(np.int64)
+    
+    digits = pd.Series(whole.astype(np.int64).astype(str)).str.replace(r'\B(?=(\d{3})+(?!\d))', '.', regex=True)
+    sign = np.where(rounded < 0, '-', '')
+    decimals = np.where(tenths > 0, np.char.add(',', tenths.astype(str)), '')
+    out[finite] = np.char.add(np.char.add(sign, digits.to_numpy(dtype=str)), decimals)
+    return out
+
+
+def format_change_suffix(ratios):
+    """Vectorised week-over-week badge ('(↑12.5%)' / '(↓3.0%)' / '↑∞%'); '' where there is no change"""
+    arr = np.asarray(ratios, dtype=float)
+    percent = np.char.mod('%.1f%%', np.abs(np.nan_to_num(arr)))
+    up = np.char.add(np.char.add(" <span class='positive-change'>(↑", percent), ")</span>")
+    down = np.char.add(np.char.add(" <span class='negative-change'>(↓", percent), ")</span>")
+    return np.where(
+        arr == 999, " <span class='positive-change'>↑∞%</span>",  # 999 = tăng từ 0 (vô hạn)
+        np.where(arr > 0, up, np.where(arr < 0, down, ''))
+    )
+
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def render_sparkline_table_html(category, data_version, _values, _contents, _totals):
+    """Render all sparklines of a category as one HTML table.
+
+    Cached per (category, data_version); the underscore arguments are not hashed
+    because data_version already identifies the numeric data they come from.
+    """
+    parts = ["<table style='width:100%; border-collapse: collapse; font-size: 14px;'>",
+             "<tr style='background-color: #f0f2f6;'>",
+             "<th style='border: 1px solid #ddd; padding: 6px; text-align: left;'>Nội dung</th>",
+             "<th style='border: 1px solid #ddd; padding: 6px; text-align: center;'>Xu hướng</th>",
+             "<th style='border: 1px solid #ddd; padding: 6px; text-align: right;'>Tổng hàng</th>",
+             "</tr>"]
+    
+    for content, row_values, total in zip(_contents, _values, _totals):
+        total_text = total if isinstance(total, str) else format_number_array([total])[0]
+        parts.append("<tr>")
+        parts.append(f"<td style='border: 1px solid #ddd; padding: 6px;'>📄 {content}</td>")
+        parts.append(f"<td style='border: 1px solid #ddd; padding: 2px; text-align: center;'><img src='{build_sparkline_svg(row_values)}'/></td>")
+        parts.append(f"<td style='border: 1px solid #ddd; padding: 6px; text-align: right; font-weight: bold;'>{total_text}</td>")
+        parts.append("</tr>")
+    
+    parts.append("</table>")
+    return "".join(parts)
+
+# ================== PIVOT RESULT (SỐ LIỆU + VIEW FORMAT) ==================
+class PivotResult:
+    """Kết quả pivot dạng số: giá trị, tỷ lệ so với tuần trước và cột tổng.
+
+    Biểu đồ, xuất file và tổng đọc trực tiếp các ma trận số; bảng HTML chỉ được
+    format khi truy cập `formatted` lần đầu.
+    """
+    
+    def __init__(self, values, ratios=None, totals=None, total_methods=None, formatter=None):
+        self.values = values                # DataFrame số (dòng x kỳ)
+        self.ratios = ratios                # % thay đổi so với tuần trước (cùng shape) hoặc None
+        self.totals = totals                # Series tổng theo smart aggregation
+        self.total_methods = total_methods  # Series phương pháp tính tổng từng dòng
+        self._formatter = formatter
+        self._formatted = None
+        self._version = None
+    
+    @property
+    def formatted(self):
+        """View đã format (chuỗi/HTML) kèm cột Tổng - tạo lazily"""
+        if self._formatted is None and self._formatter is not None:
+            self._formatted = self._formatter(self)
+        return self._formatted
+    
+    @property
+    def version(self):
+        """Hash nội dung của ma trận số - dùng làm khóa cache"""
+        if self._version is None:
+            self._version = frame_version(self.values)
+        return self._version
+
+# ================== EXCEL EXPORT (IN-MEMORY, CONSTANT MEMORY) ==================
+EXCEL_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def _flatten_export_frame(df, index=True):
+    """Đưa index vào cột và gộp header nhiều tầng thành một dòng"""
+    frame = df.reset_index() if index else df
+    frame = frame.copy(deep=False)
+    frame.columns = [
+        " - ".join(str(part) for part in col if str(part) != "") if isinstance(col, tuple) else str(col)
+        for col in frame.columns
+    ]
+    return frame
+
+
+def build_excel_bytes(sheets):
+    """Build an .xlsx workbook in memory from (sheet_name, frame, index) tuples.
+
+    xlsxwriter's constant_memory mode flushes each row as soon as the next one
+    starts, so rows are written strictly in order with write_row (pandas'
+    to_excel writes column by column, which that mode does not support).
+    """
+    import xlsxwriter
+
+    buffer = BytesIO()
+    workbook = xlsxwriter.Workbook(buffer, {'constant_memory': True})
+    header_format = workbook.add_format({'bold': True, 'bg_color': '#f0f2f6', 'border': 1})
+
+    for sheet_name, df, index in sheets:
+        frame = _flatten_export_frame(df, index)
+        worksheet = workbook.add_worksheet(sheet_name[:31])
+        worksheet.write_row(0, 0, list(frame.columns), header_format)
+
+        # object + None: NaN thành ô trống, số numpy thành số Python
+        rows = frame.astype(object).where(frame.notna(), None).values.tolist()
+        for row_number, row in enumerate(rows, start=1):
+            worksheet.write_row(row_number, 0, row)
+
+    workbook.close()
+    return buffer.getvalue()
+
+
+# ================== EXCEL INGESTION (PARSE ONCE) ==================
+# Các cột dashboard cần; cột khác trong workbook không được đọc
+EXCEL_COLUMNS = ('Tuần', 'Tháng', 'Năm', 'Danh mục', 'Nội dung', 'Số liệu')
+
+
+def get_excel_engine():
+    """Return "calamine" when python-calamine is installed, else None (pandas default: openpyxl read-only)"""
+    try:
+        import python_calamine  # noqa: F401
+        return "calamine"
+    except ImportError:
+        return None
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def parse_excel_bytes(file_hash, _raw, engine):
+    """Parse a workbook once per content hash, keeping only EXCEL_COLUMNS"""
+    return pd.read_excel(
+        BytesIO(_raw),
+        engine=engine,
+        usecols=lambda column: str(column).strip() in EXCEL_COLUMNS
+    )
+
+
+def read_excel_once(file):
+    """
+    Đọc file Excel (đường dẫn hoặc file upload) qua cache theo hash nội dung
+    
+    Returns:
+        (DataFrame, số giây đọc, engine)
+    """
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, 'rb') as f:
+            raw = f.read()
+    else:
+        raw = file.getvalue() if hasattr(file, 'getvalue') else file.read()
+    
+    engine = get_excel_engine()
+    started = time.perf_counter()
+    df = parse_excel_bytes(hashlib.md5(raw).hexdigest(), raw, engine)
+    return df, time.perf_counter() - started, engine or "openpyxl"
+
+
+def get_cached_dashboard(source_key, load):
+    """
+    PivotTableDashboard đã xử lý (dữ liệu, tỷ lệ tuần trước, chỉ mục lọc, data_version) giữ trong session_state
+    
+    Chỉ xử lý lại khi nguồn dữ liệu đổi (source_key: phiên bản trên GitHub, hash file upload,
+    đường dẫn + mtime), nên các lần rerun do kéo slider/đổi bộ lọc không dựng lại chỉ mục.
+    
+    Args:
+        source_key: Định danh nguồn dữ liệu
+        load: Hàm load(dashboard) -> bool, nạp dữ liệu vào dashboard mới
+    
+    Returns:
+        PivotTableDashboard hoặc None nếu nạp dữ liệu thất bại
+    """
+    # Mỗi loại nguồn (github/upload/file) giữ một bản, để xem trước file không đẩy bản GitHub ra khỏi cache
+    loaded = st.session_state.setdefault('loaded_dashboards', {})
+    cached = loaded.get(source_key[0])
+    if cached is not None and cached[0] == source_key:
+        return cached[1]
+    
+    dashboard = PivotTableDashboard()
+    if not load(dashboard):
+        return None
+    
+    loaded[source_key[0]] = (source_key, dashboard)
+    return dashboard
+
+
 # ================== PIVOT TABLE DASHBOARD CLASS (FULL ORIGINAL) ==================
 class PivotTableDashboard:
     def __init__(self):
         self.data = None
+        self.data_version = None
+        self.aggregate_cache_size = 12  # Số kết quả aggregate giữ trong session_state
         
         # CẤU HÌNH THỨ TỰ ƯU TIÊN CỐ ĐỊNH THEO YÊU CẦU MỚI
         self.category_priority = {
@@ -746,22 +1072,16 @@ class PivotTableDashboard:
                 fill_value=0
             )    
         
-    def load_data_from_dataframe(self, df):
-        """THÊM METHOD MỚI: Load dữ liệu từ DataFrame"""
+    @timed_section()
+    def load_data_from_dataframe(self, df, data_version=None):
+        """THÊM METHOD MỚI: Load dữ liệu từ DataFrame
+        
+        data_version: phiên bản đã lưu kèm dữ liệu (upload_metadata.json); không có thì hash lại DataFrame
+        """
         try:
-            self.data = df.copy()
-            
-            # Làm sạch tên cột
-            self.data.columns = self.data.columns.str.strip()
-            
-            # Chuyển đổi kiểu dữ liệu
-            self.data['Tuần'] = pd.to_numeric(self.data['Tuần'], errors='coerce')
-            self.data['Tháng'] = pd.to_numeric(self.data['Tháng'], errors='coerce')
-            self.data['Số liệu'] = pd.to_numeric(self.data['Số liệu'], errors='coerce')
-            
-            # Thêm cột năm (có thể điều chỉnh theo dữ liệu thực tế)
-            if 'Năm' not in self.data.columns:
-                self.data['Năm'] = datetime.now().year
+            # Làm sạch tên cột, ép kiểu số, thêm cột Năm nếu thiếu
+            self.data = normalize_source_frame(df)
+            data_version = data_version or frame_version(self.data[VERSION_COLUMNS])
             
             # Tạo cột Quý từ Tháng
             self.data['Quý'] = ((self.data['Tháng'] - 1) // 3) + 1
@@ -776,12 +1096,17 @@ class PivotTableDashboard:
             # TÍNH TỶ LỆ SO VỚI TUẦN TRƯỚC
             self._calculate_week_over_week_ratio()
             
+            # TẠO CHỈ MỤC LỌC (khóa kỳ + mã danh mục)
+            self._build_filter_index()
+            self.data_version = data_version
+            
             return True
             
         except Exception as e:
             st.error(f"Lỗi khi xử lý DataFrame: {str(e)}")
             return False
 
+    @timed_section()
     def load_data(self, file):
         """
         Load data directly from an Excel file (desktop path, BytesIO, or Streamlit
@@ -798,8 +1123,9 @@ class PivotTableDashboard:
             True if the data was loaded and processed successfully, otherwise False.
         """
         try:
-            # Pandas can read from both file paths and file‑like objects
-            df = pd.read_excel(file)
+            # Đọc một lần (cache theo nội dung file), dùng chung cho xem trước/pivot/upload
+            df, parse_seconds, engine = read_excel_once(file)
+            st.sidebar.caption(f"⏱️ Đọc Excel: {parse_seconds:.2f}s ({engine}, {len(df):,} dòng)")
             return self.load_data_from_dataframe(df)
         except Exception as e:
             st.error(f"Lỗi khi đọc file Excel: {str(e)}")
@@ -826,6 +1152,23 @@ class PivotTableDashboard:
             'Tuần'
         ]).reset_index(drop=True)
     
+    def _build_filter_index(self):
+        """Tạo chỉ mục cho filter_data: khóa kỳ đã sắp xếp và mã danh mục"""
+        # Khóa kỳ = Năm*10000 + Tháng*100 + Tuần -> so sánh (Năm, Tháng, Tuần) bằng một số nguyên
+        period_key = (
+            pd.to_numeric(self.data['Năm'], errors='coerce') * 10000 +
+            self.data['Tháng'] * 100 +
+            self.data['Tuần']
+        ).fillna(-1).to_numpy(dtype=np.int64)  # Thiếu Năm/Tháng/Tuần -> -1, luôn nằm ngoài khoảng lọc
+        
+        self._period_order = np.argsort(period_key, kind='stable')
+        self._sorted_period_keys = period_key[self._period_order]
+        
+        # Mã danh mục (categorical) để lọc bằng bảng tra boolean
+        category_codes = pd.Categorical(self.data['Danh mục'])
+        self._category_codes = category_codes.codes
+        self._category_lookup = {category: code for code, category in enumerate(category_codes.categories)}
+    
     def _calculate_week_over_week_ratio(self):
         """Tính tỷ lệ so với tuần trước - LOGIC MỚI"""
         # Khởi tạo cột
@@ -858,6 +1201,7 @@ class PivotTableDashboard:
                         self.data.loc[current_idx, 'Thay_đổi_tuần_trước'] = current_value
                     # Trường hợp khác (0->0, hoặc giá trị âm) giữ None
     
+    @timed_section()
     def create_pivot_settings(self):
         """Tạo cài đặt cho pivot table"""
         st.sidebar.header("⚙️ Cài đặt Pivot Table")
@@ -865,13 +1209,18 @@ class PivotTableDashboard:
         # Chọn kiểu báo cáo
         report_type = st.sidebar.selectbox(
             "Kiểu báo cáo",
-            ["Theo Tuần", "Tùy chỉnh"]
+            ["Theo Tuần", "Theo Tháng", "Theo Quý", "Theo Năm", "Tùy chỉnh"]
         )
         
         # Chọn dòng và cột cho pivot
         col1, col2 = st.sidebar.columns(2)
         
-        available_dims = ['Tuần', 'Tháng', 'Quý', 'Năm', 'Danh mục', 'Nội dung']
+        # Chỉ các chiều còn lại sau khi tổng hợp theo kỳ (vd. báo cáo theo quý không còn cột Tuần/Tháng)
+        available_dims = {
+            "Theo Tháng": ['Tháng', 'Quý', 'Năm', 'Danh mục', 'Nội dung'],
+            "Theo Quý": ['Quý', 'Năm', 'Danh mục', 'Nội dung'],
+            "Theo Năm": ['Năm', 'Danh mục', 'Nội dung'],
+        }.get(report_type, ['Tuần', 'Tháng', 'Quý', 'Năm', 'Danh mục', 'Nội dung'])
         
         with col1:
             rows = st.multiselect(
@@ -1071,6 +1420,7 @@ class PivotTableDashboard:
         
         st.sidebar.markdown("---")
 
+    @timed_section()
     def create_filters(self):
         """Tạo bộ lọc dữ liệu - CẬP NHẬT để tích hợp với quick filter"""
         
@@ -1164,112 +1514,181 @@ class PivotTableDashboard:
 
         return from_year, from_month, from_week, to_year, to_month, to_week, selected_categories
         
+    @timed_section()
     def filter_data(self, from_year, from_month, from_week, to_year, to_month, to_week, categories):
         """Lọc dữ liệu theo khoảng tuần–tháng–năm"""
-        filtered = self.data.copy()
+        if getattr(self, '_sorted_period_keys', None) is None or len(self._sorted_period_keys) != len(self.data):
+            self._build_filter_index()
+        
+        # Khoảng thời gian: tìm nhị phân trên khóa kỳ đã sắp xếp
+        from_key = int(from_year) * 10000 + int(from_month) * 100 + int(from_week)
+        to_key = int(to_year) * 10000 + int(to_month) * 100 + int(to_week)
+        start = np.searchsorted(self._sorted_period_keys, from_key, side='left')
+        end = np.searchsorted(self._sorted_period_keys, to_key, side='right')
+        positions = self._period_order[start:end]
+        
+        # Danh mục: bảng tra theo mã (ô cuối dành cho mã -1 của giá trị thiếu, luôn False)
+        allowed = np.zeros(len(self._category_lookup) + 1, dtype=bool)
+        for category in categories:
+            code = self._category_lookup.get(category)
+            if code is not None:
+                allowed[code] = True
+        positions = positions[allowed[self._category_codes[positions]]]
+        
+        # Giữ thứ tự ưu tiên ban đầu; không lọc gì thì trả luôn dữ liệu gốc (không copy)
+        if len(positions) == len(self.data):
+            return self.data
+        return self.data.iloc[np.sort(positions)]
 
-        # Điều kiện bắt đầu
-        cond_start = (
-            (filtered['Năm'] > from_year) |
-            ((filtered['Năm'] == from_year) & (filtered['Tháng'] > from_month)) |
-            ((filtered['Năm'] == from_year) & (filtered['Tháng'] == from_month) & (filtered['Tuần'] >= from_week))
-        )
-
-        # Điều kiện kết thúc
-        cond_end = (
-            (filtered['Năm'] < to_year) |
-            ((filtered['Năm'] == to_year) & (filtered['Tháng'] < to_month)) |
-            ((filtered['Năm'] == to_year) & (filtered['Tháng'] == to_month) & (filtered['Tuần'] <= to_week))
-        )
+    @timed_section()
+    def aggregate_data_by_report_type(self, data, report_type, filter_signature=None):
+        """Tự động aggregate dữ liệu theo loại báo cáo
 
-        filtered = filtered[cond_start & cond_end & (filtered['Danh mục'].isin(categories))]
-
-        return filtered
-
-    def aggregate_data_by_report_type(self, data, report_type):
-        """Tự động aggregate dữ liệu theo loại báo cáo"""
-        if report_type == "Theo Tuần":
-            # Giữ nguyên dữ liệu tuần
+        Khi có filter_signature, kết quả được lưu trong session_state theo khóa
+        (phiên bản dữ liệu, loại báo cáo, bộ lọc) để đổi loại báo cáo không phải tính lại.
+        """
+        if report_type not in ("Theo Tháng", "Theo Quý", "Theo Năm"):
+            # Theo Tuần / Tùy chỉnh: giữ nguyên dữ liệu tuần
             return data
         
-        elif report_type == "Theo Tháng":
-            # Aggregate theo tháng
-            aggregated = data.groupby([
-                'Danh mục', 'Nội dung', 'Năm', 'Tháng', 'Quý',
-                'Danh_mục_thứ_tự', 'Nội_dung_thứ_tự'
-            ]).agg({
-                'Số liệu': 'sum'  # Tổng theo tháng
-            }).reset_index()
-            
-            # Tạo lại các cột cần thiết
-            aggregated['Tháng_Năm'] = aggregated.apply(lambda x: f"T{int(x['Tháng'])}/{int(x['Năm'])}", axis=1)
-            
-            # Không tính biến động cho aggregate theo tháng (có thể thêm sau)
-            aggregated['Tỷ_lệ_tuần_trước'] = None
-            aggregated['Thay_đổi_tuần_trước'] = None
-            
-            return aggregated
+        if filter_signature is None or self.data_version is None:
+            return self._aggregate_period(data, report_type)
+        
+        cache = st.session_state.setdefault('aggregate_cache', OrderedDict())
+        cache_key = (self.data_version, report_type, filter_signature)
+        
+        if cache_key in cache:
+            cache.move_to_end(cache_key)
+            return cache[cache_key]
         
+        # Tổng hợp phân cấp: tháng từ dữ liệu tuần, quý từ tháng, năm từ quý
+        if report_type == "Theo Tháng":
+            aggregated = self._aggregate_period(data, report_type)
         elif report_type == "Theo Quý":
-            # Aggregate theo quý
-            aggregated = data.groupby([
-                'Danh mục', 'Nội dung', 'Năm', 'Quý',
-                'Danh_mục_thứ_tự', 'Nội_dung_thứ_tự'
-            ]).agg({
-                'Số liệu': 'sum'  # Tổng theo quý
-            }).reset_index()
-            
-            # Không tính biến động cho aggregate theo quý
-            aggregated['Tỷ_lệ_tuần_trước'] = None
-            aggregated['Thay_đổi_tuần_trước'] = None
-            
-            return aggregated
-        
-        elif report_type == "Theo Năm":
-            # Aggregate theo năm
-            aggregated = data.groupby([
-                'Danh mục', 'Nội dung', 'Năm',
-                'Danh_mục_thứ_tự', 'Nội_dung_thứ_tự'
-            ]).agg({
-                'Số liệu': 'sum'  # Tổng theo năm
-            }).reset_index()
-            
-            # Không tính biến động cho aggregate theo năm
-            aggregated['Tỷ_lệ_tuần_trước'] = None
-            aggregated['Thay_đổi_tuần_trước'] = None
-            
-            return aggregated
-        
-        else:  # Tùy chỉnh
-            return data
+            monthly = self.aggregate_data_by_report_type(data, "Theo Tháng", filter_signature)
+            aggregated = self._aggregate_period(monthly, report_type)
+        else:
+            quarterly = self.aggregate_data_by_report_type(data, "Theo Quý", filter_signature)
+            aggregated = self._aggregate_period(quarterly, report_type)
+        
+        cache[cache_key] = aggregated
+        # Giới hạn bộ nhớ: bỏ kết quả ít dùng gần đây nhất
+        while len(cache) > self.aggregate_cache_size:
+            cache.popitem(last=False)
+        
+        return aggregated
     
-    def format_value_with_change(self, value, ratio, change):
-        """Định dạng giá trị với biến động inline - CẢI TIẾN ĐỂ HIỂN THỊ RÕ RÀNG HƠN"""
-        # Đảm bảo hiển thị số đầy đủ
-        value_str = f"{value:,.0f}".replace(',', '.')
+    def _aggregate_period(self, data, report_type):
+        """Groupby Số liệu theo tháng/quý/năm (dữ liệu đầu vào có thể là tuần hoặc kỳ nhỏ hơn)"""
+        period_cols = {
+            "Theo Tháng": ['Năm', 'Tháng', 'Quý'],
+            "Theo Quý": ['Năm', 'Quý'],
+            "Theo Năm": ['Năm'],
+        }[report_type]
+        
+        aggregated = data.groupby(
+            ['Danh mục', 'Nội dung'] + period_cols + ['Danh_mục_thứ_tự', 'Nội_dung_thứ_tự']
+        ).agg({
+            'Số liệu': 'sum'  # Tổng theo kỳ
+        }).reset_index()
+        
+        if report_type == "Theo Tháng":
+            # Tạo lại các cột cần thiết
+            aggregated['Tháng_Năm'] = (
+                "T" + aggregated['Tháng'].astype(int).astype(str) +
+                "/" + aggregated['Năm'].astype(int).astype(str)
+            )
         
-        if pd.isna(ratio) or ratio == 0:
-            return value_str
+        # Không tính biến động cho aggregate theo tháng/quý/năm (có thể thêm sau)
+        aggregated['Tỷ_lệ_tuần_trước'] = None
+        aggregated['Thay_đổi_tuần_trước'] = None
         
-        if ratio == 999:  # Vô hạn
-            return f"{value_str} <span class='positive-change'>↑∞%</span>"
+        return aggregated
+    
+    def _sort_week_columns(self, pivot):
+        """Sắp xếp cột tuần giảm dần (tuần cao nhất trước), các cột khác giữ nguyên ở sau"""
+        if not hasattr(pivot, 'columns'):
+            return pivot, []
+        
+        def week_of(col):
+            # XỬ LÝ MULTIINDEX - tìm phần tử là số tuần trong tuple
+            elements = col if isinstance(col, tuple) else (col,)
+            for element in elements:
+                try:
+                    week_num = int(str(element).strip())
+                    if 1 <= week_num <= 53:  # Tuần hợp lệ
+                        return week_num
+                except (ValueError, TypeError):
+                    continue
+            return None
         
-        if ratio > 0:
-            symbol = "↑"
-            color_class = "positive-change"
-        elif ratio < 0:
-            symbol = "↓"  
-            color_class = "negative-change"
-        else:
-            symbol = "→"
-            color_class = "no-change"
-            
-        ratio_text = f"{abs(ratio):.1f}%"
+        week_columns = []
+        other_columns = []
+        for col in pivot.columns:
+            week_num = week_of(col)
+            if week_num is None:
+                other_columns.append(col)
+            else:
+                week_columns.append((week_num, col))
         
-        # FORMAT RÕ RÀNG: số (biến động)
-        return f"{value_str} <span class='{color_class}'>({symbol}{ratio_text})</span>"
+        if not week_columns:
+            return pivot, []
+        
+        week_columns.sort(key=lambda item: item[0], reverse=True)
+        new_column_order = [col for _, col in week_columns] + other_columns
+        return pivot.reindex(columns=new_column_order), [week_num for week_num, _ in week_columns]
+    
+    def _calculate_row_totals(self, values):
+        """Tính cột Tổng theo smart aggregation (sum/mean/last) trên ma trận số"""
+        contents = [idx[1] if isinstance(idx, tuple) and len(idx) > 1 else str(idx) for idx in values.index]
+        methods = pd.Series([self.get_aggregation_method(content) for content in contents], index=values.index)
+        
+        arr = values.to_numpy(dtype=float)
+        valid = ~np.isnan(arr) & (arr != 0)
+        masked = np.where(valid, arr, 0.0)
+        
+        sums = masked.sum(axis=1)
+        counts = valid.sum(axis=1)
+        means = np.divide(sums, counts, out=np.zeros_like(sums), where=counts > 0)
+        # Với 'last', lấy giá trị mới nhất (ô khác 0 đầu tiên - cột tuần cao nhất)
+        first_valid = valid.argmax(axis=1) if arr.size else np.zeros(len(arr), dtype=int)
+        lasts = np.where(valid.any(axis=1), masked[np.arange(len(arr)), first_valid], 0.0) if arr.size else sums
+        
+        method_arr = methods.to_numpy()
+        totals = np.where(method_arr == "mean", means, np.where(method_arr == "last", lasts, sums))
+        
+        return pd.Series(totals, index=values.index, name='Tổng'), methods
+    
+    def _format_pivot_result(self, result):
+        """Tạo view đã format (HTML) từ PivotResult - chỉ chạy khi cần hiển thị (format cả ma trận một lượt)"""
+        values = result.values
+        cells = format_number_array(values.to_numpy(dtype=float))
+        
+        if result.ratios is not None:
+            # Ô có biến động: số + badge % so với tuần trước
+            ratio_arr = result.ratios.reindex(index=values.index, columns=values.columns).to_numpy(dtype=float)
+            suffix = format_change_suffix(ratio_arr)
+            cells = np.where(suffix != '', np.char.add(cells.astype(str), suffix), cells)
+        
+        formatted = pd.DataFrame(cells, index=values.index, columns=values.columns, dtype=object)
+        formatted['Tổng'] = format_number_array(result.totals.to_numpy(dtype=float))
+        return formatted
     
+    def create_export_pivot(self, data, rows, cols, values, agg_func):
+        """Pivot đơn giản cho xuất CSV/Excel: đúng phép tính người dùng chọn, ô trống = 0, không có tổng chung"""
+        return pd.pivot_table(
+            data,
+            index=rows if rows else None,
+            columns=cols if cols else None,
+            values=values,
+            aggfunc=agg_func,
+            fill_value=0,
+            margins=False  # BỎ TỔNG CHUNG
+        )
+    
+    @timed_section()
     def create_hierarchical_pivot_table_with_ratio(self, data, rows, cols, values, agg_func, show_ratio_inline):
+        """Tạo pivot dạng số (giá trị, tỷ lệ, biến động, tổng) - view HTML được format khi cần"""
         try:
             if not rows and not cols:
                 st.warning("Vui lòng chọn ít nhất một chiều cho dòng hoặc cột")
@@ -1281,355 +1700,187 @@ class PivotTableDashboard:
             
             # ========== SỬ DỤNG SMART AGGREGATION ==========
             # Tạo pivot table cho giá trị chính
-            # Tạo pivot table cho giá trị chính
-            if cols:
-                pivot = self.apply_smart_aggregation(data, rows, cols, values)
-    
+            pivot = self.apply_smart_aggregation(data, rows, cols, values)
+            if isinstance(pivot, pd.Series):
+                pivot = pivot.to_frame(name=values)
+            
             # ============= SẮP XẾP CỘT TUẦN GIẢM DẦN =============
-            if 'Tuần' in cols and hasattr(pivot, 'columns'):
-                # Lấy danh sách cột hiện tại
-                current_columns = list(pivot.columns)
-        
-                # Tách cột tuần và cột khác
-                week_columns = []
-                other_columns = []
-        
-                for col in current_columns:
-                    try:
-                        # XỬ LÝ MULTIINDEX - Kiểm tra xem có phải là tuple không
-                        if isinstance(col, tuple):
-                            # Nếu là MultiIndex, tìm phần tử là số tuần
-                            week_found = False
-                            for element in col:
-                                try:
-                                    week_num = int(str(element).strip())
-                                    if 1 <= week_num <= 53:  # Tuần hợp lệ
-                                        week_columns.append(col)
-                                        week_found = True
-                                        break
-                                except (ValueError, TypeError):
-                                    continue
-                            if not week_found:
-                                other_columns.append(col)
-                        else:
-                            # Xử lý cột đơn lẻ như cũ
-                            week_num = int(str(col).strip())
-                            if 1 <= week_num <= 53:  # Tuần hợp lệ
-                                week_columns.append(col)
-                            else:
-                                other_columns.append(col)
-                    except (ValueError, TypeError):
-                        other_columns.append(col)
-                
-                # Chỉ thực hiện sắp xếp và thông báo nếu có cột tuần
-                if week_columns:
-                    # Sắp xếp tuần theo thứ tự GIẢM DẦN (tuần cao nhất trước)
-                    if isinstance(current_columns[0], tuple):
-                        # Với MultiIndex, sắp xếp theo phần tử tuần
-                        week_columns_sorted = sorted(week_columns, 
-                            key=lambda x: max([int(str(e)) for e in x if str(e).isdigit() and 1 <= int(str(e)) <= 53]), 
-                            reverse=True)
-                    else:
-                        # Với single index
-                        week_columns_sorted = sorted(week_columns, key=lambda x: int(str(x)), reverse=True)
-                    
-                    # Tái tạo thứ tự cột: tuần (giảm dần) + cột khác
-                    new_column_order = week_columns_sorted + other_columns
-                    
-                    # Reindex pivot table với thứ tự mới
-                    pivot = pivot.reindex(columns=new_column_order)
-                    
-                    # Lấy min/max tuần để hiển thị thông báo
-                    week_numbers = []
-                    for col in week_columns:
-                        if isinstance(col, tuple):
-                            for element in col:
-                                try:
-                                    week_num = int(str(element).strip())
-                                    if 1 <= week_num <= 53:
-                                        week_numbers.append(week_num)
-                                        break
-                                except (ValueError, TypeError):
-                                    continue
-                        else:
-                            try:
-                                week_num = int(str(col).strip())
-                                if 1 <= week_num <= 53:
-                                    week_numbers.append(week_num)
-                            except (ValueError, TypeError):
-                                continue
-                    
-                    if week_numbers:
-                        st.sidebar.info(f"📅 Hiển thị từ tuần {max(week_numbers)} → tuần {min(week_numbers)}")
+            if 'Tuần' in cols:
+                pivot, week_numbers = self._sort_week_columns(pivot)
+                if week_numbers:
+                    st.sidebar.info(f"📅 Hiển thị từ tuần {max(week_numbers)} → tuần {min(week_numbers)}")
             # ===============================================
             
+            ratios = None
+            
             # Nếu cần hiển thị biến động inline (CHỈ CHO BÁO CÁO THEO TUẦN)
             if show_ratio_inline and cols and 'Tuần' in cols:
                 # Lọc dữ liệu có biến động
-                ratio_data = data[pd.notna(data['Tỷ_lệ_tuần_trước'])].copy()
+                ratio_data = data[pd.notna(data['Tỷ_lệ_tuần_trước'])]
                 
                 if not ratio_data.empty:
                     try:
-                        # Tạo pivot table cho giá trị gốc với smart aggregation
-                        main_pivot = self.apply_smart_aggregation(data, rows, cols, 'Số liệu')
+                        # Giá trị gốc luôn lấy từ 'Số liệu' (dùng lại pivot nếu đã tính)
+                        if values != 'Số liệu':
+                            pivot = self.apply_smart_aggregation(data, rows, cols, 'Số liệu')
+                            pivot, _ = self._sort_week_columns(pivot)
                         
-                        # ============= SẮP XẾP CỘT CHO MAIN_PIVOT =============
-                        if hasattr(main_pivot, 'columns'):
-                            current_columns = list(main_pivot.columns)
-                            week_columns = []
-                            other_columns = []
-                            
-                            for col in current_columns:
-                                try:
-                                    week_num = int(str(col).strip())
-                                    if 1 <= week_num <= 53:
-                                        week_columns.append(col)
-                                    else:
-                                        other_columns.append(col)
-                                except (ValueError, TypeError):
-                                    other_columns.append(col)
-                            
-                            # Sắp xếp tuần giảm dần
-                            week_columns_sorted = sorted(week_columns, key=lambda x: int(str(x)), reverse=True)
-                            new_column_order = week_columns_sorted + other_columns
-                            
-                            main_pivot = main_pivot.reindex(columns=new_column_order)
-                        # ====================================================
-                        
-                        # Tạo pivot table cho tỷ lệ biến động
+                        # Tạo pivot table cho tỷ lệ biến động so với tuần trước
                         ratio_pivot = pd.pivot_table(
                             ratio_data,
                             index=rows if rows else None,
                             columns=cols,
                             values='Tỷ_lệ_tuần_trước',
-                            aggfunc='mean',
-                            fill_value=None
+                            aggfunc='mean'
                         )
-                        
-                        # ============= SẮP XẾP CỘT CHO RATIO_PIVOT =============
-                        if hasattr(ratio_pivot, 'columns'):
-                            current_columns = list(ratio_pivot.columns)
-                            week_columns = []
-                            other_columns = []
-                            
-                            for col in current_columns:
-                                try:
-                                    week_num = int(str(col).strip())
-                                    if 1 <= week_num <= 53:
-                                        week_columns.append(col)
-                                    else:
-                                        other_columns.append(col)
-                                except (ValueError, TypeError):
-                                    other_columns.append(col)
-                            
-                            week_columns_sorted = sorted(week_columns, key=lambda x: int(str(x)), reverse=True)
-                            new_column_order = week_columns_sorted + other_columns
-                            
-                            ratio_pivot = ratio_pivot.reindex(columns=new_column_order)
-                        # ====================================================
-                        
-                        # Tạo combined pivot với biến động
-                        combined_pivot = main_pivot.copy()
-                        
-                        # Áp dụng biến động cho từng ô
-                        for idx in main_pivot.index:
-                            for col in main_pivot.columns:
-                                main_value = main_pivot.loc[idx, col]
-                                
-                                # Kiểm tra có biến động không
-                                if idx in ratio_pivot.index and col in ratio_pivot.columns:
-                                    ratio_val = ratio_pivot.loc[idx, col]
-                                    if pd.notna(ratio_val):
-                                        # Có biến động - format với %
-                                        combined_pivot.loc[idx, col] = self.format_value_with_change(main_value, ratio_val, 0)
-                                        continue
-                                
-                                # Không có biến động - chỉ hiển thị số
-                                combined_pivot.loc[idx, col] = f"{main_value:,.0f}".replace(',', '.')
-                        
-                        # THÊM CỘT TỔNG - SMART AGGREGATION
-                        combined_pivot['Tổng'] = ""
-                        for idx in combined_pivot.index:
-                            # Lấy nội dung để xác định cách tính tổng
-                            if isinstance(idx, tuple) and len(idx) > 1:
-                                content = idx[1]  # Nội dung thường ở vị trí thứ 2
-                            else:
-                                content = str(idx)
-                            
-                            agg_method = self.get_aggregation_method(content)
-                            
-                            row_total = 0
-                            row_count = 0
-                            
-                            for col in main_pivot.columns:
-                                val = main_pivot.loc[idx, col]
-                                if pd.notna(val) and val != 0:
-                                    if agg_method == "mean":
-                                        row_total += float(val)
-                                        row_count += 1
-                                    elif agg_method == "last":
-                                        # Với 'last', lấy giá trị mới nhất (cột đầu tiên)
-                                        row_total = float(val)
-                                        break
-                                    else:  # sum
-                                        row_total += float(val)
-                            
-                            # Format tổng
-                            if agg_method == "mean" and row_count > 0:
-                                avg_value = row_total / row_count
-                                combined_pivot.loc[idx, 'Tổng'] = f"{avg_value:,.1f}".replace(',', '.')
-                            else:
-                                combined_pivot.loc[idx, 'Tổng'] = f"{row_total:,.0f}".replace(',', '.')
-                        
-                        return combined_pivot
+                        ratios = ratio_pivot.reindex(index=pivot.index, columns=pivot.columns)
                         
                     except Exception as e:
                         st.sidebar.error(f"Lỗi tạo biến động: {str(e)}")
-                        pass
+                        ratios = None
             
-            # Nếu không có biến động - format số đẹp và thêm cột tổng
-            if isinstance(pivot, pd.DataFrame):
-                pivot_formatted = pivot.copy()
-                
-                # Format tất cả số thành dạng đẹp
-                for idx in pivot_formatted.index:
-                    for col in pivot_formatted.columns:
-                        val = pivot.loc[idx, col]
-                        if pd.notna(val):
-                            pivot_formatted.loc[idx, col] = f"{val:,.1f}".replace(',', '.')
-                
-                # THÊM CỘT TỔNG - SMART AGGREGATION
-                pivot_formatted['Tổng'] = ""
-                for idx in pivot_formatted.index:
-                    # Lấy nội dung để xác định cách tính tổng
-                    if isinstance(idx, tuple) and len(idx) > 1:
-                        content = idx[1]  # Nội dung thường ở vị trí thứ 2
-                    else:
-                        content = str(idx)
-                    
-                    agg_method = self.get_aggregation_method(content)
-                    
-                    row_total = 0
-                    row_count = 0
-                    
-                    for col in pivot.columns:
-                        val = pivot.loc[idx, col]
-                        if pd.notna(val) and val != 0:
-                            if agg_method == "mean":
-                                row_total += float(val)
-                                row_count += 1
-                            elif agg_method == "last":
-                                # Với 'last', lấy giá trị mới nhất (cột đầu tiên)
-                                row_total = float(val)
-                                break
-                            else:  # sum
-                                row_total += float(val)
-                    
-                    # Format tổng
-                    if agg_method == "mean" and row_count > 0:
-                        avg_value = row_total / row_count
-                        pivot_formatted.loc[idx, 'Tổng'] = f"{avg_value:,.1f}".replace(',', '.')
-                    elif agg_method == "last":
-                        pivot_formatted.loc[idx, 'Tổng'] = f"{row_total:,.0f}".replace(',', '.')
-                    else:
-                        pivot_formatted.loc[idx, 'Tổng'] = f"{row_total:,.0f}".replace(',', '.')
-                
-                return pivot_formatted
+            # THÊM CỘT TỔNG - SMART AGGREGATION
+            totals, total_methods = self._calculate_row_totals(pivot)
             
-            return pivot
+            return PivotResult(
+                values=pivot,
+                ratios=ratios,
+                totals=totals,
+                total_methods=total_methods,
+                formatter=self._format_pivot_result
+            )
             
         except Exception as e:
             st.error(f"Lỗi tạo pivot table: {str(e)}")
             return None
 
  
-    def display_category_sparklines(self, category_data, category_name, report_type):
-        """Hiển thị sparklines cho từng nội dung trong danh mục"""
+    def display_category_sparklines(self, category_data, category_name, report_type, totals=None, data_version=None):
+        """Hiển thị sparklines cho từng nội dung trong danh mục - một bảng SVG duy nhất.
+
+        category_data là pivot dạng số (nội dung x kỳ), không phải bảng đã format HTML.
+        """
         try:
-            if not isinstance(category_data, pd.DataFrame):
+            if not isinstance(category_data, pd.DataFrame) or category_data.empty:
                 return
             
-            # Tạo sparklines cho từng nội dung trong danh mục
-            col1, col2, col3 = st.columns([3, 2, 1])
-            with col1:
-                st.markdown("**Nội dung**")
-            with col2:
-                st.markdown("**Xu hướng**")
-            with col3:
-                st.markdown("**Tổng hàng**")
-            
-            for content in category_data.index:
-                # Lấy dữ liệu cho nội dung này
-                content_values = []
-                for col in category_data.columns:
-                    val = category_data.loc[content, col]
-                    if isinstance(val, str):
-                        # Extract số từ HTML
-                        import re
-                        numbers = re.findall(r'[\d.]+', val.replace('.', ''))
-                        if numbers:
-                            content_values.append(int(numbers[0].replace('.', '')))
-                        else:
-                            content_values.append(0)
-                    else:
-                        content_values.append(val if pd.notna(val) else 0)
-                
-                # Tạo sparkline
-                fig = go.Figure()
-                fig.add_trace(go.Scatter(
-                    y=content_values,
-                    mode='lines+markers',
-                    line=dict(width=2, color='royalblue'),
-                    marker=dict(size=3),
-                    showlegend=False
-                ))
-                
-                # Highlight max/min
-                if content_values and max(content_values) > 0:
-                    max_idx = np.argmax(content_values)
-                    min_idx = np.argmin(content_values)
-                    
-                    fig.add_trace(go.Scatter(
-                        x=[max_idx], y=[content_values[max_idx]],
-                        mode='markers', marker=dict(size=5, color='green'),
-                        showlegend=False
-                    ))
-                    fig.add_trace(go.Scatter(
-                        x=[min_idx], y=[content_values[min_idx]],
-                        mode='markers', marker=dict(size=5, color='red'),
-                        showlegend=False
-                    ))
-                
-                fig.update_layout(
-                    margin=dict(l=0, r=0, t=0, b=0),
-                    height=40, width=200,
-                    paper_bgcolor='rgba(0,0,0,0)',
-                    plot_bgcolor='rgba(0,0,0,0)',
-                    xaxis=dict(showticklabels=False, showgrid=False, zeroline=False),
-                    yaxis=dict(showticklabels=False, showgrid=False, zeroline=False),
-                    hovermode=False
-                )
-                
-                # Tính tổng hàng
-                row_total = sum(content_values)
-                
-                # Hiển thị
-                col1, col2, col3 = st.columns([3, 2, 1])
-                with col1:
-                    st.markdown(f"📄 {content}")
-                with col2:
-                    st.plotly_chart(fig, use_container_width=True, key=f"spark_{category_name}_{content}")
-                with col3:
-                    st.markdown(f"**{row_total:,.0f}**".replace(',', '.'))
+            value_data = category_data.drop(columns=['Tổng'], errors='ignore')
+            values = value_data.to_numpy(dtype=float, na_value=0.0)
+            contents = [str(content) for content in value_data.index]
+            if totals is None:
+                totals = values.sum(axis=1).tolist()
+            if data_version is None:
+                data_version = frame_version(value_data)
+            
+            html = render_sparkline_table_html(
+                category_name, (data_version, report_type, tuple(contents)),
+                values, contents, list(totals)
+            )
+            st.markdown(html, unsafe_allow_html=True)
+            
+            # Thống kê tổng quan cho danh mục
+            total_category = values.sum()
+            avg_per_content = total_category / len(contents) if contents else 0
+            
+            st.info(f"""
+            📊 **Tổng quan {category_name}:**
+            - 📈 Tổng cộng: {total_category:,.0f}
+            - 📊 Trung bình/nội dung: {avg_per_content:,.0f}
+            - 📋 Số nội dung: {len(contents)}
+            """.replace(',', '.'))
                     
         except Exception as e:
             st.error(f"Lỗi tạo sparkline cho {category_name}: {str(e)}")
     
-    def display_hierarchical_pivot_improved(self, pivot, data):
+    def create_pivot_viewport(self, pivot, sorted_categories):
+        """Chọn cửa sổ hiển thị cho pivot: trang danh mục và khoảng cột đang xem"""
+        value_columns = [col for col in pivot.columns if col != 'Tổng']
+
+        col1, col2, col3, col4 = st.columns(4)
+
+        with col1:
+            page_size = st.selectbox(
+                "Danh mục mỗi trang",
+                [3, 5, 10, "Tất cả"],
+                index=1,
+                key="pivot_page_size"
+            )
+
+        if page_size == "Tất cả":
+            page_size = max(len(sorted_categories), 1)
+        total_pages = max(1, -(-len(sorted_categories) // page_size))
+
+        with col2:
+            page = st.number_input("Trang", min_value=1, max_value=total_pages, value=1, step=1, key="pivot_page")
+
+        with col3:
+            window_size = st.selectbox(
+                "Số cột hiển thị",
+                [6, 12, 24, "Tất cả"],
+                index=1,
+                key="pivot_window_size"
+            )
+
+        if window_size == "Tất cả" or len(value_columns) <= window_size:
+            window_columns = value_columns
+        else:
+            with col4:
+                start_col = st.select_slider(
+                    "Bắt đầu từ cột",
+                    options=value_columns[:len(value_columns) - window_size + 1],
+                    format_func=str,
+                    key="pivot_window_start"
+                )
+            start_idx = value_columns.index(start_col)
+            window_columns = value_columns[start_idx:start_idx + window_size]
+
+        page = min(int(page), total_pages)
+        page_categories = sorted_categories[(page - 1) * page_size:page * page_size]
+        visible_columns = window_columns + (['Tổng'] if 'Tổng' in pivot.columns else [])
+
+        st.caption(f"📄 Trang {page}/{total_pages} · {len(window_columns)}/{len(value_columns)} cột")
+
+        return page_categories, visible_columns
+
+    def _build_category_table_html(self, category_data):
+        """Tạo HTML table cho một danh mục (chỉ các cột trong cửa sổ hiển thị)"""
+        parts = ["<div class='full-width-table'>",
+                 "<table style='width:100%; border-collapse: collapse; font-size: 15px;'>"]
+
+        # Header
+        parts.append("<tr style='background-color: #f0f2f6;'>")
+        parts.append("<th style='border: 1px solid #ddd; padding: 8px; text-align: left; min-width: 250px; position: sticky; left: 0; background-color: #f0f2f6; z-index: 10;'>Nội dung</th>")
+        for col in category_data.columns:
+            if col == 'Tổng':
+                parts.append(f"<th style='border: 1px solid #ddd; padding: 8px; text-align: center; min-width: 120px; position: sticky; right: 0; background-color: #f0f2f6; z-index: 10; font-weight: bold;'>{col}</th>")
+            else:
+                parts.append(f"<th style='border: 1px solid #ddd; padding: 8px; text-align: center; min-width: 150px;'>{col}</th>")
+        parts.append("</tr>")
+
+        # Data rows
+        for content, row in zip(category_data.index, category_data.itertuples(index=False, name=None)):
+            parts.append("<tr>")
+            parts.append(f"<td style='border: 1px solid #ddd; padding: 8px; font-weight: bold; position: sticky; left: 0; background-color: #f8f9fa; z-index: 10;'>{content}</td>")
+
+            for col, value in zip(category_data.columns, row):
+                if col == 'Tổng':
+                    parts.append(f"<td style='border: 1px solid #ddd; padding: 8px; text-align: right; position: sticky; right: 0; background-color: #e9ecef; z-index: 10; font-weight: bold;' class='number-cell'>{value}</td>")
+                else:
+                    parts.append(f"<td style='border: 1px solid #ddd; padding: 8px; text-align: right;' class='number-cell'>{value}</td>")
+
+            parts.append("</tr>")
+
+        parts.append("</table></div>")
+        return "".join(parts)
+
+    @timed_section()
+    def display_hierarchical_pivot_improved(self, pivot_result, data):
         """Hiển thị pivot table với cấu trúc phân cấp cải tiến - Sparkline ở dưới cùng"""
-        if pivot is None:
+        if pivot_result is None:
             return
         
+        pivot = pivot_result.formatted
+        
         # Kiểm tra xem có phải pivot table với Danh mục không
         if isinstance(pivot.index, pd.MultiIndex) and 'Danh mục' in pivot.index.names:
             # Hiển thị theo cấu trúc phân cấp
@@ -1638,70 +1889,50 @@ class PivotTableDashboard:
             categories = pivot.index.get_level_values('Danh mục').unique()
             sorted_categories = sorted(categories, key=lambda x: self.category_priority.get(x, 999))
             
-            # PHẦN 1: HIỂN THỊ PIVOT TABLE CHO TỪNG DANH MỤC
-            for category in sorted_categories:
-                # Expander without label; we'll render a custom styled header inside
-                with st.expander("", expanded=True):
-                    # Category title: bigger, bold, subtle background
+            # PHẦN 1: HIỂN THỊ PIVOT TABLE THEO CỬA SỔ (chỉ render trang danh mục và khoảng cột đang xem)
+            page_categories, visible_columns = self.create_pivot_viewport(pivot, sorted_categories)
+            
+            for category in page_categories:
+                # Lọc dữ liệu cho danh mục này - chỉ cắt từ pivot đã tính sẵn
+                category_data = pivot.xs(category, level='Danh mục')
+                
+                # Header danh mục + nút thu gọn; nội dung chỉ render khi mở
+                head_col, toggle_col = st.columns([6, 1])
+                with head_col:
                     st.markdown(f"<div class='category-header'>📁 {category}</div>", unsafe_allow_html=True)
-                    # Lọc dữ liệu cho danh mục này
-                    category_data = pivot.xs(category, level='Danh mục')
-                    
-                    # Sắp xếp theo thứ tự ưu tiên nội dung
-                    if isinstance(category_data.index, pd.Index):
-                        # Lấy danh sách nội dung và sắp xếp
-                        contents = category_data.index.tolist()
-                        sorted_contents = sorted(contents, key=lambda x: self.content_priority.get(x, 999))
-                        category_data = category_data.reindex(sorted_contents)
-                    
-                    # HIỂN THỊ BẢNG DỮ LIỆU
-                    if isinstance(category_data, pd.DataFrame):
-                        # Tạo HTML table để hiển thị đầy đủ số
-                        html_table = "<div class='full-width-table'>"
-                        html_table += "<table style='width:100%; border-collapse: collapse; font-size: 15px;'>"
-                        
-                        # Header
-                        html_table += "<tr style='background-color: #f0f2f6;'>"
-                        html_table += "<th style='border: 1px solid #ddd; padding: 8px; text-align: left; min-width: 250px; position: sticky; left: 0; background-color: #f0f2f6; z-index: 10;'>Nội dung</th>"
-                        for col in category_data.columns:
-                            if col == 'Tổng':
-                                html_table += f"<th style='border: 1px solid #ddd; padding: 8px; text-align: center; min-width: 120px; position: sticky; right: 0; background-color: #f0f2f6; z-index: 10; font-weight: bold;'>{col}</th>"
-                            else:
-                                html_table += f"<th style='border: 1px solid #ddd; padding: 8px; text-align: center; min-width: 150px;'>{col}</th>"
-                        html_table += "</tr>"
-                        
-                        # Data rows
-                        for content in category_data.index:
-                            html_table += "<tr>"
-                            html_table += f"<td style='border: 1px solid #ddd; padding: 8px; font-weight: bold; position: sticky; left: 0; background-color: #f8f9fa; z-index: 10;'>{content}</td>"
-                            
-                            for col in category_data.columns:
-                                value = category_data.loc[content, col]
-                                if col == 'Tổng':
-                                    html_table += f"<td style='border: 1px solid #ddd; padding: 8px; text-align: right; position: sticky; right: 0; background-color: #e9ecef; z-index: 10; font-weight: bold;' class='number-cell'>{value}</td>"
-                                else:
-                                    html_table += f"<td style='border: 1px solid #ddd; padding: 8px; text-align: right;' class='number-cell'>{value}</td>"
-                            
-                            html_table += "</tr>"
-                        
-                        html_table += "</table></div>"
-                        st.markdown(html_table, unsafe_allow_html=True)
-                    
-                    else:
-                        # Nếu là Series
-                        html_table = "<div class='full-width-table'>"
-                        html_table += "<table style='width:100%; border-collapse: collapse; font-size: 12px;'>"
-                        html_table += "<tr style='background-color: #f0f2f6;'>"
-                        html_table += "<th style='border: 1px solid #ddd; padding: 8px;'>Danh mục</th>"
-                        html_table += "<th style='border: 1px solid #ddd; padding: 8px;'>Giá trị</th>"
-                        html_table += "</tr>"
-                        html_table += "<tr>"
-                        html_table += f"<td style='border: 1px solid #ddd; padding: 8px;'>{category}</td>"
-                        formatted_value = f"{category_data:,.0f}".replace(',', '.') if isinstance(category_data, (int, float, np.integer, np.floating)) else str(category_data)
-                        html_table += f"<td style='border: 1px solid #ddd; padding: 8px; text-align: right;' class='number-cell'>{formatted_value}</td>"
-                        html_table += "</tr>"
-                        html_table += "</table></div>"
-                        st.markdown(html_table, unsafe_allow_html=True)
+                with toggle_col:
+                    is_open = st.checkbox("Mở rộng", value=True, key=f"pivot_open_{category}")
+                
+                if not is_open:
+                    continue
+                
+                # Sắp xếp theo thứ tự ưu tiên nội dung
+                if isinstance(category_data.index, pd.Index):
+                    # Lấy danh sách nội dung và sắp xếp
+                    contents = category_data.index.tolist()
+                    sorted_contents = sorted(contents, key=lambda x: self.content_priority.get(x, 999))
+                    category_data = category_data.reindex(sorted_contents)
+                
+                # HIỂN THỊ BẢNG DỮ LIỆU
+                if isinstance(category_data, pd.DataFrame):
+                    category_view = category_data[[col for col in visible_columns if col in category_data.columns]]
+                    st.markdown(self._build_category_table_html(category_view), unsafe_allow_html=True)
+                
+                else:
+                    # Nếu là Series
+                    html_table = "<div class='full-width-table'>"
+                    html_table += "<table style='width:100%; border-collapse: collapse; font-size: 12px;'>"
+                    html_table += "<tr style='background-color: #f0f2f6;'>"
+                    html_table += "<th style='border: 1px solid #ddd; padding: 8px;'>Danh mục</th>"
+                    html_table += "<th style='border: 1px solid #ddd; padding: 8px;'>Giá trị</th>"
+                    html_table += "</tr>"
+                    html_table += "<tr>"
+                    html_table += f"<td style='border: 1px solid #ddd; padding: 8px;'>{category}</td>"
+                    formatted_value = f"{category_data:,.0f}".replace(',', '.') if isinstance(category_data, (int, float, np.integer, np.floating)) else str(category_data)
+                    html_table += f"<td style='border: 1px solid #ddd; padding: 8px; text-align: right;' class='number-cell'>{formatted_value}</td>"
+                    html_table += "</tr>"
+                    html_table += "</table></div>"
+                    st.markdown(html_table, unsafe_allow_html=True)
             
             # PHẦN 2: HIỂN THỊ SPARKLINE CHỈ CHO BÁO CÁO THEO TUẦN
             # Kiểm tra nếu pivot có cột là số tuần (hoặc đã chọn báo cáo theo tuần)
@@ -1710,136 +1941,32 @@ class PivotTableDashboard:
                 st.subheader("📈 Biểu đồ xu hướng tổng hợp theo từng nội dung")
                 st.markdown("*Xu hướng biến động qua các tuần cho mỗi nội dung công việc*")
                 
-                # Tạo container cho sparklines
-                sparkline_data_all = {}
+                numeric_pivot = pivot_result.values
                 
-                # Thu thập dữ liệu sparkline cho tất cả danh mục
-                for category in sorted_categories:
-                    try:
-                        category_data = pivot.xs(category, level='Danh mục')
-                        
-                        if isinstance(category_data, pd.DataFrame):
-                            # Sắp xếp theo thứ tự ưu tiên nội dung
-                            contents = category_data.index.tolist()
-                            sorted_contents = sorted(contents, key=lambda x: self.content_priority.get(x, 999))
-                            category_data = category_data.reindex(sorted_contents)
-                            
-                            # Lưu vào dict chung
-                            sparkline_data_all[category] = {
-                                'data': category_data,
-                                'contents': sorted_contents
-                            }
-                    except Exception as e:
-                        continue
+                # Một phiên bản dữ liệu cho cả pivot - khóa cache cho sparkline từng danh mục
+                data_version = pivot_result.version
                 
-                # Hiển thị sparklines theo danh mục
-                for category in sorted_categories:
-                    if category in sparkline_data_all:
-                        with st.expander(f"📊 Xu hướng: {category}", expanded=False):
-                            category_info = sparkline_data_all[category]
-                            category_data = category_info['data']
-                            
-                            try:
-                                # Header cho bảng sparkline
-                                st.markdown("**📊 Xu hướng biến động cho từng nội dung:**")
-                                
-                                # Tạo bảng sparkline cho danh mục này
-                                sparkline_rows = []
-                                
-                                for content in category_info['contents']:
-                                    # Lấy dữ liệu cho nội dung này
-                                    content_values = []
-                                    for col in category_data.columns:
-                                        if col != 'Tổng':  # Bỏ qua cột Tổng khi tính sparkline
-                                            val = category_data.loc[content, col]
-                                            if isinstance(val, str):
-                                                # Extract số từ HTML
-                                                import re
-                                                numbers = re.findall(r'[\d.]+', val.replace('.', ''))
-                                                if numbers:
-                                                    content_values.append(int(numbers[0].replace('.', '')))
-                                                else:
-                                                    content_values.append(0)
-                                            else:
-                                                content_values.append(val if pd.notna(val) else 0)
-                                    
-                                    # Tạo sparkline
-                                    fig = go.Figure()
-                                    fig.add_trace(go.Scatter(
-                                        y=content_values,
-                                        mode='lines+markers',
-                                        line=dict(width=2, color='royalblue'),
-                                        marker=dict(size=3),
-                                        showlegend=False
-                                    ))
-                                    
-                                    # Highlight max/min
-                                    if content_values and max(content_values) > 0:
-                                        max_idx = np.argmax(content_values)
-                                        min_idx = np.argmin(content_values)
-                                        
-                                        fig.add_trace(go.Scatter(
-                                            x=[max_idx], y=[content_values[max_idx]],
-                                            mode='markers', marker=dict(size=5, color='green'),
-                                            showlegend=False
-                                        ))
-                                        fig.add_trace(go.Scatter(
-                                            x=[min_idx], y=[content_values[min_idx]],
-                                            mode='markers', marker=dict(size=5, color='red'),
-                                            showlegend=False
-                                        ))
-                                    
-                                    fig.update_layout(
-                                        margin=dict(l=0, r=0, t=0, b=0),
-                                        height=40, width=200,
-                                        paper_bgcolor='rgba(0,0,0,0)',
-                                        plot_bgcolor='rgba(0,0,0,0)',
-                                        xaxis=dict(showticklabels=False, showgrid=False, zeroline=False),
-                                        yaxis=dict(showticklabels=False, showgrid=False, zeroline=False),
-                                        hovermode=False
-                                    )
-                                    
-                                    # Lấy tổng hàng từ cột Tổng
-                                    row_total = category_data.loc[content, 'Tổng'] if 'Tổng' in category_data.columns else sum(content_values)
-                                    
-                                    # Lưu vào danh sách
-                                    sparkline_rows.append({
-                                        'content': content,
-                                        'fig': fig,
-                                        'total': row_total,
-                                        'values': content_values
-                                    })
-                                
-                                # Hiển thị từng row với sparkline trong layout 3 cột
-                                for row_data in sparkline_rows:
-                                    col1, col2, col3 = st.columns([3, 2, 1])
-                                    
-                                    with col1:
-                                        st.markdown(f"📄 {row_data['content']}")
-                                    
-                                    with col2:
-                                        st.plotly_chart(row_data['fig'], use_container_width=True, 
-                                                    key=f"spark_{category}_{row_data['content']}")
-                                    
-                                    with col3:
-                                        if isinstance(row_data['total'], str):
-                                            st.markdown(f"**{row_data['total']}**")
-                                        else:
-                                            st.markdown(f"**{row_data['total']:,.0f}**".replace(',', '.'))
-                                
-                                # Thống kê tổng quan cho danh mục
-                                total_category = sum([sum(row['values']) for row in sparkline_rows])
-                                avg_per_content = total_category / len(sparkline_rows) if sparkline_rows else 0
-                                
-                                st.info(f"""
-                                📊 **Tổng quan {category}:**
-                                - 📈 Tổng cộng: {total_category:,.0f}
-                                - 📊 Trung bình/nội dung: {avg_per_content:,.0f}
-                                - 📋 Số nội dung: {len(sparkline_rows)}
-                                """.replace(',', '.'))
-                                        
-                            except Exception as e:
-                                st.error(f"Lỗi tạo sparkline cho {category}: {str(e)}")
+                # Hiển thị sparklines theo danh mục (chỉ render khi mở)
+                for category in page_categories:
+                    if category not in numeric_pivot.index.get_level_values('Danh mục'):
+                        continue
+                    
+                    if not st.checkbox(f"📊 Xu hướng: {category}", value=False, key=f"spark_open_{category}"):
+                        continue
+                    
+                    category_numeric = numeric_pivot.xs(category, level='Danh mục')
+                    if not isinstance(category_numeric, pd.DataFrame):
+                        continue
+                    
+                    # Sắp xếp theo thứ tự ưu tiên nội dung
+                    sorted_contents = sorted(category_numeric.index.tolist(), key=lambda x: self.content_priority.get(x, 999))
+                    category_numeric = category_numeric.reindex(sorted_contents)
+                    
+                    # Lấy tổng hàng (theo smart aggregation) từ ma trận số
+                    totals = pivot_result.totals.xs(category, level='Danh mục').reindex(sorted_contents).tolist()
+                    
+                    st.markdown("**📊 Xu hướng biến động cho từng nội dung:**")
+                    self.display_category_sparklines(category_numeric, category, "Theo Tuần", totals=totals, data_version=data_version)
         
         elif 'Danh mục' in pivot.index.names:
             # Hiển thị đơn giản với Danh mục
@@ -1898,60 +2025,17 @@ class PivotTableDashboard:
             html_table += "</table></div>"
             st.markdown(html_table, unsafe_allow_html=True)
     
-    def create_sparkline_charts(self, pivot, report_type):
-        """Tạo biểu đồ sparkline cho mỗi dòng trong pivot table"""
-        if pivot is None or not isinstance(pivot, pd.DataFrame):
+    def create_sparkline_charts(self, pivot_result, report_type):
+        """Tạo biểu đồ sparkline cho mỗi dòng trong pivot table (đọc từ ma trận số)"""
+        if pivot_result is None or not isinstance(pivot_result.values, pd.DataFrame):
             return None
         
-        # Xác định cột thời gian dựa vào report_type
-        time_column_name = {
-            "Theo Tuần": "Tuần",
-            "Theo Tháng": "Tháng",
-            "Theo Quý": "Quý",
-            "Theo Năm": "Năm"
-        }.get(report_type, "Tháng")
-        
         # Tạo dataframe cho biểu đồ
         sparklines_data = {}
-        
-        # Reset index để dễ dàng xử lý
-        if isinstance(pivot.index, pd.MultiIndex):
-            pivot_reset = pivot.reset_index()
-        else:
-            pivot_reset = pivot.reset_index()
-            
-        # Lấy tên của các cột chứa giá trị
-        value_columns = [col for col in pivot.columns 
-                         if not isinstance(col, tuple) or time_column_name in col]
+        numeric = pivot_result.values
         
         # Tạo sparkline cho mỗi dòng
-        for idx, row in pivot_reset.iterrows():
-                
-            # Lấy tên hàng
-            if isinstance(pivot.index, pd.MultiIndex):
-                row_key = tuple(row[list(pivot.index.names)])
-            else:
-                row_key = row[pivot.index.name]
-                
-            # Lấy giá trị cho sparkline (extract từ HTML nếu cần)
-            values = []
-            for col in value_columns:
-                try:
-                    if col in pivot.columns:
-                        val = pivot.loc[row_key, col]
-                        # Nếu là chuỗi HTML, lấy số đầu tiên
-                        if isinstance(val, str):
-                            import re
-                            numbers = re.findall(r'[\d.]+', val.replace('.', ''))
-                            if numbers:
-                                values.append(int(numbers[0].replace('.', '')))
-                            else:
-                                values.append(0)
-                        else:
-                            values.append(val)
-                except:
-                    values.append(0)
-            
+        for row_key, values in zip(numeric.index, numeric.to_numpy(dtype=float, na_value=0.0)):
             # Tạo sparkline figure
             fig = go.Figure()
             
@@ -1965,8 +2049,8 @@ class PivotTableDashboard:
             ))
             
             # Highlight điểm cao nhất
-            if values:
-                max_idx = np.argmax(values)
+            if values.size:
+                max_idx = int(np.argmax(values))
                 fig.add_trace(go.Scatter(
                     x=[max_idx],
                     y=[values[max_idx]],
@@ -1976,7 +2060,7 @@ class PivotTableDashboard:
                 ))
                 
                 # Highlight điểm thấp nhất
-                min_idx = np.argmin(values)
+                min_idx = int(np.argmin(values))
                 fig.add_trace(go.Scatter(
                     x=[min_idx],
                     y=[values[min_idx]],
@@ -2009,7 +2093,7 @@ class PivotTableDashboard:
             sparklines_data[row_key] = fig
             
         return sparklines_data
-    
+
     def create_individual_trend_chart(self, data, content_item, time_col, chart_type="Đường", normalize=False):
         """Tạo biểu đồ xu hướng riêng cho một nội dung cụ thể"""
         try:
@@ -2162,22 +2246,20 @@ class PivotTableDashboard:
             st.error(f"Lỗi khi tạo biểu đồ cho {content_item}: {str(e)}")
             return None
 
+@timed_run("Dashboard Hành chính")
 def main():
+    apply_custom_css()
+    
     # HEADER: logo + title on one line (flexbox)
-    try:
-        # Encode logo to base64 for inline <img>
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        logo_path = os.path.join(script_dir, "assets", "logo.png")
-        logo_base64 = ""
-        if os.path.exists(logo_path):
-            with open(logo_path, "rb") as f:
-                logo_base64 = base64.b64encode(f.read()).decode()
-    except Exception:
-        logo_base64 = ""
+    # Logo: data URI được mã hóa một lần cho mỗi process
+    logo_uri = get_logo_data_uri(
+        os.path.dirname(os.path.abspath(__file__)),
+        candidates=(os.path.join("assets", "logo.png"),)
+    )
 
     # Hiển thị logo trong sidebar
-    if logo_base64:
-        st.sidebar.image(f"data:image/png;base64,{logo_base64}", width=100)
+    if logo_uri:
+        st.sidebar.image(logo_uri, width=100)
 
     header_html = f"""
     <div style='
@@ -2234,7 +2316,7 @@ def main():
         </div>
         """, unsafe_allow_html=True)
     
-    # Khởi tạo dashboard và DataManager
+    # Khởi tạo dashboard và DataManager (dashboard đã nạp dữ liệu lấy từ session_state nếu nguồn không đổi)
     dashboard = PivotTableDashboard()
     
     # Initialize data manager để load dữ liệu từ GitHub
@@ -2251,24 +2333,32 @@ def main():
     if connected:
         st.sidebar.success("☁️ Kết nối GitHub thành công")
         
-        # Thử load dữ liệu từ GitHub trước
-        try:
+        # Kết quả dọn backup chạy nền từ lần upload trước
+        if manager.last_cleanup:
+            st.sidebar.caption(manager.last_cleanup)
+            manager.last_cleanup = None
+        
+        # Thử load dữ liệu từ GitHub trước (chỉ tải và xử lý lại khi phiên bản trên GitHub đổi)
+        def load_from_github(target):
             github_data, metadata = manager.load_current_data()
+            if github_data is None or not metadata:
+                return False
+            target.source_metadata = metadata
+            return target.load_data_from_dataframe(github_data, metadata.get('data_version'))
+        
+        try:
+            github_dashboard = get_cached_dashboard(('github', manager.get_data_version()), load_from_github)
             
-            if github_data is not None and metadata:
+            if github_dashboard is not None:
+                dashboard = github_dashboard
+                metadata = dashboard.source_metadata
                 # Có dữ liệu từ GitHub
                 st.sidebar.info(f"""
                 📊 **Dữ liệu từ GitHub:**
                 - 📄 {metadata.get('filename', 'Unknown')}
                 - 📅 Tuần {metadata.get('week_number', '?')}/{metadata.get('year', '?')}
                 """)
-                
-                # Load vào dashboard - SỬA LẠI DÒNG NÀY
-                if dashboard.load_data_from_dataframe(github_data):
-                    file_loaded = True
-                else:
-                    st.sidebar.warning("⚠️ Lỗi xử lý dữ liệu GitHub")
-                    file_loaded = False
+                file_loaded = True
             else:
                 st.sidebar.warning("📭 Chưa có dữ liệu trên GitHub")
                 file_loaded = False
@@ -2297,15 +2387,20 @@ def main():
                 col1, col2 = st.sidebar.columns(2)
                 with col1:
                     if st.button("📊 Xem trước", use_container_width=True):
-                        if dashboard.load_data(uploaded_file):
+                        preview = get_cached_dashboard(
+                            ('upload', hashlib.md5(uploaded_file.getvalue()).hexdigest()),
+                            lambda target: target.load_data(uploaded_file)
+                        )
+                        if preview is not None:
+                            dashboard = preview
                             st.sidebar.success("✅ Đã tải dữ liệu thành công!")
                             file_loaded = True
                 
                 with col2:
                     if st.button("☁️ Upload GitHub", use_container_width=True):
-                        # Đọc file để upload
+                        # Dùng lại DataFrame đã đọc (không parse lại workbook)
                         try:
-                            data = pd.read_excel(uploaded_file)
+                            data, _, _ = read_excel_once(uploaded_file)
                             success = manager.upload_new_file(data, uploaded_file.name)
                             if success:
                                 st.balloons()
@@ -2315,15 +2410,26 @@ def main():
                             st.sidebar.error(f"❌ Lỗi upload: {str(e)}")
             else:
                 # Không có GitHub, chỉ xem local
-                if dashboard.load_data(uploaded_file):
+                local = get_cached_dashboard(
+                    ('upload', hashlib.md5(uploaded_file.getvalue()).hexdigest()),
+                    lambda target: target.load_data(uploaded_file)
+                )
+                if local is not None:
+                    dashboard = local
                     st.sidebar.success("✅ Đã tải dữ liệu thành công!")
                     file_loaded = True
         
         # Tự động load lại nếu đã có đường dẫn trong session
         if 'file_path' in st.session_state:
-            if os.path.exists(st.session_state['file_path']):
-                dashboard.load_data(st.session_state['file_path'])
-                file_loaded = True
+            file_path = st.session_state['file_path']
+            if os.path.exists(file_path):
+                local = get_cached_dashboard(
+                    ('file', file_path, os.path.getmtime(file_path)),
+                    lambda target: target.load_data(file_path)
+                )
+                if local is not None:
+                    dashboard = local
+                    file_loaded = True
     
     # Phần còn lại của dashboard (chỉ hiển thị khi có dữ liệu)
     if file_loaded and dashboard.data is not None:
@@ -2335,35 +2441,28 @@ def main():
         filtered_data = dashboard.filter_data(from_year, from_month, from_week, to_year, to_month, to_week, categories)
         
         # THÊM: Tự động aggregate theo loại báo cáo
-        aggregated_data = dashboard.aggregate_data_by_report_type(filtered_data, report_type)
+        filter_signature = (from_year, from_month, from_week, to_year, to_month, to_week, tuple(categories))
+        aggregated_data = dashboard.aggregate_data_by_report_type(filtered_data, report_type, filter_signature)
         
         # Nút làm mới dữ liệu
         if st.sidebar.button("🔄 Làm mới dữ liệu", use_container_width=True):
-            if connected:
-                # Reload từ GitHub
-                try:
-                    github_data, metadata = manager.load_current_data()
-                    if github_data is not None:
-                        dashboard.load_data_from_dataframe(github_data)
-                        st.rerun()
-                except:
-                    pass
-            elif 'file_path' in st.session_state:
-                dashboard.load_data(st.session_state['file_path'])
-                st.rerun()
+            # Bỏ dashboard đã xử lý và kiểm tra lại phiên bản trên GitHub ở lần rerun sau
+            st.session_state.pop('loaded_dashboards', None)
+            manager._version_checked_at = None
+            st.rerun()
         
         # Tabs cho các chế độ xem
         tab1, tab2, tab3 = st.tabs(["📋 Pivot Table", "📊 Xu hướng theo thời gian", "💾 Xuất báo cáo"])
         
-        with tab1:
+        with tab1, timed_section("tab1 · Pivot Table"):
             # Tạo pivot table với biến động - SỬ DỤNG aggregated_data
-            pivot = dashboard.create_hierarchical_pivot_table_with_ratio(
+            pivot_result = dashboard.create_hierarchical_pivot_table_with_ratio(
                 aggregated_data, rows, cols, values, agg_func, show_ratio_inline
             )
             
-            if pivot is not None:
+            if pivot_result is not None:
                 # Hiển thị pivot table cải tiến
-                dashboard.display_hierarchical_pivot_improved(pivot, aggregated_data)
+                dashboard.display_hierarchical_pivot_improved(pivot_result, aggregated_data)
                 
                 # Tùy chọn xuất
                 col1, col2 = st.columns(2)
@@ -2373,16 +2472,7 @@ def main():
                         st.info("💡 Xuất CSV sẽ chứa dữ liệu gốc (không có biến động HTML)")
                     
                     # Tạo pivot đơn giản cho CSV
-                    simple_pivot = pd.pivot_table(
-                        aggregated_data,
-                        index=rows if rows else None,
-                        columns=cols if cols else None,
-                        values=values,
-                        aggfunc=agg_func,
-                        fill_value=0,
-                        margins=False  # BỎ TỔNG CHUNG
-                    )
-                    
+                    simple_pivot = dashboard.create_export_pivot(aggregated_data, rows, cols, values, agg_func)
                     csv = simple_pivot.to_csv(encoding='utf-8-sig')
                     st.download_button(
                         "📥 Tải CSV",
@@ -2391,7 +2481,7 @@ def main():
                         "text/csv"
                     )
         
-        with tab2:
+        with tab2, timed_section("tab2 · Xu hướng theo thời gian"):
             st.header("Xu hướng theo thời gian (theo thứ tự ưu tiên)")
             
             # Xác định trường thời gian dựa vào kiểu báo cáo
@@ -2516,7 +2606,7 @@ def main():
                     html_table += "</table></div>"
                     st.markdown(html_table, unsafe_allow_html=True)
         
-        with tab3:
+        with tab3, timed_section("tab3 · Xuất báo cáo"):
             st.header("Xuất báo cáo")
             
             # Tạo báo cáo tổng hợp
@@ -2525,32 +2615,35 @@ def main():
                 ["Excel đa sheet với thứ tự ưu tiên", "Excel đơn giản", "CSV"]
             )
             
+            # Báo cáo chỉ được tạo khi bấm nút; bytes lưu trong session_state theo
+            # (phiên bản dữ liệu, bộ lọc, loại báo cáo, cấu hình pivot, định dạng) - không ghi file ra đĩa
+            export_cache = st.session_state.setdefault('export_cache', OrderedDict())
+            export_key = (
+                dashboard.data_version,
+                filter_signature,
+                report_type,
+                (tuple(rows), tuple(cols), values, agg_func),
+                report_format
+            )
+            
             if st.button("Tạo báo cáo", use_container_width=True):
-                if report_format == "Excel đa sheet với thứ tự ưu tiên":
-                    # Tạo file Excel với nhiều sheet
-                    output_file = f'bao_cao_phong_hanh_chinh_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-                    with pd.ExcelWriter(output_file, engine='xlsxwriter') as writer:
+                if export_key not in export_cache:
+                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                    aggregated_data_export = aggregated_data.drop(columns=['Danh_mục_thứ_tự', 'Nội_dung_thứ_tự'], errors='ignore')
+                    
+                    if report_format == "Excel đa sheet với thứ tự ưu tiên":
                         # Sheet 1: Dữ liệu gốc (đã sắp xếp) - SỬ DỤNG aggregated_data
-                        aggregated_data_export = aggregated_data.drop(columns=['Danh_mục_thứ_tự', 'Nội_dung_thứ_tự'], errors='ignore')
-                        aggregated_data_export.to_excel(writer, sheet_name='Dữ liệu đã aggregate', index=False)
+                        sheets = [('Dữ liệu đã aggregate', aggregated_data_export, False)]
                         
                         # Sheet 2: Pivot table (dữ liệu số, không có HTML) - SỬ DỤNG aggregated_data
-                        simple_pivot = pd.pivot_table(
-                            aggregated_data,
-                            index=rows if rows else None,
-                            columns=cols if cols else None,
-                            values=values,
-                            aggfunc=agg_func,
-                            fill_value=0,
-                            margins=False  # BỎ TỔNG CHUNG
-                        )
-                        simple_pivot.to_excel(writer, sheet_name='Pivot Table')
+                        simple_pivot = dashboard.create_export_pivot(aggregated_data, rows, cols, values, agg_func)
+                        sheets.append(('Pivot Table', simple_pivot, True))
                         
                         # Sheet 3: Tổng hợp theo danh mục (theo thứ tự ưu tiên) - SỬ DỤNG aggregated_data
                         category_summary = aggregated_data.groupby('Danh mục')['Số liệu'].agg(['sum', 'mean', 'count'])
                         category_summary['Thứ_tự'] = category_summary.index.map(dashboard.category_priority).fillna(999)
                         category_summary = category_summary.sort_values('Thứ_tự').drop(columns=['Thứ_tự'])
-                        category_summary.to_excel(writer, sheet_name='Theo danh mục')
+                        sheets.append(('Theo danh mục', category_summary, True))
                         
                         # Sheet 4: Tổng hợp theo thời gian - SỬ DỤNG aggregated_data
                         time_summary = aggregated_data.pivot_table(
@@ -2560,7 +2653,7 @@ def main():
                             aggfunc='sum',
                             fill_value=0
                         )
-                        time_summary.to_excel(writer, sheet_name='Theo thời gian')
+                        sheets.append(('Theo thời gian', time_summary, True))
                         
                         # Sheet 5: Tổng hợp theo nội dung (theo thứ tự ưu tiên) - SỬ DỤNG aggregated_data
                         content_summary = aggregated_data.pivot_table(
@@ -2569,7 +2662,7 @@ def main():
                             aggfunc=['sum', 'mean', 'count'],
                             fill_value=0
                         )
-                        content_summary.to_excel(writer, sheet_name='Theo nội dung')
+                        sheets.append(('Theo nội dung', content_summary, True))
                         
                         # Sheet 6: Tỷ lệ thay đổi - CHỈ CHO BÁO CÁO THEO TUẦN
                         if report_type == "Theo Tuần":
@@ -2582,7 +2675,7 @@ def main():
                                     aggfunc='mean',
                                     fill_value=None
                                 )
-                                ratio_summary.to_excel(writer, sheet_name='Tỷ lệ thay đổi')
+                                sheets.append(('Tỷ lệ thay đổi', ratio_summary, True))
                         
                         # Sheet 7: Cấu hình thứ tự ưu tiên cố định
                         priority_df = pd.DataFrame([
@@ -2592,48 +2685,43 @@ def main():
                             {'Loại': 'Nội dung', 'Tên': k, 'Thứ tự': v} 
                             for k, v in dashboard.content_priority.items()
                         ])
-                
                         priority_df = priority_df.sort_values(['Loại', 'Thứ tự'])
-                        priority_df.to_excel(writer, sheet_name='Thứ tự ưu tiên', index=False)
-                    
-                    with open(output_file, 'rb') as f:
-                        st.download_button(
+                        sheets.append(('Thứ tự ưu tiên', priority_df, False))
+                        
+                        export_cache[export_key] = (
                             "📥 Tải báo cáo Excel với thứ tự ưu tiên",
-                            f.read(),
-                            output_file,
-                            "application/vnd.ms-excel"
+                            build_excel_bytes(sheets),
+                            f'bao_cao_phong_hanh_chinh_{timestamp}.xlsx',
+                            EXCEL_MIME
                         )
                     
-                    st.success("✅ Đã tạo báo cáo với thứ tự ưu tiên thành công!")
-                
-                elif report_format == "Excel đơn giản":
-                    # Tạo file Excel đơn giản - SỬ DỤNG aggregated_data
-                    output_file = f'bao_cao_don_gian_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-                    with pd.ExcelWriter(output_file) as writer:
-                        aggregated_data_export = aggregated_data.drop(columns=['Danh_mục_thứ_tự', 'Nội_dung_thứ_tự'], errors='ignore')
-                        aggregated_data_export.to_excel(writer, index=False)
-                    
-                    with open(output_file, 'rb') as f:
-                        st.download_button(
+                    elif report_format == "Excel đơn giản":
+                        export_cache[export_key] = (
                             "📥 Tải Excel đơn giản",
-                            f.read(),
-                            output_file,
-                            "application/vnd.ms-excel"
+                            build_excel_bytes([('Sheet1', aggregated_data_export, False)]),
+                            f'bao_cao_don_gian_{timestamp}.xlsx',
+                            EXCEL_MIME
                         )
                     
-                    st.success("✅ Đã tạo báo cáo đơn giản thành công!")
-                
-                else:  # CSV
-                    aggregated_data_export = aggregated_data.drop(columns=['Danh_mục_thứ_tự', 'Nội_dung_thứ_tự'], errors='ignore')
-                    csv = aggregated_data_export.to_csv(index=False, encoding='utf-8-sig')
-                    st.download_button(
-                        "📥 Tải CSV",
-                        csv,
-                        f"bao_cao_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                        "text/csv"
-                    )
+                    else:  # CSV
+                        export_cache[export_key] = (
+                            "📥 Tải CSV",
+                            aggregated_data_export.to_csv(index=False, encoding='utf-8-sig'),
+                            f"bao_cao_{timestamp}.csv",
+                            "text/csv"
+                        )
                     
-                    st.success("✅ Đã tạo file CSV thành công!")
+                    # Chỉ giữ vài báo cáo gần nhất trong phiên
+                    while len(export_cache) > 4:
+                        export_cache.popitem(last=False)
+                
+                export_cache.move_to_end(export_key)
+                st.success(f"✅ Đã tạo báo cáo ({report_format}) thành công!")
+            
+            # Nút tải vẫn còn sau rerun (bấm tải cũng gây rerun)
+            if export_key in export_cache:
+                label, payload, file_name, mime = export_cache[export_key]
+                st.download_button(label, payload, file_name, mime, use_container_width=True)
     
     else:
         st.info("👆 Vui lòng tải lên file Excel hoặc nhập đường dẫn file để bắt đầu")
@@ -14,26 +14,31 @@ import os
 from dotenv import load_dotenv
 import sys
 from datetime import datetime
-import json
 import base64
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
-# --------------------------------------------------------------------
-# Bypass login nếu đã authenticated ở dashboard tổng
-if 'authenticated' in st.session_state and st.session_state.authenticated:
-    def check_authentication():
-        """Luôn True khi đã đăng nhập ở dashboard chính."""
-        return True
+from static_assets import inject_css, get_logo_data_uri
+from auth_session import is_authenticated
+import columnar_json
+from github_batch import resolve_api_base
+from perf_timing import timed_run, timed_section
 
-    def login_page():   # Nếu file gọi hàm này, ta vô hiệu hóa
-        st.session_state['skip_child_login'] = True
-        return
+# File dữ liệu trong data/latest do manual_fleet_sync ghi: .json.gz khi bật FLEET_DATA_GZIP, .json khi không nén
+FLEET_DATA_FILES = ["fleet_data_latest.json.gz", "fleet_data_latest.json"]
+
+# --------------------------------------------------------------------
+# Dùng chung phiên đăng nhập với dashboard tổng (token đã ký trong session_state)
+def check_authentication():
+    """True khi đã đăng nhập ở dashboard chính."""
+    return is_authenticated()
 # --------------------------------------------------------------------
 
 # Custom CSS
-st.markdown("""
+def apply_custom_css():
+    """Inject the dashboard CSS (must be emitted on every rerun)"""
+    inject_css("""
 <style>
     .main-header {
         font-size: 2.5rem;
@@ -73,7 +78,7 @@ st.markdown("""
         margin-top: 0.5rem;
     }
 </style>
-""", unsafe_allow_html=True)
+    """)
 
 # COLUMN MAPPING - Vietnamese to English
 COLUMN_MAPPING = {
@@ -135,6 +140,15 @@ def get_github_token():
     
     return None
 
+def get_fleet_repo_api():
+    """URL API của repo dữ liệu tổ xe (github_api_base trong secrets thay cho api.github.com, vd. server giả lập)"""
+    api_base = None
+    try:
+        api_base = st.secrets.get("github_api_base", None)
+    except Exception:
+        pass
+    return f"{resolve_api_base(api_base)}/repos/corner-25/vehicle-storage"
+
 def parse_duration_to_hours(duration_str):
     """
     Chuyển đổi thời gian từ format h:mm sang số giờ (float)
@@ -253,39 +267,50 @@ def load_data_from_github():
         'User-Agent': 'Fleet-Dashboard-App'
     }
     
-    # Try Contents API first
-    api_url = "https://api.github.com/repos/corner-25/vehicle-storage/contents/data/latest/fleet_data_latest.json"
-    
+    # Try Contents API first (bản nén trước, không có thì bản .json)
     try:
-        response = requests.get(api_url, headers=headers, timeout=30)
-        
-        if response.status_code == 200:
+        for filename in FLEET_DATA_FILES:
+            api_url = f"{get_fleet_repo_api()}/contents/data/latest/{filename}"
+            response = requests.get(api_url, headers=headers, timeout=30)
+            
+            if response.status_code == 404:
+                continue
+            if response.status_code != 200:
+                break
+            
             api_response = response.json()
             
             # Check if file is too large for Contents API (>1MB)
             if api_response.get('size', 0) > 1000000:
-                return load_large_file_via_git_api(headers)
+                break
             
             # Normal Contents API flow
-            content = base64.b64decode(api_response['content']).decode('utf-8')
+            content = base64.b64decode(api_response['content'])
             
             if not content.strip():
-                return load_large_file_via_git_api(headers)
+                break
             
-            data = json.loads(content)
-            df = pd.DataFrame(data)
-            return process_dataframe(df)
-        else:
-            return load_large_file_via_git_api(headers)
+            return process_dataframe(decode_fleet_payload(content))
+        
+        return load_large_file_via_git_api(headers)
             
     except Exception:
         return load_large_file_via_git_api(headers)
 
+def decode_fleet_payload(content):
+    """Tự nhận biết định dạng file dữ liệu: JSON records (cũ) hoặc JSON dạng cột, có/không gzip"""
+    payload = columnar_json.loads_payload(content)
+    if columnar_json.is_columnar(payload):
+        return columnar_json.columnar_to_frame(payload)
+    return pd.DataFrame(payload)
+
 def load_large_file_via_git_api(headers):
     """Load large file using Git API"""
     try:
+        repo_api = get_fleet_repo_api()
+        
         # Get latest commit
-        commits_url = "https://api.github.com/repos/corner-25/vehicle-storage/commits/main"
+        commits_url = f"{repo_api}/commits/main"
         commits_response = requests.get(commits_url, headers=headers, timeout=30)
         
         if commits_response.status_code != 200:
@@ -294,8 +319,8 @@ def load_large_file_via_git_api(headers):
         latest_commit = commits_response.json()
         tree_sha = latest_commit['commit']['tree']['sha']
         
-        # Navigate to data/latest/fleet_data_latest.json via tree API
-        tree_url = f"https://api.github.com/repos/corner-25/vehicle-storage/git/trees/{tree_sha}"
+        # Navigate to data/latest/fleet_data_latest.json(.gz) via tree API
+        tree_url = f"{repo_api}/git/trees/{tree_sha}"
         tree_response = requests.get(tree_url, headers=headers, timeout=30)
         
         if tree_response.status_code != 200:
@@ -313,7 +338,7 @@ def load_large_file_via_git_api(headers):
             return pd.DataFrame()
         
         # Get data folder tree
-        data_tree_url = f"https://api.github.com/repos/corner-25/vehicle-storage/git/trees/{data_folder}"
+        data_tree_url = f"{repo_api}/git/trees/{data_folder}"
         data_tree_response = requests.get(data_tree_url, headers=headers, timeout=30)
         
         if data_tree_response.status_code != 200:
@@ -331,39 +356,34 @@ def load_large_file_via_git_api(headers):
             return pd.DataFrame()
         
         # Get latest folder tree
-        latest_tree_url = f"https://api.github.com/repos/corner-25/vehicle-storage/git/trees/{latest_folder}"
+        latest_tree_url = f"{repo_api}/git/trees/{latest_folder}"
         latest_tree_response = requests.get(latest_tree_url, headers=headers, timeout=30)
         
         if latest_tree_response.status_code != 200:
             return pd.DataFrame()
         
-        # Find JSON file
+        # Find data file (bản nén trước)
         latest_tree_data = latest_tree_response.json()
-        file_blob = None
-        for item in latest_tree_data.get('tree', []):
-            if item['path'] == 'fleet_data_latest.json' and item['type'] == 'blob':
-                file_blob = item['sha']
-                break
+        blobs = {item['path']: item['sha'] for item in latest_tree_data.get('tree', []) if item['type'] == 'blob'}
+        file_blob = next((blobs[name] for name in FLEET_DATA_FILES if name in blobs), None)
         
         if not file_blob:
             return pd.DataFrame()
         
         # Get file content via blob API
-        blob_url = f"https://api.github.com/repos/corner-25/vehicle-storage/git/blobs/{file_blob}"
+        blob_url = f"{repo_api}/git/blobs/{file_blob}"
         blob_response = requests.get(blob_url, headers=headers, timeout=60)
         
         if blob_response.status_code != 200:
             return pd.DataFrame()
         
         blob_data = blob_response.json()
-        content = base64.b64decode(blob_data['content']).decode('utf-8')
+        content = base64.b64decode(blob_data['content'])
         
         if not content.strip():
             return pd.DataFrame()
         
-        data = json.loads(content)
-        df = pd.DataFrame(data)
-        return process_dataframe(df)
+        return process_dataframe(decode_fleet_payload(content))
         
     except Exception:
         return pd.DataFrame()
@@ -399,6 +419,7 @@ def parse_revenue(revenue_str):
         # If conversion fails, return 0
         return 0.0
         
+@timed_section()
 def process_dataframe(df):
     """Process DataFrame - Apply column mapping and clean data"""
     if df.empty:
@@ -579,6 +600,7 @@ def get_date_range_from_data(df):
     except Exception:
         return datetime.now().date(), datetime.now().date()
 
+@timed_section()
 def create_date_filter_sidebar(df):
     """Create date range filter in sidebar"""
     st.sidebar.markdown("### 📅 Bộ lọc thời gian")
@@ -710,6 +732,7 @@ def create_date_filter_sidebar(df):
     
     return filtered_df, filter_start, filter_end
 
+@timed_section()
 def create_vehicle_filter_sidebar(df):
     """Create vehicle and driver filters in sidebar"""
     st.sidebar.markdown("### 🚗 Bộ lọc xe và tài xế")
@@ -779,6 +802,7 @@ def create_vehicle_filter_sidebar(df):
     
     return df
 
+@timed_section()
 def create_metrics_overview(df):
     """Create overview metrics using English column names"""
     if df.empty:
@@ -914,6 +938,7 @@ def create_metrics_overview(df):
             help="Thời gian trung bình mỗi chuyến"
         )
 
+@timed_section()
 def create_frequency_metrics(df):
     """Create frequency and activity metrics using English columns"""
     st.markdown("## 🎯 Chỉ số tần suất hoạt động")
@@ -1027,6 +1052,7 @@ def create_frequency_metrics(df):
             help="Trung bình số xe hoạt động mỗi ngày"
         )
 
+@timed_section()
 def create_vehicle_performance_table(df):
     """Create detailed vehicle performance table using English columns"""
     st.markdown("## 📋 Hiệu suất chi tiết từng xe")
@@ -1151,6 +1177,7 @@ def create_vehicle_performance_table(df):
         height=400
     )
 
+@timed_section()
 def create_revenue_analysis_tab(df):
     """Tab 1: Phân tích doanh thu"""
     st.markdown("### 💰 Phân tích doanh thu chi tiết")
@@ -1581,6 +1608,7 @@ def create_revenue_analysis_tab(df):
             st.markdown("**⚠️ Lưu ý:**")
             st.warning("Không thể tính insights do dữ liệu ngày tháng không hợp lệ hoặc không đủ")
 
+@timed_section()
 def create_vehicle_efficiency_tab(df):
     """Tab 2: Hiệu suất xe"""
     st.markdown("### 🚗 Phân tích hiệu suất xe")
@@ -1694,6 +1722,7 @@ def create_vehicle_efficiency_tab(df):
 
 
 
+@timed_section()
 def create_overload_analysis_tab(df):
     """Tab 3: Phân tích quá tải và tối ưu hóa"""
     st.markdown("### ⚡ Phân tích quá tải hệ thống xe")
@@ -2069,6 +2098,7 @@ def create_overload_analysis_tab(df):
         else:
             st.info("Không có dữ liệu để hiển thị")
 
+@timed_section()
 def create_distance_analysis_tab(df):
     """Tab 4: Phân tích quãng đường"""
     st.markdown("### 🛣️ Phân tích quãng đường chi tiết")
@@ -2405,6 +2435,7 @@ def create_distance_analysis_tab(df):
     })
     st.dataframe(distance_stats, use_container_width=True, hide_index=True)
 
+@timed_section()
 def create_fuel_analysis_tab(df):
     """Tab 5: Phân tích nhiên liệu chi tiết - Enhanced Version"""
     st.markdown("### ⛽ Phân tích nhiên liệu và định mức tiêu thụ")
@@ -2769,6 +2800,7 @@ def create_fuel_analysis_tab(df):
         )
 
 
+@timed_section()
 def create_export_report_tab(df, start_date, end_date):
     """Tab 6: Xuất báo cáo theo từng xe"""
     st.markdown("### 📊 Báo cáo theo từng xe")
@@ -3054,6 +3086,7 @@ def create_export_report_tab(df, start_date, end_date):
         if st.button("🖨️ In báo cáo", use_container_width=True):
             st.info("💡 Sử dụng Ctrl+P để in trang hoặc xuất PDF từ trình duyệt")
 
+@timed_section()
 def create_detailed_analysis_section(df):
     """Create detailed analysis section with tabs - UPDATED with Export tab"""
     st.markdown("---")
@@ -3111,6 +3144,7 @@ def create_detailed_analysis_section(df):
         
         create_export_report_tab(df, start_date, end_date)
 
+@timed_section()
 def create_driver_performance_table(df):
     """Create driver performance table using English columns"""
     st.markdown("## 👨‍💼 Hiệu suất tài xế")
@@ -3213,28 +3247,16 @@ def create_driver_performance_table(df):
         height=400
     )
 
+@timed_run("Dashboard Tổ xe")
 def main():
     """Main dashboard function - Complete version with all features"""
+    apply_custom_css()
+    
     # HEADER: logo + title on one line (flexbox)
-    try:
-        # Encode logo to base64 for inline <img>
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        logo_base64 = ""
-        # Check for logo.png in current directory first, then in ./assets/
-        for p in [
-            os.path.join(script_dir, "logo.png"),                      # 1️⃣ same-level logo
-            os.path.join(script_dir, "assets", "logo.png")            # 2️⃣ assets folder
-        ]:
-            if os.path.exists(p):
-                with open(p, "rb") as f:
-                    logo_base64 = base64.b64encode(f.read()).decode()
-                break
-    except Exception:
-        logo_base64 = ""
-
-    # Build logo HTML (fallback emoji if logo not found)
-    if logo_base64:
-        logo_html = f"<img src='data:image/png;base64,{logo_base64}' style='height:150px; width:auto;' />"
+    # Logo: data URI được mã hóa một lần cho mỗi process
+    logo_uri = get_logo_data_uri(os.path.dirname(os.path.abspath(__file__)))
+    if logo_uri:
+        logo_html = f"<img src='{logo_uri}' style='height:150px; width:auto;' />"
     else:
         logo_html = "<div style='font-size:2.5rem; margin-right:12px;'>🏥</div>"
 
@@ -3265,7 +3287,7 @@ def main():
     st.markdown(header_html, unsafe_allow_html=True)
     
     # Load data first
-    with st.spinner("📊 Đang tải dữ liệu từ GitHub..."):
+    with st.spinner("📊 Đang tải dữ liệu từ GitHub..."), timed_section("load_data_from_github"):
         df_raw = load_data_from_github()
     
     if df_raw.empty:
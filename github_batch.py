@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Ghi nhiều file lên GitHub trong MỘT commit bằng Git Data API
+blobs -> tree -> commit -> cập nhật ref (optimistic: nếu ref đã đổi thì dựng lại tree/commit trên head mới)
+
+Số API call cố định cho mỗi lần ghi: N blob + 5 (ref, commit, tree, commit mới, cập nhật ref)
+"""
+
+import base64
+import json
+import os
+
+import requests
+
+
+GITHUB_API = "https://api.github.com"
+
+
+def resolve_api_base(api_base=None):
+    """
+    URL gốc của GitHub API: tham số > biến môi trường GITHUB_API_BASE > api.github.com
+
+    Cho phép trỏ toàn bộ đường dữ liệu sang server giả lập (benchmarks/fake_github.py)
+    """
+    return (api_base or os.getenv("GITHUB_API_BASE") or GITHUB_API).rstrip("/")
+
+
+class GitHubBatchError(Exception):
+    """Lỗi khi gọi Git Data API"""
+
+
+def encode_content(content):
+    """Convert str/bytes/dict/list content to bytes (JSON for dict/list)"""
+    if isinstance(content, (dict, list)):
+        content = json.dumps(content, ensure_ascii=False, indent=2)
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    return content
+
+
+class GitHubBatchCommitter:
+    """
+    Commit một nhóm file (thêm/sửa, copy từ blob có sẵn, xóa) thành một commit
+
+    Ví dụ:
+        committer = GitHubBatchCommitter(token, owner, repo)
+        committer.commit_files({"data.json": data, "summary.json": summary}, "Update data")
+    """
+
+    def __init__(self, token, owner, repo, branch="main", api_base=None, verify=True, timeout=30,
+                 session=None):
+        self.owner = owner
+        self.repo = repo
+        self.branch = branch
+        self.api_base = resolve_api_base(api_base)
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        self.session.verify = verify
+        self.headers = {
+            "Authorization": f"token {token}",
+            "Accept": "application/vnd.github.v3+json",
+        }
+
+    def _request(self, method, path, payload=None, allowed=(200, 201)):
+        url = f"{self.api_base}/repos/{self.owner}/{self.repo}/{path}"
+        response = self.session.request(method, url, headers=self.headers, json=payload, timeout=self.timeout)
+        if response.status_code not in allowed:
+            raise GitHubBatchError(f"{method} {path}: {response.status_code} {response.text[:200]}")
+        return response
+
+    def get_head(self):
+        """Return (commit_sha, tree_sha) of the branch head"""
+        ref = self._request("GET", f"git/ref/heads/{self.branch}").json()
+        commit_sha = ref["object"]["sha"]
+        commit = self._request("GET", f"git/commits/{commit_sha}").json()
+        return commit_sha, commit["tree"]["sha"]
+
+    def list_tree(self, path="", tree_sha=None):
+        """
+        Liệt kê (không đệ quy) một thư mục trên branch
+
+        Returns:
+            dict: tên -> {"sha", "type", "size"}; {} nếu thư mục chưa tồn tại
+        """
+        if tree_sha is None:
+            tree_sha = self.get_head()[1]
+
+        for part in [p for p in path.strip("/").split("/") if p]:
+            entries = self.list_tree(tree_sha=tree_sha)
+            entry = entries.get(part)
+            if entry is None or entry["type"] != "tree":
+                return {}
+            tree_sha = entry["sha"]
+
+        tree = self._request("GET", f"git/trees/{tree_sha}").json()
+        return {
+            item["path"]: {"sha": item["sha"], "type": item["type"], "size": item.get("size", 0)}
+            for item in tree.get("tree", [])
+        }
+
+    def get_blob_sha(self, path, tree_sha=None):
+        """Return the blob SHA of a file on the branch, or None if it does not exist"""
+        directory, _, name = path.strip("/").rpartition("/")
+        entry = self.list_tree(directory, tree_sha).get(name)
+        return entry["sha"] if entry and entry["type"] == "blob" else None
+
+    def create_blob(self, content):
+        """Upload content once and return its blob SHA"""
+        payload = {"content": base64.b64encode(encode_content(content)).decode(), "encoding": "base64"}
+        return self._request("POST", "git/blobs", payload).json()["sha"]
+
+    def commit_files(self, files, message, copies=None, deletions=(), max_retries=3):
+        """
+        Tạo một commit duy nhất cho cả nhóm thay đổi
+
+        Args:
+            files: dict đường dẫn -> nội dung (str/bytes/dict/list)
+            message: Commit message
+            copies: dict đường dẫn mới -> blob SHA đã có (copy phía server, không truyền dữ liệu)
+            deletions: Các đường dẫn cần xóa
+            max_retries: Số lần dựng lại commit nếu branch bị commit khác cập nhật trước
+
+        Returns:
+            str: SHA của commit mới
+        """
+        # Blob không phụ thuộc head nên chỉ tạo một lần dù phải thử lại
+        entries = [
+            {"path": path, "mode": "100644", "type": "blob", "sha": self.create_blob(content)}
+            for path, content in files.items()
+        ]
+        entries += [
+            {"path": path, "mode": "100644", "type": "blob", "sha": sha}
+            for path, sha in (copies or {}).items()
+        ]
+        entries += [
+            {"path": path, "mode": "100644", "type": "blob", "sha": None}
+            for path in deletions
+        ]
+
+        for _ in range(max_retries):
+            head_sha, head_tree = self.get_head()
+            tree_sha = self._request("POST", "git/trees", {"base_tree": head_tree, "tree": entries}).json()["sha"]
+            commit_sha = self._request("POST", "git/commits", {
+                "message": message,
+                "tree": tree_sha,
+                "parents": [head_sha],
+            }).json()["sha"]
+
+            # force=False: chỉ cập nhật nếu là fast-forward; 422 = branch đã đổi -> thử lại trên head mới
+            response = self._request("PATCH", f"git/refs/heads/{self.branch}",
+                                     {"sha": commit_sha, "force": False}, allowed=(200, 422))
+            if response.status_code == 200:
+                return commit_sha
+
+        raise GitHubBatchError(f"Branch {self.branch} thay đổi liên tục, đã thử {max_retries} lần")
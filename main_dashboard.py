@@ -7,13 +7,13 @@ Gộp tất cả các dashboard phụ vào một giao diện chung
 import streamlit as st
 import pandas as pd
 import os
-import base64
-from datetime import datetime
-import hashlib
 import importlib.util
 import sys
 from pathlib import Path
 
+from static_assets import inject_css, get_logo_data_uri
+from auth_session import is_authenticated, login, logout
+
 # Page config
 st.set_page_config(
     page_title="Dashboard Phòng Hành chính - UMC",
@@ -23,7 +23,7 @@ st.set_page_config(
 )
 
 # CSS tùy chỉnh
-st.markdown("""
+inject_css("""
 <style>
     .main-header {
         background: #ffffff;
@@ -244,26 +244,11 @@ st.markdown("""
         margin: 2rem 0;
     }
 </style>
-""", unsafe_allow_html=True)
-
-# Thông tin xác thực
-CREDENTIALS = {
-    "phonghc.umc": "hanhchinh1"
-}
-
-def hash_password(password):
-    """Hash mật khẩu để bảo mật"""
-    return hashlib.sha256(password.encode()).hexdigest()
+""")
 
 def check_authentication():
-    """Kiểm tra xác thực người dùng"""
-    if 'authenticated' not in st.session_state:
-        st.session_state.authenticated = False
-    
-    if 'username' not in st.session_state:
-        st.session_state.username = ""
-    
-    return st.session_state.authenticated
+    """Kiểm tra xác thực người dùng (token phiên, không hash lại mật khẩu)"""
+    return is_authenticated()
 
 def login_page():
     """Trang đăng nhập"""
@@ -291,10 +276,7 @@ def login_page():
         submitted = st.form_submit_button("🚀 Đăng nhập", use_container_width=True)
         
         if submitted:
-            if username in CREDENTIALS and CREDENTIALS[username] == password:
-                st.session_state.authenticated = True
-                st.session_state.username = username
-                st.session_state.login_time = datetime.now()
+            if login(username, password):
                 st.success("✅ Đăng nhập thành công!")
                 st.rerun()
             else:
@@ -332,26 +314,12 @@ def login_page():
 
 def create_header():
     """Tạo header cho trang chính"""
-    # Thử load logo
-    logo_base64 = ""
-    try:
-        script_dir = Path(__file__).parent
-        logo_paths = [
-            script_dir / "logo.png",
-            script_dir / "assets" / "logo.png"
-        ]
-        
-        for logo_path in logo_paths:
-            if logo_path.exists():
-                with open(logo_path, "rb") as f:
-                    logo_base64 = base64.b64encode(f.read()).decode()
-                break
-    except:
-        pass
+    # Logo: data URI được mã hóa một lần cho mỗi process
+    logo_uri = get_logo_data_uri(str(Path(__file__).parent))
     
     # Tạo header
-    if logo_base64:
-        logo_html = f'<img src="data:image/png;base64,{logo_base64}" style="height:120px; width:auto; margin-right:20px;" />'
+    if logo_uri:
+        logo_html = f'<img src="{logo_uri}" style="height:120px; width:auto; margin-right:20px;" />'
     else:
         logo_html = '<div style="font-size:4rem; margin-right:20px;">🏥</div>'
     
@@ -387,9 +355,7 @@ def dashboard_selection_page():
     
     with col2:
         if st.button("🚪 Đăng xuất", use_container_width=True, key="logout_btn"):
-            for key in ['authenticated', 'username', 'login_time', 'selected_dashboard']:
-                if key in st.session_state:
-                    del st.session_state[key]
+            logout(extra_keys=('selected_dashboard',))
             st.rerun()
     
     # Menu chọn dashboard - BUTTON ĐƠN GIẢN
@@ -397,7 +363,7 @@ def dashboard_selection_page():
     st.markdown("*Chọn dashboard bạn muốn sử dụng:*")
     
     # CSS ĐẶC BIỆT CHỈ CHỞ BUTTON NÀY
-    st.markdown("""
+    inject_css("""
     <style>
     /* ÉP BUTTON DASHBOARD TO TO */
     div[data-testid="column"] button[kind="primary"] {
@@ -448,7 +414,7 @@ def dashboard_selection_page():
         padding: 8px 16px !important;
     }
     </style>
-    """, unsafe_allow_html=True)
+    """)
     
     col1, col2, col3 = st.columns(3)
     
@@ -619,52 +585,55 @@ def dashboard_selection_page():
         </div>
         """, unsafe_allow_html=True)
 
-def run_admin_dashboard():
-    """Chạy dashboard hành chính"""
-    try:
-        # Kiểm tra file tồn tại
-        if not os.path.exists("dash_phonghc.py"):
-            st.error("❌ Không tìm thấy file dash_phonghc.py")
-            st.info("📁 Files hiện có:")
-            for f in os.listdir("."):
-                if f.endswith(".py"):
-                    st.write(f"- {f}")
-            back_to_menu()
-            return
-        
-        # Import và chạy dashboard hành chính
-        import importlib.util
-        
-        # Thử load module dash_phonghc
-        spec = importlib.util.spec_from_file_location("dash_phonghc", "dash_phonghc.py")
-        if spec and spec.loader:
-            dash_phonghc = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(dash_phonghc)
-            
-            # Kiểm tra function main
-            if hasattr(dash_phonghc, 'main'):
-                # Chạy main function
-                dash_phonghc.main()
-            else:
-                st.error("❌ Không tìm thấy function main() trong dash_phonghc.py")
-                st.info("💡 Hãy đảm bảo file có function main()")
-                back_to_menu()
-        else:
-            st.error("❌ Không thể tạo spec cho dash_phonghc.py")
-            back_to_menu()
-            
-    except Exception as e:
-        st.error(f"❌ Lỗi khi tải Dashboard Hành Chính:")
-        st.code(str(e))
-        st.info("💡 Có thể do thiếu secrets hoặc lỗi import")
-        back_to_menu()
+# ================== SUB-DASHBOARD REGISTRY ==================
+# Mỗi dashboard con: file nguồn, tên module, hàm render gọi mỗi lần rerun.
+SUB_DASHBOARDS = {
+    "admin": {
+        "file": "dash_phonghc.py",
+        "module": "dash_phonghc",
+        "entry": "main",
+        "title": "Dashboard Hành Chính",
+        "hint": "💡 Có thể do thiếu secrets hoặc lỗi import",
+    },
+    "fleet": {
+        "file": "dashboard-to-xe.py",
+        "module": "dashboard_to_xe",
+        "entry": "main",
+        "title": "Dashboard Tổ Xe",
+        "hint": "💡 Có thể do thiếu secrets hoặc lỗi import",
+    },
+    "umc": {
+        "file": "dash-umc.py",
+        "module": "dash_umc",
+        "entry": "render",
+        "title": "Dashboard UMC",
+        "hint": "💡 Có thể do thiếu thư viện hoặc lỗi import\n💡 Đảm bảo đã cài đặt: plotly, pandas, numpy",
+    },
+}
 
-def run_fleet_dashboard():
-    """Chạy dashboard tổ xe"""
+@st.cache_resource(show_spinner=False, max_entries=8)
+def load_dashboard_module(file_path, module_name, mtime):
+    """Compile and import a sub-dashboard module once per process.
+
+    The cache key includes the file mtime, so editing the file loads a fresh copy.
+    """
+    spec = importlib.util.spec_from_file_location(module_name, file_path)
+    if spec is None or spec.loader is None:
+        raise ImportError(f"Không thể tạo spec cho {file_path}")
+    
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def run_sub_dashboard(dashboard_key):
+    """Chạy dashboard con theo registry"""
+    config = SUB_DASHBOARDS[dashboard_key]
+    file_path = config["file"]
+    
     try:
         # Kiểm tra file tồn tại
-        if not os.path.exists("dashboard-to-xe.py"):
-            st.error("❌ Không tìm thấy file dashboard-to-xe.py")
+        if not os.path.exists(file_path):
+            st.error(f"❌ Không tìm thấy file {file_path}")
             st.info("📁 Files hiện có:")
             for f in os.listdir("."):
                 if f.endswith(".py"):
@@ -672,67 +641,23 @@ def run_fleet_dashboard():
             back_to_menu()
             return
         
-        # Import và chạy dashboard tổ xe
-        import importlib.util
+        # Module chỉ import một lần (theo mtime), mỗi rerun chỉ gọi hàm render
+        module = load_dashboard_module(file_path, config["module"], os.path.getmtime(file_path))
+        render = getattr(module, config["entry"], None)
         
-        # Thử load module dashboard-to-xe.py
-        spec = importlib.util.spec_from_file_location("dashboard-to-xe", "dashboard-to-xe.py")
-        if spec and spec.loader:            
-            dashboard_6 = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(dashboard_6)
-            
-            # Kiểm tra function main
-            if hasattr(dashboard_6, 'main'):
-                # Chạy main function
-                dashboard_6.main()
-            else:
-                st.error("❌ Không tìm thấy function main() trong dashboard-to-xe.py")
-                st.info("💡 Hãy đảm bảo file có function main()")
-                back_to_menu()
-        else:
-            st.error("❌ Không thể tạo spec cho dashboard-to-xe.py")
-            back_to_menu()
-            
-    except Exception as e:
-        st.error(f"❌ Lỗi khi tải Dashboard Tổ Xe:")
-        st.code(str(e))
-        st.info("💡 Có thể do thiếu secrets hoặc lỗi import")
-        back_to_menu()
-
-def run_umc_dashboard():
-    """Chạy dashboard UMC Multi-Department"""
-    try:
-        # Kiểm tra file tồn tại
-        if not os.path.exists("dash-umc.py"):
-            st.error("❌ Không tìm thấy file dash-umc.py")
-            st.info("📁 Files hiện có:")
-            for f in os.listdir("."):
-                if f.endswith(".py"):
-                    st.write(f"- {f}")
+        if render is None:
+            st.error(f"❌ Không tìm thấy function {config['entry']}() trong {file_path}")
+            st.info(f"💡 Hãy đảm bảo file có function {config['entry']}()")
             back_to_menu()
             return
         
-        # Import và chạy dashboard UMC
-        import importlib.util
-        
-        # Thử load module dash-umc.py
-        spec = importlib.util.spec_from_file_location("dash-umc", "dash-umc.py")
-        if spec and spec.loader:            
-            dash_umc = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(dash_umc)
-            
-            # Dashboard UMC không cần function main, chỉ cần chạy
-            # Vì nó đã có đầy đủ code Streamlit
-            
-        else:
-            st.error("❌ Không thể tạo spec cho dash-umc.py")
-            back_to_menu()
+        render()
             
     except Exception as e:
-        st.error(f"❌ Lỗi khi tải Dashboard UMC:")
+        st.error(f"❌ Lỗi khi tải {config['title']}:")
         st.code(str(e))
-        st.info("💡 Có thể do thiếu thư viện hoặc lỗi import")
-        st.info("💡 Đảm bảo đã cài đặt: plotly, pandas, numpy")
+        for hint in config["hint"].split("\n"):
+            st.info(hint)
         back_to_menu()
 
 def back_to_menu():
@@ -772,7 +697,7 @@ def main():
     # Sidebar navigation
     with st.sidebar:
         # Sidebar‑specific CSS to isolate its buttons from global styles
-        st.markdown("""
+        inject_css("""
         <style>
         /* RESET and customize only sidebar buttons */
         div[data-testid="stSidebar"] .stButton > button {
@@ -793,7 +718,7 @@ def main():
             color: #fff !important;
         }
         </style>
-        """, unsafe_allow_html=True)
+        """)
         st.markdown("## 🧭 Điều hướng")
 
         current_dashboard = st.session_state.selected_dashboard
@@ -831,9 +756,7 @@ def main():
         st.markdown("---")
 
         if st.button("🚪 Đăng xuất", use_container_width=True):
-            for key in ['authenticated', 'username', 'login_time', 'selected_dashboard']:
-                if key in st.session_state:
-                    del st.session_state[key]
+            logout(extra_keys=('selected_dashboard',))
             st.rerun()
 
         # Thông tin người dùng
@@ -842,12 +765,8 @@ def main():
         st.info(f"**Login:** {st.session_state.login_time.strftime('%H:%M:%S')}")
 
     # Chạy dashboard tương ứng
-    if st.session_state.selected_dashboard == "admin":
-        run_admin_dashboard()
-    elif st.session_state.selected_dashboard == "fleet":
-        run_fleet_dashboard()
-    elif st.session_state.selected_dashboard == "umc":
-        run_umc_dashboard()
+    if st.session_state.selected_dashboard in SUB_DASHBOARDS:
+        run_sub_dashboard(st.session_state.selected_dashboard)
     else:
         st.error("❌ Dashboard không hợp lệ!")
         back_to_menu()
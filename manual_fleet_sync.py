@@ -10,6 +10,8 @@ import numpy as np
 from datetime import datetime
 import logging
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 import base64
 from typing import Dict, List, Optional
@@ -18,6 +20,9 @@ from google.oauth2 import service_account
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
+from github_batch import GitHubBatchCommitter, GitHubBatchError, resolve_api_base
+import columnar_json
+
 # Load environment variables
 load_dotenv()
 
@@ -32,27 +37,118 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Chế độ đọc sheets: batch = 1 request batchGet cho mọi sheet, parallel = mỗi sheet 1 request chạy song song,
+# sequential = từng sheet lần lượt (cách cũ)
+SHEETS_READ_MODES = ("batch", "parallel", "sequential")
+
+# File dữ liệu cho dashboard: .json.gz khi bật FLEET_DATA_GZIP, .json khi không nén
+FLEET_LATEST_FILE = "data/latest/fleet_data_latest.json"
+FLEET_LATEST_GZIP_FILE = "data/latest/fleet_data_latest.json.gz"
+
+# Cột lặp nhiều luôn mã hóa từ điển (không phụ thuộc ngưỡng tự động của columnar_json)
+FLEET_DICTIONARY_COLUMNS = ['Mã xe', 'Tên tài xế', 'Loại xe']
+
+
+class SheetsBackend:
+    """
+    Nguồn dữ liệu sheets của sync engine (Google Sheets thật hoặc bản giả lập trong benchmarks)
+
+    Hàng được đánh số từ 1 như Google Sheets; hàng 1 là header.
+    """
+
+    def list_sheets(self) -> List[str]:
+        """Tên các sheet (mỗi xe một sheet)"""
+        raise NotImplementedError
+
+    def get_values(self, sheet_name: str, first_row: int = 1) -> List[List]:
+        """Các hàng từ first_row đến hết sheet (hàng có thể lệch số cột)"""
+        raise NotImplementedError
+
+    def batch_get_values(self, first_rows: Dict[str, int]) -> Dict[str, List[List]]:
+        """Đọc nhiều sheet; first_rows: tên sheet -> hàng bắt đầu. Mặc định đọc lần lượt từng sheet"""
+        return {name: self.get_values(name, first_row) for name, first_row in first_rows.items()}
+
+
+class GoogleSheetsBackend(SheetsBackend):
+    """Google Sheets API v4; mỗi thread dùng service riêng (client googleapiclient không thread-safe)"""
+
+    def __init__(self, credentials, spreadsheet_id: str, num_retries: int = 3):
+        self.credentials = credentials
+        self.spreadsheet_id = spreadsheet_id
+        # googleapiclient tự thử lại với backoff khi gặp 429 (quota) / 5xx
+        self.num_retries = num_retries
+        self._local = threading.local()
+
+    @property
+    def service(self):
+        if getattr(self._local, 'service', None) is None:
+            self._local.service = build('sheets', 'v4', credentials=self.credentials, cache_discovery=False)
+        return self._local.service
+
+    @staticmethod
+    def a1_range(sheet_name: str, first_row: int = 1) -> str:
+        quoted = "'" + sheet_name.replace("'", "''") + "'"
+        return quoted if first_row <= 1 else f"{quoted}!A{first_row}:ZZZ"
+
+    def list_sheets(self) -> List[str]:
+        metadata = self.service.spreadsheets().get(
+            spreadsheetId=self.spreadsheet_id, fields='sheets.properties.title'
+        ).execute(num_retries=self.num_retries)
+        return [sheet['properties']['title'] for sheet in metadata.get('sheets', [])]
+
+    def get_values(self, sheet_name: str, first_row: int = 1) -> List[List]:
+        result = self.service.spreadsheets().values().get(
+            spreadsheetId=self.spreadsheet_id, range=self.a1_range(sheet_name, first_row)
+        ).execute(num_retries=self.num_retries)
+        return result.get('values', [])
+
+    def batch_get_values(self, first_rows: Dict[str, int]) -> Dict[str, List[List]]:
+        names = list(first_rows)
+        result = self.service.spreadsheets().values().batchGet(
+            spreadsheetId=self.spreadsheet_id,
+            ranges=[self.a1_range(name, first_rows[name]) for name in names]
+        ).execute(num_retries=self.num_retries)
+        # valueRanges trả về theo đúng thứ tự ranges
+        return {name: value_range.get('values', [])
+                for name, value_range in zip(names, result.get('valueRanges', []))}
+
+
 class ManualFleetSync:
     """
     Manual Fleet Data Sync Engine
     Fixed version - no ensure_ascii issues
     """
     
-    def __init__(self):
-        """Khởi tạo sync engine"""
+    def __init__(self, api_base: Optional[str] = None, sheets_backend: Optional[SheetsBackend] = None):
+        """
+        Khởi tạo sync engine
+
+        Args:
+            api_base: URL gốc GitHub API (mặc định GITHUB_API_BASE hoặc api.github.com)
+            sheets_backend: Nguồn sheets có sẵn (ví dụ bản giả lập); None = Google Sheets, xác thực khi sync
+        """
         self.sheets_service = None
+        self.sheets_backend = sheets_backend
+        
+        # Đọc tăng dần: tên sheet -> {"header", "next_row", "data"} của lần đọc trước
+        self.sheet_cursors = {}
         
         # Config cố định
         self.config = {
             "google_sheets": {
                 "credentials_file": "ivory-haven-463209-b8-09944271707f.json",
-                "spreadsheet_id": "1sYzuvnv-lzQcv-IZjT672LTpfUrqdWCesx4pW8mIuqM"
+                "spreadsheet_id": "1sYzuvnv-lzQcv-IZjT672LTpfUrqdWCesx4pW8mIuqM",
+                "read_mode": os.getenv('FLEET_SHEETS_MODE', 'batch'),
+                "max_workers": int(os.getenv('FLEET_SHEETS_WORKERS', '4'))
             },
             "github": {
                 "username": "corner-25",
                 "repository": "vehicle-storage",
                 "token": self.get_github_token(),
-                "branch": "main"
+                "branch": "main",
+                "api_base": resolve_api_base(api_base),
+                # Nén gzip file dữ liệu (dashboard tự nhận biết)
+                "compress": os.getenv('FLEET_DATA_GZIP', '').lower() in ('1', 'true', 'yes')
             }
         }
         
@@ -182,13 +278,12 @@ class ManualFleetSync:
                 creds_data, scopes=scopes
             )
             
-            self.sheets_service = build('sheets', 'v4', credentials=credentials)
+            spreadsheet_id = self.config['google_sheets']['spreadsheet_id']
+            self.sheets_backend = GoogleSheetsBackend(credentials, spreadsheet_id)
+            self.sheets_service = self.sheets_backend.service
             
             # Test connection
-            spreadsheet_id = self.config['google_sheets']['spreadsheet_id']
-            test_result = self.sheets_service.spreadsheets().get(
-                spreadsheetId=spreadsheet_id
-            ).execute()
+            self.sheets_backend.list_sheets()
             
             logger.info("✅ Google Sheets connected successfully")
             return True
@@ -197,69 +292,125 @@ class ManualFleetSync:
             logger.error(f"❌ Google Sheets error: {e}")
             return False
             
-    def read_all_sheets(self) -> Optional[pd.DataFrame]:
-        """Đọc tất cả sheets và merge"""
+    def normalize_sheet_values(self, sheet_name: str, values: List[List]) -> Optional[pd.DataFrame]:
+        """Chuẩn hóa dữ liệu một sheet (hàng lệch số cột) thành DataFrame chuyến xe của một xe"""
+        if len(values) < 2:
+            return None
+        
+        # Convert to DataFrame
+        headers = values[0]
+        data_rows = values[1:]
+        
+        # Clean data
+        max_cols = len(headers)
+        cleaned_data = []
+        
+        for row in data_rows:
+            while len(row) < max_cols:
+                row.append(None)
+            if len(row) > max_cols:
+                row = row[:max_cols]
+            cleaned_data.append(row)
+        
+        df = pd.DataFrame(cleaned_data, columns=headers)
+        
+        # Add metadata
+        df['Mã xe'] = sheet_name
+        df['Tên tài xế'] = df['Email Address'].map(self.driver_names).fillna(df['Email Address'])
+        
+        if sheet_name in self.admin_vehicles:
+            df['Loại xe'] = 'Hành chính'
+            # Set missing columns to null
+            df['Chi tiết chuyến xe'] = None
+            df['Doanh thu'] = None
+        else:
+            df['Loại xe'] = 'Cứu thương'
+        
+        return df
+    
+    def _fetch_sheet(self, sheet_name: str, first_row: int) -> Optional[List[List]]:
+        """Đọc một sheet; None nếu lỗi (sheet lỗi được bỏ qua)"""
         try:
-            spreadsheet_id = self.config['google_sheets']['spreadsheet_id']
-            
-            # Get sheet info
-            sheet_metadata = self.sheets_service.spreadsheets().get(
-                spreadsheetId=spreadsheet_id
-            ).execute()
+            return self.sheets_backend.get_values(sheet_name, first_row)
+        except Exception as e:
+            logger.error(f"❌ Error reading {sheet_name}: {e}")
+            return None
+    
+    def fetch_sheet_values(self, first_rows: Dict[str, int], mode: str = "batch",
+                           max_workers: int = 4) -> Dict[str, Optional[List[List]]]:
+        """Đọc các sheet theo chế độ mode; first_rows: tên sheet -> hàng bắt đầu"""
+        if mode == "batch":
+            try:
+                return self.sheets_backend.batch_get_values(first_rows)
+            except Exception as e:
+                logger.warning(f"⚠️ batchGet failed ({e}), reading sheets one by one")
+                mode = "sequential"
+        
+        if mode == "parallel":
+            with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+                futures = {name: executor.submit(self._fetch_sheet, name, first_row)
+                           for name, first_row in first_rows.items()}
+                return {name: future.result() for name, future in futures.items()}
+        
+        return {name: self._fetch_sheet(name, first_row) for name, first_row in first_rows.items()}
+    
+    def _merge_sheet_values(self, sheet_name: str, first_row: int, values: List[List],
+                            incremental: bool) -> Optional[pd.DataFrame]:
+        """Chuẩn hóa dữ liệu vừa đọc; ở chế độ tăng dần ghép các hàng mới vào dữ liệu lần trước"""
+        cursor = self.sheet_cursors.get(sheet_name) if first_row > 1 else None
+        
+        if cursor is None:
+            header = values[0] if values else None
+            df = self.normalize_sheet_values(sheet_name, values)
+            next_row = len(values) + 1
+        else:
+            header = cursor['header']
+            new_df = self.normalize_sheet_values(sheet_name, [list(header)] + values)
+            df = cursor['data'] if new_df is None else pd.concat([cursor['data'], new_df], ignore_index=True)
+            next_row = first_row + len(values)
+        
+        if incremental and df is not None:
+            self.sheet_cursors[sheet_name] = {'header': list(header), 'next_row': next_row, 'data': df}
+        return df
+    
+    def read_all_sheets(self, mode: Optional[str] = None, incremental: bool = False,
+                        max_workers: Optional[int] = None) -> Optional[pd.DataFrame]:
+        """
+        Đọc tất cả sheets và merge
+        
+        Args:
+            mode: "batch" | "parallel" | "sequential" (mặc định theo config read_mode)
+            incremental: Chỉ đọc các hàng thêm mới kể từ lần đọc trước (sheet Google Form chỉ
+                         thêm hàng ở cuối); phần đã đọc lấy lại từ sheet_cursors
+            max_workers: Số request đồng thời ở chế độ parallel
+        """
+        try:
+            sheets_config = self.config['google_sheets']
+            mode = mode or sheets_config.get('read_mode', 'batch')
+            if mode not in SHEETS_READ_MODES:
+                raise ValueError(f"Chế độ đọc sheets không hợp lệ: {mode}")
+            
+            sheet_names = self.sheets_backend.list_sheets()
+            first_rows = {
+                name: self.sheet_cursors[name]['next_row'] if incremental and name in self.sheet_cursors else 1
+                for name in sheet_names
+            }
+            fetched = self.fetch_sheet_values(first_rows, mode, max_workers or sheets_config.get('max_workers', 4))
             
             all_data = []
             
-            for sheet in sheet_metadata.get('sheets', []):
-                sheet_name = sheet['properties']['title']
+            for sheet_name in sheet_names:
+                values = fetched.get(sheet_name)
+                if values is None:
+                    continue
                 
-                try:
-                    # Read sheet data
-                    result = self.sheets_service.spreadsheets().values().get(
-                        spreadsheetId=spreadsheet_id,
-                        range=f"'{sheet_name}'"
-                    ).execute()
-                    
-                    values = result.get('values', [])
-                    
-                    if len(values) < 2:
-                        logger.warning(f"⚠️ Sheet {sheet_name} no data")
-                        continue
-                    
-                    # Convert to DataFrame
-                    headers = values[0]
-                    data_rows = values[1:]
-                    
-                    # Clean data
-                    max_cols = len(headers)
-                    cleaned_data = []
-                    
-                    for row in data_rows:
-                        while len(row) < max_cols:
-                            row.append(None)
-                        if len(row) > max_cols:
-                            row = row[:max_cols]
-                        cleaned_data.append(row)
-                    
-                    df = pd.DataFrame(cleaned_data, columns=headers)
-                    
-                    # Add metadata
-                    df['Mã xe'] = sheet_name
-                    df['Tên tài xế'] = df['Email Address'].map(self.driver_names).fillna(df['Email Address'])
-                    
-                    if sheet_name in self.admin_vehicles:
-                        df['Loại xe'] = 'Hành chính'
-                        # Set missing columns to null
-                        df['Chi tiết chuyến xe'] = None
-                        df['Doanh thu'] = None
-                    else:
-                        df['Loại xe'] = 'Cứu thương'
-                    
-                    all_data.append(df)
-                    logger.info(f"✅ {sheet_name}: {len(df)} trips")
-                    
-                except Exception as e:
-                    logger.error(f"❌ Error reading {sheet_name}: {e}")
+                df = self._merge_sheet_values(sheet_name, first_rows[sheet_name], values, incremental)
+                if df is None:
+                    logger.warning(f"⚠️ Sheet {sheet_name} no data")
                     continue
+                
+                all_data.append(df)
+                logger.info(f"✅ {sheet_name}: {len(df)} trips")
             
             if not all_data:
                 return None
@@ -281,7 +432,7 @@ class ManualFleetSync:
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             
             # Check if repo exists first
-            check_url = f"https://api.github.com/repos/{github_config['username']}/{github_config['repository']}"
+            check_url = f"{github_config['api_base']}/repos/{github_config['username']}/{github_config['repository']}"
             headers = {
                 'Authorization': f"token {github_config['token']}",
                 'Accept': 'application/vnd.github.v3+json'
@@ -301,53 +452,35 @@ class ManualFleetSync:
             
             logger.info("✅ Repository found")
             
-            # FIXED: Convert to JSON without ensure_ascii parameter
-            combined_json = data.to_json(orient='records', indent=2)
-            
-            # DEBUG: Check JSON content before upload
-            logger.info(f"📄 JSON content length: {len(combined_json)} characters")
-            logger.info(f"📄 JSON preview: {combined_json[:200]}...")
-            
-            if not combined_json or combined_json.strip() == "":
-                logger.error("❌ CRITICAL: JSON content is empty!")
+            # Dạng cột: tên cột chỉ lưu một lần, cột lặp nhiều (xe, tài xế, loại xe) mã hóa từ điển
+            if len(data) == 0:
+                logger.error("❌ CRITICAL: No trips to upload!")
                 return False
             
-            if len(combined_json) < 100:
-                logger.warning(f"⚠️ JSON content seems too short: {combined_json}")
-            
-            # Save latest data (for dashboard) - ONLY THIS, NO BACKUP
-            latest_filename = "data/latest/fleet_data_latest.json"
-            logger.info(f"🔄 Uploading main data file: {latest_filename}")
+            compress = github_config.get('compress', False)
+            dictionary_columns = [column for column in FLEET_DICTIONARY_COLUMNS if column in data.columns]
+            combined_json = columnar_json.encode_frame(data, dictionary_columns=dictionary_columns, compress=compress)
+            logger.info(f"📄 Payload: {len(data)} trips, {len(combined_json):,} bytes")
             
-            upload_success = self.upload_file_to_github(
-                combined_json,
-                latest_filename,
-                f"Update latest data - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-            )
-            
-            if not upload_success:
-                logger.error("❌ CRITICAL: Failed to upload main data file!")
-                return False
-            else:
-                logger.info("✅ Main data file uploaded successfully")
-            
-            # Save summary (overwrite, no timestamp)
-            logger.info("🔄 Uploading summary file...")
+            # Data (cho dashboard) + summary trong cùng một commit
+            latest_filename = FLEET_LATEST_GZIP_FILE if compress else FLEET_LATEST_FILE
+            stale_filename = FLEET_LATEST_FILE if compress else FLEET_LATEST_GZIP_FILE
+            summary_filename = "data/summary/summary_latest.json"
             summary = self.generate_summary(data)
             summary_json = json.dumps(summary, indent=2, ensure_ascii=False)
-            summary_filename = "data/summary/summary_latest.json"
-            
-            summary_success = self.upload_file_to_github(
-                summary_json,
-                summary_filename,
-                f"Update summary - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+
+            logger.info(f"🔄 Uploading {latest_filename} + {summary_filename} (1 commit)")
+            upload_success = self.upload_files_to_github(
+                {latest_filename: combined_json, summary_filename: summary_json},
+                f"Update latest data - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+                # Xóa bản định dạng kia (nếu có) để dashboard không đọc nhầm dữ liệu cũ
+                stale_files=[stale_filename]
             )
-            
-            if summary_success:
-                logger.info("✅ Summary file uploaded successfully")
-            else:
-                logger.warning("⚠️ Summary upload failed, but main data is OK")
-            
+
+            if not upload_success:
+                logger.error("❌ CRITICAL: Failed to upload data files!")
+                return False
+
             logger.info("✅ Data saved to GitHub successfully")
             return True
             
@@ -355,49 +488,34 @@ class ManualFleetSync:
             logger.error(f"❌ GitHub save error: {e}")
             return False
     
-    def upload_file_to_github(self, content: str, filename: str, commit_message: str) -> bool:
-        """Upload single file to GitHub"""
+    def upload_files_to_github(self, files: Dict[str, object], commit_message: str,
+                               stale_files: Optional[List[str]] = None) -> bool:
+        """Upload nhiều file lên GitHub trong một commit (Git Data API), xóa các stale_files đang tồn tại"""
         try:
             github_config = self.config['github']
-            
-            url = f"https://api.github.com/repos/{github_config['username']}/{github_config['repository']}/contents/{filename}"
-            headers = {
-                'Authorization': f"token {github_config['token']}",
-                'Accept': 'application/vnd.github.v3+json'
-            }
-            
-            # Encode content
-            content_encoded = base64.b64encode(content.encode('utf-8')).decode('utf-8')
-            
-            data = {
-                "message": commit_message,
-                "content": content_encoded,
-                "branch": github_config['branch']
-            }
-            
-            # Check if file exists (for update)
-            response = requests.get(url, headers=headers)
-            if response.status_code == 200:
-                data["sha"] = response.json()["sha"]
-                logger.info(f"📝 Updating existing file: {filename}")
-            else:
-                logger.info(f"📝 Creating new file: {filename}")
-            
-            # Upload file
-            response = requests.put(url, headers=headers, json=data)
-            
-            if response.status_code in [200, 201]:
-                logger.info(f"✅ Successfully uploaded: {filename}")
-                return True
-            else:
-                logger.error(f"❌ Upload error {filename}")
-                logger.error(f"Status: {response.status_code}")
-                logger.error(f"Response: {response.text}")
-                return False
-                
+            committer = GitHubBatchCommitter(
+                github_config['token'],
+                github_config['username'],
+                github_config['repository'],
+                branch=github_config['branch'],
+                api_base=github_config['api_base']
+            )
+
+            deletions = [path for path in stale_files or [] if committer.get_blob_sha(path)]
+            commit_sha = committer.commit_files(files, commit_message, deletions=deletions)
+            logger.info(f"✅ Successfully uploaded {len(files)} files in commit {commit_sha[:7]}")
+            return True
+
+        except GitHubBatchError as e:
+            logger.error(f"❌ Upload error: {e}")
+            return False
         except Exception as e:
             logger.error(f"❌ Upload file error: {e}")
             return False
+
+    def upload_file_to_github(self, content: str, filename: str, commit_message: str) -> bool:
+        """Upload single file to GitHub"""
+        return self.upload_files_to_github({filename: content}, commit_message)
     
     def generate_summary(self, data: pd.DataFrame) -> Dict:
         """Tạo summary stats"""
@@ -424,19 +542,19 @@ class ManualFleetSync:
             logger.error(f"❌ Summary error: {e}")
             return {'error': str(e)}
     
-    def sync_now(self) -> bool:
-        """Thực hiện sync ngay"""
+    def sync_now(self, incremental: bool = False) -> bool:
+        """Thực hiện sync ngay (incremental: chỉ đọc các hàng mới kể từ lần sync trước)"""
         logger.info("🚀 Starting manual sync...")
         
         self.sync_stats['total_syncs'] += 1
         
         try:
-            # 1. Authenticate Google Sheets
-            if not self.authenticate_google_sheets():
+            # 1. Authenticate Google Sheets (bỏ qua nếu đã có nguồn sheets)
+            if self.sheets_backend is None and not self.authenticate_google_sheets():
                 raise Exception("Google Sheets authentication failed")
             
             # 2. Read all data
-            combined_data = self.read_all_sheets()
+            combined_data = self.read_all_sheets(incremental=incremental)
             if combined_data is None or len(combined_data) == 0:
                 raise Exception("No data from Google Sheets")
             
@@ -466,9 +584,11 @@ class ManualFleetSync:
         }
         
         try:
-            # Test Google Sheets
-            if self.authenticate_google_sheets():
-                results['google_sheets'] = True
+            # Test Google Sheets (hoặc nguồn sheets đã cấu hình sẵn)
+            if self.sheets_backend is None:
+                results['google_sheets'] = self.authenticate_google_sheets()
+            else:
+                results['google_sheets'] = bool(self.sheets_backend.list_sheets())
             
             # Test GitHub
             github_config = self.config['github']
@@ -477,7 +597,7 @@ class ManualFleetSync:
                     'Authorization': f"token {github_config['token']}",
                     'Accept': 'application/vnd.github.v3+json'
                 }
-                response = requests.get('https://api.github.com/user', headers=headers)
+                response = requests.get(f"{github_config['api_base']}/user", headers=headers)
                 if response.status_code == 200:
                     results['github'] = True
                     user_info = response.json()
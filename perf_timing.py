@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Đo thời gian từng phần (load / transform / render) của mỗi lần rerun Streamlit
+
+Bật bằng một trong các cách: `perf_timing = true` trong secrets.toml, biến môi trường PERF_TIMING=1,
+hoặc thêm `?perf=1` vào URL. Khi tắt, timed_section chỉ kiểm tra một biến rồi gọi thẳng hàm gốc.
+
+    @timed_run("Dashboard Tổ xe")          # bắt đầu đo + vẽ bảng debug cuối lần rerun
+    def main():
+        with timed_section("load_data_from_github"):
+            df = load_data_from_github()
+        create_metrics_overview(df)
+
+    @timed_section()                       # tên mặc định = tên hàm
+    def create_metrics_overview(df): ...
+"""
+
+import functools
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import streamlit as st
+
+
+PERF_ENV_VAR = "PERF_TIMING"
+PERF_QUERY_PARAM = "perf"
+PERF_HISTORY_KEY = "perf_timing_history"
+PERF_HISTORY_SIZE = 10  # Số lần rerun gần nhất giữ trong session_state
+
+# Mỗi session Streamlit chạy script trong thread riêng -> mỗi thread một bộ đo
+_local = threading.local()
+
+
+def _truthy(value):
+    return str(value).strip().lower() in ("1", "true", "yes", "on")
+
+
+def is_enabled():
+    """Timing is on via env var, secrets or the ?perf=1 query param"""
+    if _truthy(os.getenv(PERF_ENV_VAR, "")):
+        return True
+    try:
+        if _truthy(st.secrets.get("perf_timing", False)):
+            return True
+    except Exception:
+        pass
+    try:
+        return _truthy(st.query_params.get(PERF_QUERY_PARAM, ""))
+    except Exception:
+        return False
+
+
+class RunTimings:
+    """Các đoạn đã đo trong một lần rerun (đoạn lồng nhau được lưu theo đường dẫn)"""
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.perf_counter()
+        self.finished = None
+        self.stack = []
+        self.sections = []  # {"path", "start", "duration"}, start tính từ đầu lần rerun
+
+    def push(self, name):
+        path = self.stack[-1][0] + (name,) if self.stack else (name,)
+        self.stack.append((path, time.perf_counter()))
+
+    def pop(self):
+        path, started = self.stack.pop()
+        self.sections.append({
+            "path": path,
+            "start": started - self.started,
+            "duration": time.perf_counter() - started,
+        })
+
+    def finish(self):
+        self.finished = time.perf_counter()
+
+    @property
+    def total(self):
+        return (self.finished or time.perf_counter()) - self.started
+
+    def totals(self):
+        """Tổng thời gian và số lần gọi theo đường dẫn, theo thứ tự bắt đầu"""
+        totals = OrderedDict()
+        for section in sorted(self.sections, key=lambda s: s["start"]):
+            entry = totals.setdefault(section["path"], {"calls": 0, "seconds": 0.0})
+            entry["calls"] += 1
+            entry["seconds"] += section["duration"]
+        return totals
+
+
+class timed_section:
+    """Đo một đoạn code (context manager) hoặc một hàm (decorator); không làm gì khi chưa bật"""
+
+    __slots__ = ("name", "_recorder")
+
+    def __init__(self, name=None):
+        self.name = name
+        self._recorder = None
+
+    def __enter__(self):
+        self._recorder = getattr(_local, "recorder", None)
+        if self._recorder is not None:
+            self._recorder.push(self.name or "section")
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._recorder is not None:
+            self._recorder.pop()
+            self._recorder = None
+        return False
+
+    def __call__(self, func):
+        name = self.name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            recorder = getattr(_local, "recorder", None)
+            if recorder is None:
+                return func(*args, **kwargs)
+            recorder.push(name)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                recorder.pop()
+
+        return wrapper
+
+
+def begin_run(name):
+    """Start timing a rerun; returns the recorder, or None when timing is disabled"""
+    _local.recorder = RunTimings(name) if is_enabled() else None
+    return _local.recorder
+
+
+def end_run():
+    """Stop timing, keep the summary in session_state and return the recorder"""
+    recorder = getattr(_local, "recorder", None)
+    _local.recorder = None
+    if recorder is None:
+        return None
+
+    recorder.finish()
+    history = st.session_state.setdefault(PERF_HISTORY_KEY, [])
+    history.append({
+        "name": recorder.name,
+        "at": time.strftime("%H:%M:%S"),
+        "total": recorder.total,
+        "sections": {" › ".join(path): entry["seconds"] for path, entry in recorder.totals().items()},
+    })
+    del history[:-PERF_HISTORY_SIZE]
+    return recorder
+
+
+def render_timing_panel(recorder, container=None):
+    """Flame-style breakdown of one rerun plus the recent rerun history"""
+    import pandas as pd
+    import plotly.graph_objects as go
+
+    container = container or st.sidebar
+    with container.expander(f"⏱️ Thời gian xử lý: {recorder.total:.2f}s", expanded=False):
+        if not recorder.sections:
+            st.caption("Chưa có đoạn nào được đo")
+            return
+
+        # Flame chart: trục x = thời gian từ đầu rerun, mỗi tầng lồng nhau một hàng
+        depth_count = max(len(section["path"]) for section in recorder.sections)
+        fig = go.Figure(go.Bar(
+            base=[section["start"] for section in recorder.sections],
+            x=[section["duration"] for section in recorder.sections],
+            y=[len(section["path"]) for section in recorder.sections],
+            orientation="h",
+            text=[section["path"][-1] for section in recorder.sections],
+            textposition="inside",
+            insidetextanchor="start",
+            hovertext=[
+                f"{' › '.join(section['path'])}<br>{section['duration'] * 1000:.1f} ms"
+                for section in recorder.sections
+            ],
+            hoverinfo="text",
+        ))
+        fig.update_layout(
+            height=60 + 28 * depth_count,
+            margin=dict(l=0, r=0, t=10, b=0),
+            bargap=0.05,
+            xaxis_title="giây",
+            yaxis=dict(autorange="reversed", showticklabels=False),
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
+        table = pd.DataFrame([
+            {
+                "Đoạn": "  " * (len(path) - 1) + path[-1],
+                "Số lần": entry["calls"],
+                "ms": round(entry["seconds"] * 1000, 1),
+                "%": round(entry["seconds"] / recorder.total * 100, 1) if recorder.total else 0,
+            }
+            for path, entry in recorder.totals().items()
+        ])
+        st.dataframe(table, hide_index=True, use_container_width=True)
+
+        history = st.session_state.get(PERF_HISTORY_KEY, [])
+        if len(history) > 1:
+            st.caption("Các lần rerun gần đây")
+            st.dataframe(pd.DataFrame([
+                {"Lúc": run["at"], "Dashboard": run["name"], "Tổng (ms)": round(run["total"] * 1000, 1)}
+                for run in reversed(history)
+            ]), hide_index=True, use_container_width=True)
+
+
+def timed_run(name, container=None):
+    """Decorator for a dashboard entry point: time the whole rerun and show the debug panel"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if begin_run(name) is None:
+                return func(*args, **kwargs)
+            try:
+                result = func(*args, **kwargs)
+            except BaseException:
+                # st.rerun()/st.stop() hoặc lỗi: bỏ kết quả đo của lần chạy dở
+                _local.recorder = None
+                raise
+            render_timing_panel(end_run(), container)
+            return result
+
+        return wrapper
+
+    return decorator
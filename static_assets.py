@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Static assets dùng chung cho các dashboard
+Logo và CSS được đọc/mã hóa một lần cho mỗi process (cache theo đường dẫn + mtime)
+"""
+
+import base64
+import mimetypes
+import os
+import re
+
+import streamlit as st
+
+
+LOGO_CANDIDATES = ("logo.png", os.path.join("assets", "logo.png"))
+
+
+@st.cache_resource(show_spinner=False, max_entries=32)
+def _encode_data_uri(path, mtime):
+    """Read a file and return it as a base64 data URI (cached per path + mtime)"""
+    mime_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    with open(path, "rb") as f:
+        encoded = base64.b64encode(f.read()).decode()
+    return f"data:{mime_type};base64,{encoded}"
+
+
+def get_data_uri(path):
+    """Return the cached data URI of a file, or "" if it cannot be read"""
+    try:
+        return _encode_data_uri(path, os.path.getmtime(path))
+    except OSError:
+        return ""
+
+
+def get_logo_data_uri(base_dir, candidates=LOGO_CANDIDATES):
+    """Return the data URI of the first logo found under base_dir, or "" if none"""
+    for candidate in candidates:
+        path = os.path.join(base_dir, candidate)
+        if os.path.exists(path):
+            return get_data_uri(path)
+    return ""
+
+
+@st.cache_resource(show_spinner=False, max_entries=32)
+def _build_style_block(css):
+    """Minify a CSS bundle once per process and wrap it in a <style> tag"""
+    css = re.sub(r"</?style>", "", css)
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};,])\s*", r"\1", css)
+    return f"<style>{css.strip()}</style>"
+
+
+def inject_css(css):
+    """Emit a CSS bundle.
+
+    Streamlit drops every element that is not re-emitted on a rerun, so the
+    <style> tag has to be sent on each run; only building it is cached.
+    """
+    st.markdown(_build_style_block(css), unsafe_allow_html=True)
@@ -4,17 +4,185 @@ API Handler - Xử lý lấy dữ liệu từ API thay thế cho việc copy th
 
 import requests
 import json
-from datetime import datetime, date
+import os
+import sys
+import time
+import hashlib
+import threading
+import shutil
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, date, timedelta
 import streamlit as st
 import urllib3
 import base64
+from requests.adapters import HTTPAdapter
+
+# github_batch.py nằm ở thư mục gốc của repo
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.append(REPO_ROOT)
+from github_batch import GitHubBatchCommitter, GitHubBatchError, resolve_api_base
 
 # Tắt warning SSL
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+# Các bộ dữ liệu Dashboard PHC: tên hiển thị, loại API, Category, file lưu
+PHC_DATASETS = [
+    {"name": "Tổng hợp", "kind": "summary", "category": "all", "filename": "tonghop.json"},
+    {"name": "Văn bản đến", "kind": "daily", "category": "incoming", "filename": "vanbanden.json"},
+    {"name": "Văn bản phát hành", "kind": "daily", "category": "outgoing", "filename": "vanbanphathanh.json"},
+    {"name": "Quản lý công việc", "kind": "daily", "category": "task_management", "filename": "congviec.json"},
+    {"name": "Đăng ký phòng họp", "kind": "daily", "category": "meeting_room", "filename": "phonghop.json"},
+    {"name": "Đăng ký lịch họp", "kind": "daily", "category": "meeting_schedules", "filename": "lichhop.json"},
+]
+
+PHC_ENDPOINTS = {
+    "summary": "/v1/dashboard_phc/documents/summary",
+    "daily": "/v1/dashboard_phc/documents/daily",
+}
+
+# Token: làm mới trước khi hết hạn TOKEN_REFRESH_MARGIN giây;
+# nếu không đọc được hạn từ token/response thì coi như hết hạn sau TOKEN_DEFAULT_TTL giây
+TOKEN_REFRESH_MARGIN = 60
+TOKEN_DEFAULT_TTL = 30 * 60
+
+# Thư mục lưu các cửa sổ tháng đã lấy xong (để tiếp tục khi bị gián đoạn)
+CHECKPOINT_DIR = ".api_checkpoints"
+
+# Trên GitHub mỗi bộ PHC được lưu theo tháng: phc/<tên file>/YYYY-MM.json
+PHC_PARTITION_DIR = "phc"
+
+
+def create_pooled_session(pool_size=10, verify_ssl=False):
+    """Create a requests.Session with a keep-alive connection pool"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.verify = verify_ssl
+    return session
+
+
+@st.cache_resource(show_spinner=False)
+def _get_token_cache():
+    """Process-wide token cache shared by every handler instance"""
+    return {"lock": threading.Lock(), "tokens": {}}
+
+
+def get_token_expiry(token, expires_in=None):
+    """Return the token expiry as a unix timestamp (JWT exp, expires_in, or the default TTL)"""
+    if expires_in:
+        try:
+            return time.time() + float(expires_in)
+        except (TypeError, ValueError):
+            pass
+
+    parts = str(token).split(".")
+    if len(parts) == 3:
+        try:
+            padded = parts[1] + "=" * (-len(parts[1]) % 4)
+            exp = json.loads(base64.urlsafe_b64decode(padded)).get("exp")
+            if exp:
+                return float(exp)
+        except (ValueError, AttributeError):
+            pass
+
+    return time.time() + TOKEN_DEFAULT_TTL
+
+
+def split_date_range_by_month(start_date, end_date):
+    """Split an inclusive YYYY-MM-DD range into calendar-month windows"""
+    start = datetime.strptime(start_date, "%Y-%m-%d").date()
+    end = datetime.strptime(end_date, "%Y-%m-%d").date()
+
+    windows = []
+    current = start
+    while current <= end:
+        next_month = (current.replace(day=1) + timedelta(days=32)).replace(day=1)
+        window_end = min(next_month - timedelta(days=1), end)
+        windows.append((current.strftime("%Y-%m-%d"), window_end.strftime("%Y-%m-%d")))
+        current = next_month
+    return windows
+
+
+def phc_row_date_key(row):
+    """Sort key of a PHC row (tonghop/vbden/vbdi dùng date/month/year, các file khác dùng Date/Month/Year)"""
+    return (
+        row.get("year", row.get("Year", 0)),
+        row.get("month", row.get("Month", 0)),
+        row.get("date", row.get("Date", 0)),
+    )
+
+
+def merge_phc_payloads(payloads):
+    """Gộp response của các cửa sổ tháng thành một response, dữ liệu theo thứ tự ngày"""
+    rows = []
+    for payload in payloads:
+        rows.extend(payload.get("data") or [])
+    rows.sort(key=phc_row_date_key)
+
+    merged = dict(payloads[0]) if payloads else {"status": "success", "message": "Data retrieved successfully"}
+    merged["data"] = rows
+    return merged
+
+
+def apply_phc_delta(stored, fresh, from_date, to_date):
+    """
+    Ghép dữ liệu mới vào dữ liệu đã lưu
+
+    Các ngày trong khoảng [from_date, to_date] được thay hoàn toàn bằng dữ liệu mới
+    (một ngày có thể có nhiều dòng, nên khử trùng lặp theo khóa ngày chứ không theo dòng).
+    """
+    from_key = tuple(int(part) for part in from_date.split("-"))
+    to_key = tuple(int(part) for part in to_date.split("-"))
+    kept = [row for row in stored.get("data") or [] if not from_key <= phc_row_date_key(row) <= to_key]
+    return merge_phc_payloads([dict(stored, data=kept), {"data": fresh.get("data") or []}])
+
+
+def phc_partition_dir(filename):
+    """Thư mục phân vùng theo tháng của một file PHC trên GitHub (vd. phc/vanbanden)"""
+    return f"{PHC_PARTITION_DIR}/{os.path.splitext(filename)[0]}"
+
+
+def partition_phc_payload(payload):
+    """Split a PHC payload into per-month payloads keyed 'YYYY-MM' (rows in date order)"""
+    months = {}
+    for row in (payload or {}).get("data") or []:
+        year, month, _ = phc_row_date_key(row)
+        months.setdefault(f"{int(year):04d}-{int(month):02d}", []).append(row)
+
+    header = {key: value for key, value in (payload or {}).items() if key != "data"}
+    return {
+        month: dict(header, data=sorted(rows, key=phc_row_date_key))
+        for month, rows in sorted(months.items())
+    }
+
+
+def _canonical_rows(payload):
+    """Các dòng dạng JSON đã sắp xếp - so sánh nội dung không phụ thuộc thứ tự dòng"""
+    return sorted(json.dumps(row, sort_keys=True, ensure_ascii=False) for row in (payload or {}).get("data") or [])
+
+
+def changed_phc_partitions(stored, merged):
+    """
+    So sánh hai payload PHC theo từng tháng
+
+    Returns:
+        (dict tháng -> payload cần ghi, list tháng cần xóa); thứ tự dòng trong tháng không tính là thay đổi
+    """
+    before = partition_phc_payload(stored)
+    after = partition_phc_payload(merged)
+    changed = {
+        month: payload for month, payload in after.items()
+        if _canonical_rows(payload) != _canonical_rows(before.get(month))
+    }
+    removed = sorted(month for month in before if month not in after)
+    return changed, removed
+
 
 class APIHandler:
-    def __init__(self, base_url=None, username=None, password=None):
+    def __init__(self, base_url=None, username=None, password=None, verify_ssl=None, github_api_base=None):
         """
         Khởi tạo API Handler
 
@@ -22,28 +190,75 @@ class APIHandler:
             base_url: URL gốc của API (ví dụ: https://api.example.com)
             username: Username để lấy token
             password: Password để lấy token
+            verify_ssl: Kiểm tra chứng chỉ SSL (mặc định lấy api_verify_ssl trong secrets, False nếu không có)
+            github_api_base: URL gốc GitHub API (mặc định github_api_base trong secrets, GITHUB_API_BASE hoặc api.github.com)
         """
         self.base_url = base_url or st.secrets.get("api_base_url", "")
         self.username = username or st.secrets.get("api_username", "")
         self.password = password or st.secrets.get("api_password", "")
         self.token = None
         self.token_expiry = None
+        self.login_endpoint = "/v1/auth/token"
+        self.verify_ssl = verify_ssl if verify_ssl is not None else bool(st.secrets.get("api_verify_ssl", False))
+
+        # Dùng chung một session (keep-alive) cho mọi request thay vì mở kết nối mới mỗi lần
+        self.session = create_pooled_session(verify_ssl=self.verify_ssl)
+        # Số tháng lấy song song trong fetch_phc_dataset_chunked (không vượt quá pool của session)
+        self.chunk_workers = 4
 
         # GitHub config
         self.github_token = st.secrets.get("github_token", "")
         self.github_owner = st.secrets.get("github_owner", "")
         self.github_repo = st.secrets.get("github_repo", "")
+        self.github_api_base = resolve_api_base(github_api_base or st.secrets.get("github_api_base", ""))
+
+    def _token_cache_key(self, login_endpoint):
+        """Khóa cache token: URL + tài khoản + hash mật khẩu (không lưu mật khẩu gốc)"""
+        password_hash = hashlib.sha256((self.password or "").encode()).hexdigest()
+        return (self.base_url, login_endpoint, self.username, password_hash)
+
+    def has_valid_token(self):
+        """Token hiện tại còn hạn (trừ khoảng làm mới sớm TOKEN_REFRESH_MARGIN)"""
+        return bool(self.token) and (
+            self.token_expiry is None or time.time() < self.token_expiry - TOKEN_REFRESH_MARGIN
+        )
 
-    def get_token(self, login_endpoint="/v1/auth/token"):
+    def get_token(self, login_endpoint="/v1/auth/token", force=False):
         """
         Lấy token từ API
 
+        Token được cache dùng chung cho mọi handler trong process và chỉ đăng nhập
+        lại khi token sắp hết hạn (hoặc force=True, ví dụ sau khi nhận 401).
+
         Args:
             login_endpoint: Endpoint để lấy token (mặc định: /v1/auth/token)
+            force: Bỏ qua cache và đăng nhập lại
 
         Returns:
             dict: {"success": bool, "token": str, "message": str}
         """
+        self.login_endpoint = login_endpoint
+        cache = _get_token_cache()
+        key = self._token_cache_key(login_endpoint)
+
+        with cache["lock"]:
+            cached = cache["tokens"].get(key)
+            # force: chỉ đăng nhập lại nếu token trong cache chính là token vừa bị từ chối
+            # (thread khác có thể đã làm mới trong lúc chờ lock)
+            reusable = cached and (not force or cached["token"] != self.token)
+            if reusable and time.time() < cached["expiry"] - TOKEN_REFRESH_MARGIN:
+                self.token, self.token_expiry = cached["token"], cached["expiry"]
+                return {"success": True, "token": self.token, "message": "✅ Token sẵn có"}
+
+            result = self._login(login_endpoint)
+            if result["success"]:
+                cache["tokens"][key] = {"token": self.token, "expiry": self.token_expiry}
+            else:
+                cache["tokens"].pop(key, None)
+            return result
+
+    def _login(self, login_endpoint):
+        """Gọi API đăng nhập để lấy token mới"""
         try:
             url = f"{self.base_url}{login_endpoint}"
 
@@ -53,7 +268,7 @@ class APIHandler:
                 "password": self.password
             }
 
-            response = requests.post(url, json=payload, verify=False)
+            response = self.session.post(url, json=payload)
 
             if response.status_code == 200:
                 data = response.json()
@@ -62,6 +277,7 @@ class APIHandler:
                 self.token = data.get("data") or data.get("token") or data.get("access_token")
 
                 if self.token:
+                    self.token_expiry = get_token_expiry(self.token, data.get("expires_in"))
                     return {
                         "success": True,
                         "token": self.token,
@@ -87,6 +303,16 @@ class APIHandler:
                 "message": f"❌ Lỗi kết nối: {str(e)}"
             }
 
+    def _send_request(self, method, url, params=None, body=None):
+        """Gửi request với token hiện tại"""
+        headers = {
+            "Authorization": f"Bearer {self.token}",
+            "Content-Type": "application/json"
+        }
+        if method in ("GET", "DELETE"):
+            return self.session.request(method, url, headers=headers, params=params)
+        return self.session.request(method, url, headers=headers, json=body, params=params)
+
     def fetch_data(self, endpoint, method="GET", params=None, body=None, save_to_file=None):
         """
         Lấy dữ liệu từ API với token
@@ -101,8 +327,8 @@ class APIHandler:
         Returns:
             dict: {"success": bool, "data": dict/list, "message": str}
         """
-        if not self.token:
-            token_result = self.get_token()
+        if not self.has_valid_token():
+            token_result = self.get_token(self.login_endpoint)
             if not token_result["success"]:
                 return {
                     "success": False,
@@ -112,29 +338,24 @@ class APIHandler:
 
         try:
             url = f"{self.base_url}{endpoint}"
+            method = method.upper()
 
-            # Headers với token
-            headers = {
-                "Authorization": f"Bearer {self.token}",
-                "Content-Type": "application/json"
-            }
-
-            # Gọi API
-            if method.upper() == "GET":
-                response = requests.get(url, headers=headers, params=params, verify=False)
-            elif method.upper() == "POST":
-                response = requests.post(url, headers=headers, json=body, params=params, verify=False)
-            elif method.upper() == "PUT":
-                response = requests.put(url, headers=headers, json=body, params=params, verify=False)
-            elif method.upper() == "DELETE":
-                response = requests.delete(url, headers=headers, params=params, verify=False)
-            else:
+            if method not in ("GET", "DELETE", "POST", "PUT"):
                 return {
                     "success": False,
                     "data": None,
                     "message": f"❌ Method {method} không được hỗ trợ"
                 }
 
+            # Gọi API
+            response = self._send_request(method, url, params, body)
+
+            # Token bị thu hồi/hết hạn sớm -> đăng nhập lại và thử lại đúng một lần
+            if response.status_code == 401:
+                token_result = self.get_token(self.login_endpoint, force=True)
+                if token_result["success"]:
+                    response = self._send_request(method, url, params, body)
+
             if response.status_code == 200:
                 data = response.json()
 
@@ -230,51 +451,114 @@ class APIHandler:
             }
         )
 
-    def get_all_dashboard_phc_data(self, start_date, end_date, save_dir=""):
-        """Lấy tất cả dữ liệu Dashboard PHC một lần"""
-        results = []
+    def fetch_phc_dataset(self, dataset, start_date, end_date, chunked=False):
+        """Lấy một bộ dữ liệu Dashboard PHC (theo PHC_DATASETS)"""
+        if chunked:
+            return self.fetch_phc_dataset_chunked(dataset, start_date, end_date)
+        if dataset["kind"] == "summary":
+            return self.get_summary_data(start_date, end_date, dataset["category"])
+        return self.get_daily_data(start_date, end_date, dataset["category"])
+
+    def _fetch_phc_window(self, dataset, window_start, window_end, retries=3, backoff=1.0):
+        """Lấy một cửa sổ thời gian, thử lại với backoff tăng dần nếu lỗi"""
+        result = None
+        for attempt in range(retries):
+            result = self.fetch_data(
+                endpoint=PHC_ENDPOINTS[dataset["kind"]],
+                method="POST",
+                params={
+                    "Start_Date": window_start,
+                    "End_Date": window_end,
+                    "Category": dataset["category"]
+                }
+            )
+            if result["success"]:
+                return result
+            if attempt < retries - 1:
+                time.sleep(backoff * (2 ** attempt))
+        return result
+
+    def fetch_phc_dataset_chunked(self, dataset, start_date, end_date, checkpoint_dir=CHECKPOINT_DIR,
+                                  max_workers=None, retries=3):
+        """
+        Lấy một bộ dữ liệu PHC theo từng tháng
+
+        Các tháng được lấy song song (max_workers, mặc định self.chunk_workers); tháng nào
+        lấy xong được lưu checkpoint vào checkpoint_dir nên lần chạy sau (nếu bị gián đoạn)
+        chỉ lấy các tháng còn thiếu.
+        Checkpoint được xóa khi cả khoảng thời gian đã lấy đủ.
+
+        Returns:
+            dict: {"success": bool, "data": dict, "message": str}
+        """
+        windows = split_date_range_by_month(start_date, end_date)
+        run_dir = os.path.join(checkpoint_dir, f"{dataset['category']}_{start_date}_{end_date}")
+        os.makedirs(run_dir, exist_ok=True)
+        today = date.today().strftime("%Y-%m-%d")
+
+        payloads = {}
+        pending = []
+        for window in windows:
+            path = os.path.join(run_dir, f"{window[0]}_{window[1]}.json")
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    payloads[window] = json.load(f)
+            else:
+                pending.append(window)
+
+        # Lấy token trước để các thread không cùng gọi get_token
+        if pending and not self.has_valid_token():
+            token_result = self.get_token(self.login_endpoint)
+            if not token_result["success"]:
+                return {"success": False, "data": None, "message": token_result["message"]}
+
+        errors = []
+        if pending:
+            with ThreadPoolExecutor(max_workers=max_workers or self.chunk_workers) as executor:
+                futures = {
+                    window: executor.submit(self._fetch_phc_window, dataset, window[0], window[1], retries)
+                    for window in pending
+                }
+                for window, future in futures.items():
+                    result = future.result()
+                    if not result["success"]:
+                        errors.append(f"{window[0]} → {window[1]}: {result['message']}")
+                        continue
+                    payloads[window] = result["data"]
+                    # Tháng chưa kết thúc còn thay đổi -> không lưu checkpoint
+                    if window[1] < today:
+                        path = os.path.join(run_dir, f"{window[0]}_{window[1]}.json")
+                        with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+                            json.dump(result["data"], f, ensure_ascii=False)
+                        os.replace(f"{path}.tmp", path)
+
+        if errors:
+            return {
+                "success": False,
+                "data": None,
+                "message": f"❌ {len(errors)}/{len(windows)} tháng bị lỗi (đã lưu {len(payloads)} tháng, chạy lại để tiếp tục): "
+                           + "; ".join(errors)
+            }
+
+        shutil.rmtree(run_dir, ignore_errors=True)
+        return {
+            "success": True,
+            "data": merge_phc_payloads([payloads[window] for window in windows]),
+            "message": f"✅ Lấy dữ liệu thành công ({len(windows)} tháng, {len(pending)} tháng mới)"
+        }
 
-        # 1. Lấy tổng hợp
-        r = self.get_summary_data(start_date, end_date, "all")
-        results.append({"name": "Tổng hợp", "success": r["success"], "data": r.get("data")})
-        if r["success"] and save_dir:
-            with open(f"{save_dir}/tonghop.json", 'w', encoding='utf-8') as f:
-                json.dump(r["data"], f, ensure_ascii=False, indent=2)
-
-        # 2. Văn bản đến
-        r = self.get_daily_data(start_date, end_date, "incoming")
-        results.append({"name": "Văn bản đến", "success": r["success"], "data": r.get("data")})
-        if r["success"] and save_dir:
-            with open(f"{save_dir}/vanbanden.json", 'w', encoding='utf-8') as f:
-                json.dump(r["data"], f, ensure_ascii=False, indent=2)
-
-        # 3. Văn bản phát hành
-        r = self.get_daily_data(start_date, end_date, "outgoing")
-        results.append({"name": "Văn bản phát hành", "success": r["success"], "data": r.get("data")})
-        if r["success"] and save_dir:
-            with open(f"{save_dir}/vanbanphathanh.json", 'w', encoding='utf-8') as f:
-                json.dump(r["data"], f, ensure_ascii=False, indent=2)
-
-        # 4. Quản lý công việc
-        r = self.get_daily_data(start_date, end_date, "task_management")
-        results.append({"name": "Quản lý công việc", "success": r["success"], "data": r.get("data")})
-        if r["success"] and save_dir:
-            with open(f"{save_dir}/congviec.json", 'w', encoding='utf-8') as f:
-                json.dump(r["data"], f, ensure_ascii=False, indent=2)
-
-        # 5. Đăng ký phòng họp
-        r = self.get_daily_data(start_date, end_date, "meeting_room")
-        results.append({"name": "Đăng ký phòng họp", "success": r["success"], "data": r.get("data")})
-        if r["success"] and save_dir:
-            with open(f"{save_dir}/phonghop.json", 'w', encoding='utf-8') as f:
-                json.dump(r["data"], f, ensure_ascii=False, indent=2)
-
-        # 6. Đăng ký lịch họp
-        r = self.get_daily_data(start_date, end_date, "meeting_schedules")
-        results.append({"name": "Đăng ký lịch họp", "success": r["success"], "data": r.get("data")})
-        if r["success"] and save_dir:
-            with open(f"{save_dir}/lichhop.json", 'w', encoding='utf-8') as f:
-                json.dump(r["data"], f, ensure_ascii=False, indent=2)
+    def _collect_phc_results(self, responses, save_dir=""):
+        """Gom kết quả các bộ dữ liệu PHC và lưu file nếu cần"""
+        results = []
+        for dataset, r in zip(PHC_DATASETS, responses):
+            changed = r.get("changed", True)
+            results.append({"name": dataset["name"], "success": r["success"], "data": r.get("data"),
+                            "changed": changed, "partitions": r.get("partitions"),
+                            "deleted_partitions": r.get("deleted_partitions") or [],
+                            "message": r.get("message", "")})
+            if r["success"] and changed and save_dir:
+                with open(f"{save_dir}/{dataset['filename']}", 'w', encoding='utf-8') as f:
+                    json.dump(r["data"], f, ensure_ascii=False, indent=2)
 
         all_success = all(r["success"] for r in results)
         return {
@@ -283,86 +567,215 @@ class APIHandler:
             "message": "✅ Lấy tất cả dữ liệu thành công!" if all_success else "⚠️ Một số dữ liệu bị lỗi"
         }
 
-    def upload_to_github(self, filename, content, commit_message="Update data"):
-        """Upload file JSON lên GitHub private repo"""
+    def get_all_dashboard_phc_data(self, start_date, end_date, save_dir="", chunked=False):
+        """Lấy tất cả dữ liệu Dashboard PHC một lần"""
+        responses = [self.fetch_phc_dataset(dataset, start_date, end_date, chunked) for dataset in PHC_DATASETS]
+        return self._collect_phc_results(responses, save_dir)
+
+    def load_stored_phc_payload(self, dataset, save_dir="."):
+        """Đọc bản dữ liệu đã lưu của một bộ PHC (GitHub nếu đã cấu hình, nếu không thì file local)"""
+        return self._load_stored_phc(dataset, save_dir)[0]
+
+    def _load_stored_phc(self, dataset, save_dir="."):
+        """
+        Đọc bản dữ liệu đã lưu của một bộ PHC
+
+        Returns:
+            (payload hoặc None, True nếu đọc từ các phân vùng tháng trên GitHub)
+        """
+        if all([self.github_token, self.github_owner, self.github_repo]):
+            stored = self.download_phc_partitions(dataset["filename"])
+            if stored is not None:
+                return stored, True
+            # File gộp cũ (trước khi lưu theo tháng)
+            stored = self.download_from_github(dataset["filename"])
+            if stored is not None:
+                return stored, False
+
+        path = os.path.join(save_dir or ".", dataset["filename"])
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f), False
+        return None, False
+
+    def fetch_phc_dataset_delta(self, dataset, start_date, end_date, save_dir=".", chunked=False):
+        """
+        Chỉ lấy các ngày mới hơn ngày cuối cùng đã lưu
+
+        Ngày cuối cùng được lấy lại (có thể chưa đủ dữ liệu ở lần trước). Nếu chưa có
+        dữ liệu lưu thì lấy toàn bộ khoảng thời gian.
+
+        "partitions" chỉ chứa các tháng có thay đổi (tất cả các tháng nếu dữ liệu trên GitHub
+        chưa được chia theo tháng), nên lượng upload tỷ lệ với số tháng bị ảnh hưởng.
+
+        Returns:
+            dict: {"success": bool, "data": dict, "changed": bool, "partitions": dict,
+                   "deleted_partitions": list, "message": str}
+        """
+        stored, partitioned = self._load_stored_phc(dataset, save_dir)
+        rows = (stored or {}).get("data") or []
+        if not rows:
+            result = self.fetch_phc_dataset(dataset, start_date, end_date, chunked)
+            partitions = partition_phc_payload(result["data"]) if result["success"] else {}
+            return dict(result, changed=result["success"], partitions=partitions, deleted_partitions=[])
+
+        year, month, day = max(phc_row_date_key(row) for row in rows)
+        from_date = max(f"{year:04d}-{month:02d}-{day:02d}", start_date)
+        if from_date > end_date:
+            return {"success": True, "data": stored, "changed": False, "partitions": {},
+                    "deleted_partitions": [], "message": "⏭️ Không có ngày mới"}
+
+        result = self.fetch_phc_dataset(dataset, from_date, end_date, chunked)
+        if not result["success"]:
+            return dict(result, changed=False, partitions={}, deleted_partitions=[])
+
+        merged = apply_phc_delta(stored, result["data"], from_date, end_date)
+        partitions, deleted = changed_phc_partitions(stored, merged)
+        changed = bool(partitions or deleted)
+        if changed and not partitioned:
+            # Lần đầu lưu theo tháng: ghi đủ các tháng để không mất dữ liệu cũ (chưa có tháng nào để xóa)
+            partitions = partition_phc_payload(merged)
+            deleted = []
+        return {
+            "success": True,
+            "data": merged,
+            "changed": changed,
+            "partitions": partitions,
+            "deleted_partitions": deleted,
+            "message": f"✅ Lấy dữ liệu từ {from_date} ({len(partitions)} tháng thay đổi)" if changed
+                       else "⏭️ Không có thay đổi"
+        }
+
+    def get_all_dashboard_phc_data_delta(self, start_date, end_date, save_dir=".", chunked=False):
+        """Lấy phần dữ liệu mới của tất cả bộ Dashboard PHC"""
+        responses = [
+            self.fetch_phc_dataset_delta(dataset, start_date, end_date, save_dir, chunked) for dataset in PHC_DATASETS
+        ]
+        return self._collect_phc_results(responses, save_dir)
+
+    def download_from_github(self, filename):
+        """Tải file JSON từ GitHub private repo (None nếu không có)"""
         try:
             if not all([self.github_token, self.github_owner, self.github_repo]):
-                return {"success": False, "message": "❌ Chưa cấu hình GitHub"}
+                return None
 
-            url = f"https://api.github.com/repos/{self.github_owner}/{self.github_repo}/contents/{filename}"
+            url = f"{self.github_api_base}/repos/{self.github_owner}/{self.github_repo}/contents/{filename}"
             headers = {
                 "Authorization": f"token {self.github_token}",
-                "Accept": "application/vnd.github.v3+json"
+                "Accept": "application/vnd.github.v3.raw"
             }
+            response = self.session.get(url, headers=headers, params={"ref": "main"}, timeout=30)
+            if response.status_code == 200:
+                return response.json()
+            return None
 
-            # Check if file exists to get SHA
-            get_response = requests.get(url, headers=headers, verify=False)
-            sha = None
-            if get_response.status_code == 200:
-                sha = get_response.json()["sha"]
-
-            # Prepare content
-            if isinstance(content, (dict, list)):
-                content = json.dumps(content, ensure_ascii=False, indent=2)
-
-            content_encoded = base64.b64encode(content.encode()).decode()
+        except Exception:
+            return None
 
-            # Upload
-            payload = {
-                "message": commit_message,
-                "content": content_encoded,
-                "branch": "main"
-            }
-            if sha:
-                payload["sha"] = sha
+    def list_phc_partitions(self, filename):
+        """Các tháng (YYYY-MM) đã lưu trên GitHub của một file PHC"""
+        try:
+            entries = self.get_github_committer().list_tree(phc_partition_dir(filename))
+        except Exception:
+            return []
+        return sorted(
+            name[:-len(".json")] for name, entry in entries.items()
+            if entry["type"] == "blob" and name.endswith(".json")
+        )
 
-            response = requests.put(url, headers=headers, json=payload, verify=False)
+    def download_phc_partitions(self, filename):
+        """Tải và gộp các phân vùng tháng của một file PHC (None nếu chưa lưu theo tháng hoặc tải lỗi)"""
+        if not all([self.github_token, self.github_owner, self.github_repo]):
+            return None
+
+        months = self.list_phc_partitions(filename)
+        if not months:
+            return None
+
+        directory = phc_partition_dir(filename)
+        payloads = [self.download_from_github(f"{directory}/{month}.json") for month in months]
+        if any(payload is None for payload in payloads):
+            # Thiếu một tháng thì không dùng (tránh ghi đè dữ liệu bằng bản không đủ)
+            return None
+        return merge_phc_payloads(payloads)
+
+    def get_github_committer(self):
+        """Tạo committer Git Data API cho repo dữ liệu"""
+        return GitHubBatchCommitter(self.github_token, self.github_owner, self.github_repo,
+                                    api_base=self.github_api_base, verify=self.verify_ssl)
+
+    def upload_files_to_github(self, files, commit_message="Update data", deletions=()):
+        """Upload nhiều file JSON lên GitHub private repo trong một commit (kèm xóa các file trong deletions)"""
+        try:
+            if not all([self.github_token, self.github_owner, self.github_repo]):
+                return {"success": False, "message": "❌ Chưa cấu hình GitHub"}
 
-            if response.status_code in [200, 201]:
-                return {"success": True, "message": f"✅ Đã upload {filename}"}
-            else:
-                return {"success": False, "message": f"❌ Lỗi upload {filename}: {response.text}"}
+            self.get_github_committer().commit_files(files, commit_message, deletions=deletions)
+            return {"success": True, "message": f"✅ Đã upload {', '.join(files)}"}
 
+        except GitHubBatchError as e:
+            return {"success": False, "message": f"❌ Lỗi upload {', '.join(files)}: {str(e)}"}
         except Exception as e:
             return {"success": False, "message": f"❌ Lỗi: {str(e)}"}
 
-    def get_all_dashboard_phc_data_and_upload(self, start_date, end_date):
-        """Lấy tất cả dữ liệu và upload lên GitHub"""
-        file_map = {
-            "Tổng hợp": "tonghop.json",
-            "Văn bản đến": "vanbanden.json",
-            "Văn bản phát hành": "vanbanphathanh.json",
-            "Quản lý công việc": "congviec.json",
-            "Đăng ký phòng họp": "phonghop.json",
-            "Đăng ký lịch họp": "lichhop.json"
-        }
+    def upload_to_github(self, filename, content, commit_message="Update data"):
+        """Upload file JSON lên GitHub private repo"""
+        return self.upload_files_to_github({filename: content}, commit_message)
+
+    def get_all_dashboard_phc_data_and_upload(self, start_date, end_date, chunked=False, delta=False):
+        """
+        Lấy tất cả dữ liệu và upload lên GitHub theo phân vùng tháng (phc/<tên file>/YYYY-MM.json)
+
+        delta=True: chỉ lấy ngày mới và chỉ upload các tháng thay đổi.
+        delta=False: ghi lại mọi tháng trong khoảng đã lấy và xóa các tháng ngoài khoảng.
+        """
+        file_map = {dataset["name"]: dataset["filename"] for dataset in PHC_DATASETS}
 
         results = []
 
         # Lấy dữ liệu
-        local_result = self.get_all_dashboard_phc_data(start_date, end_date, save_dir=".")
-
-        # Upload lên GitHub
+        if delta:
+            local_result = self.get_all_dashboard_phc_data_delta(start_date, end_date, save_dir=".", chunked=chunked)
+        else:
+            local_result = self.get_all_dashboard_phc_data(start_date, end_date, save_dir=".", chunked=chunked)
+
+        # Gom các tháng thay đổi của mọi bộ dữ liệu để upload trong một commit
+        files = {}
+        deletions = []
         for r in local_result["results"]:
-            if r["success"] and r["data"]:
+            if r["success"] and not r["changed"]:
+                results.append({"name": r["name"], "local": "✅", "github": "✅", "message": r["message"]})
+            elif r["success"] and r["data"]:
                 filename = file_map.get(r["name"])
                 if filename:
-                    upload_result = self.upload_to_github(
-                        filename=filename,
-                        content=r["data"],
-                        commit_message=f"Update {r['name']} - {datetime.now().strftime('%Y-%m-%d %H:%M')}"
-                    )
-                    results.append({
-                        "name": r["name"],
-                        "local": "✅",
-                        "github": "✅" if upload_result["success"] else "❌",
-                        "message": upload_result["message"]
-                    })
+                    partitions = r.get("partitions")
+                    deleted = r.get("deleted_partitions") or []
+                    if partitions is None:
+                        # Lấy toàn bộ: ghi mọi tháng, bỏ các tháng không còn trong khoảng thời gian
+                        partitions = partition_phc_payload(r["data"])
+                        deleted = [month for month in self.list_phc_partitions(filename) if month not in partitions]
+
+                    directory = phc_partition_dir(filename)
+                    files.update({f"{directory}/{month}.json": payload for month, payload in partitions.items()})
+                    deletions.extend(f"{directory}/{month}.json" for month in deleted)
+                    results.append({"name": r["name"], "local": "✅", "github": None, "message": ""})
                 else:
                     results.append({"name": r["name"], "local": "✅", "github": "⚠️", "message": "Không có filename map"})
             else:
                 results.append({"name": r["name"], "local": "❌", "github": "-", "message": "Lỗi lấy dữ liệu"})
 
+        # Upload lên GitHub
+        if files or deletions:
+            upload_result = self.upload_files_to_github(
+                files,
+                commit_message=f"Update Dashboard PHC ({len(files)} files) - {datetime.now().strftime('%Y-%m-%d %H:%M')}",
+                deletions=deletions
+            )
+            for r in results:
+                if r["github"] is None:
+                    r["github"] = "✅" if upload_result["success"] else "❌"
+                    r["message"] = upload_result["message"]
+
         all_success = all(r["github"] == "✅" for r in results if r["github"] != "-")
         return {
             "success": all_success,
@@ -371,6 +784,141 @@ class APIHandler:
         }
 
 
+class AsyncAPIHandler(APIHandler):
+    """
+    APIHandler chạy song song các endpoint bằng asyncio
+
+    Các request dùng chung session (connection pool) của handler, được giới hạn
+    bởi một semaphore, và token chỉ được làm mới một lần cho cả đợt. Mỗi bộ dữ liệu
+    chia tháng giữ một chỗ của semaphore và lấy các tháng tuần tự, nên tổng số request
+    đồng thời không vượt quá max_concurrency.
+    """
+
+    def __init__(self, base_url=None, username=None, password=None, verify_ssl=None, max_concurrency=6,
+                 github_api_base=None):
+        super().__init__(base_url, username, password, verify_ssl, github_api_base)
+        self.max_concurrency = max_concurrency
+        # Pool đủ lớn cho số request chạy đồng thời
+        self.session = create_pooled_session(pool_size=max(max_concurrency, 1), verify_ssl=self.verify_ssl)
+        # Song song theo bộ dữ liệu (semaphore), không mở thêm thread cho từng tháng
+        self.chunk_workers = 1
+        self._semaphore = None
+        self._token_lock = None
+        self._primitives_loop = None
+
+    def _async_primitives(self):
+        """
+        Semaphore/Lock của event loop đang chạy
+
+        Tạo lần đầu khi cần và tạo lại khi chạy trong loop khác (mỗi lần asyncio.run là một loop mới),
+        nên các coroutine gọi riêng lẻ cũng dùng được mà không cần khởi tạo trước.
+        """
+        loop = asyncio.get_running_loop()
+        if self._primitives_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._token_lock = asyncio.Lock()
+            self._primitives_loop = loop
+        return self._semaphore, self._token_lock
+
+    async def ensure_token_async(self):
+        """Lấy token một lần cho tất cả coroutine (các coroutine khác chờ lock)"""
+        async with self._async_primitives()[1]:
+            if self.has_valid_token():
+                return {"success": True, "token": self.token, "message": "✅ Token sẵn có"}
+            return await asyncio.to_thread(self.get_token, self.login_endpoint)
+
+    async def fetch_data_async(self, endpoint, method="GET", params=None, body=None, save_to_file=None):
+        """Phiên bản async của fetch_data (request chạy trong thread pool)"""
+        token_result = await self.ensure_token_async()
+        if not token_result["success"]:
+            return {
+                "success": False,
+                "data": None,
+                "message": "❌ Không có token. Vui lòng lấy token trước."
+            }
+
+        async with self._async_primitives()[0]:
+            return await asyncio.to_thread(self.fetch_data, endpoint, method, params, body, save_to_file)
+
+    async def refresh_all_data_async(self, endpoints_config):
+        """Làm mới tất cả endpoints đồng thời"""
+        responses = await asyncio.gather(*[
+            self.fetch_data_async(
+                endpoint=config.get("endpoint"),
+                method=config.get("method", "GET"),
+                params=config.get("params"),
+                body=config.get("body"),
+                save_to_file=config.get("save_to")
+            )
+            for config in endpoints_config
+        ])
+
+        results = [
+            {"endpoint": config.get("endpoint"), "success": r["success"], "message": r["message"]}
+            for config, r in zip(endpoints_config, responses)
+        ]
+        all_success = all(r["success"] for r in results)
+
+        return {
+            "success": all_success,
+            "results": results,
+            "message": "✅ Hoàn thành làm mới dữ liệu" if all_success else "⚠️ Một số endpoint bị lỗi"
+        }
+
+    async def fetch_phc_dataset_async(self, dataset, start_date, end_date, chunked=False):
+        """Lấy một bộ dữ liệu PHC (async)"""
+        if chunked:
+            token_result = await self.ensure_token_async()
+            if not token_result["success"]:
+                return {"success": False, "data": None, "message": token_result["message"]}
+            # Các tháng lấy tuần tự trong một chỗ của semaphore (chunk_workers = 1)
+            async with self._async_primitives()[0]:
+                return await asyncio.to_thread(self.fetch_phc_dataset_chunked, dataset, start_date, end_date)
+
+        return await self.fetch_data_async(
+            endpoint=PHC_ENDPOINTS[dataset["kind"]],
+            method="POST",
+            params={
+                "Start_Date": start_date,
+                "End_Date": end_date,
+                "Category": dataset["category"]
+            }
+        )
+
+    async def get_all_dashboard_phc_data_async(self, start_date, end_date, save_dir="", chunked=False):
+        """Lấy đồng thời tất cả dữ liệu Dashboard PHC"""
+        responses = await asyncio.gather(*[
+            self.fetch_phc_dataset_async(dataset, start_date, end_date, chunked) for dataset in PHC_DATASETS
+        ])
+        return self._collect_phc_results(responses, save_dir)
+
+    async def get_all_dashboard_phc_data_delta_async(self, start_date, end_date, save_dir=".", chunked=False):
+        """Lấy đồng thời phần dữ liệu mới của tất cả bộ Dashboard PHC"""
+        token_result = await self.ensure_token_async()
+        if not token_result["success"]:
+            responses = [{"success": False, "data": None, "message": token_result["message"]} for _ in PHC_DATASETS]
+            return self._collect_phc_results(responses, save_dir)
+
+        async def fetch_delta(dataset):
+            async with self._async_primitives()[0]:
+                return await asyncio.to_thread(
+                    self.fetch_phc_dataset_delta, dataset, start_date, end_date, save_dir, chunked
+                )
+
+        responses = await asyncio.gather(*[fetch_delta(dataset) for dataset in PHC_DATASETS])
+        return self._collect_phc_results(responses, save_dir)
+
+    # Giữ nguyên API đồng bộ cho code Streamlit hiện có
+    def refresh_all_data(self, endpoints_config):
+        return asyncio.run(self.refresh_all_data_async(endpoints_config))
+
+    def get_all_dashboard_phc_data(self, start_date, end_date, save_dir="", chunked=False):
+        return asyncio.run(self.get_all_dashboard_phc_data_async(start_date, end_date, save_dir, chunked))
+
+    def get_all_dashboard_phc_data_delta(self, start_date, end_date, save_dir=".", chunked=False):
+        return asyncio.run(self.get_all_dashboard_phc_data_delta_async(start_date, end_date, save_dir, chunked))
+
+
 # ===== STREAMLIT UI =====
 def show_api_manager_ui():
     """Hiển thị giao diện quản lý API trong Streamlit"""
@@ -422,7 +970,7 @@ def show_api_manager_ui():
                 st.error("❌ Vui lòng điền đầy đủ thông tin")
             else:
                 # Khởi tạo APIHandler mới với cấu hình đầy đủ
-                st.session_state.api_handler = APIHandler(base_url, username, password)
+                st.session_state.api_handler = AsyncAPIHandler(base_url, username, password)
                 result = st.session_state.api_handler.get_token(login_endpoint)
 
                 if result["success"]:
@@ -444,12 +992,24 @@ def show_api_manager_ui():
             end_date = st.date_input("Đến ngày", value=datetime(2026, 1, 1))
         with col3:
             save_to_files = st.checkbox("Lưu vào files", value=True)
+            chunked = st.checkbox(
+                "Lấy theo từng tháng",
+                value=True,
+                help="Chia khoảng thời gian theo tháng, lấy song song; nếu bị gián đoạn lần chạy sau sẽ tiếp tục"
+            )
+            delta = st.checkbox(
+                "Chỉ lấy dữ liệu mới",
+                value=True,
+                help="Chỉ lấy các ngày sau ngày cuối cùng đã lưu và chỉ upload file có thay đổi"
+            )
 
         if st.button("🚀 LẤY VÀ UPLOAD GITHUB", type="primary", use_container_width=True):
             with st.spinner("Đang lấy dữ liệu và upload lên GitHub..."):
                 result = st.session_state.api_handler.get_all_dashboard_phc_data_and_upload(
                     start_date=start_date.strftime("%Y-%m-%d"),
-                    end_date=end_date.strftime("%Y-%m-%d")
+                    end_date=end_date.strftime("%Y-%m-%d"),
+                    chunked=chunked,
+                    delta=delta
                 )
 
                 # Hiển thị kết quả
@@ -568,7 +1128,7 @@ def show_quick_sync_button():
             if not base_url:
                 st.session_state.api_sync_error = "Thiếu api_base_url trong secrets.toml"
             else:
-                handler = APIHandler(base_url, username, password)
+                handler = AsyncAPIHandler(base_url, username, password)
                 # Tự động lấy token
                 result = handler.get_token()
                 if result["success"]:
@@ -599,7 +1159,9 @@ def show_quick_sync_button():
         with st.spinner("⏳ Đang lấy dữ liệu và upload..."):
             result = st.session_state.api_handler_sync.get_all_dashboard_phc_data_and_upload(
                 start_date=start_date.strftime("%Y-%m-%d"),
-                end_date=end_date.strftime("%Y-%m-%d")
+                end_date=end_date.strftime("%Y-%m-%d"),
+                chunked=True,
+                delta=True
             )
 
             # Hiển thị kết quả compact
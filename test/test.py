@@ -5,10 +5,19 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import json
 from datetime import datetime, timedelta
-import os, base64
+import os, sys, base64
 import requests
 from io import BytesIO, StringIO
-from api_handler import show_quick_sync_button
+
+# Các module dùng chung (github_batch, perf_timing...) nằm ở thư mục gốc của repo
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.append(REPO_ROOT)
+
+from api_handler import APIHandler, show_quick_sync_button
+from github_batch import GitHubBatchCommitter, resolve_api_base
+import columnar_json
+from perf_timing import begin_run, end_run, render_timing_panel, timed_section
 
 # Tắt FutureWarning
 pd.set_option('future.no_silent_downcasting', True)
@@ -21,6 +30,9 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Đo thời gian từng tab của lần rerun này (chỉ khi bật perf_timing / ?perf=1)
+begin_run("Dashboard Phòng Hành chính")
+
 # CSS tùy chỉnh
 st.markdown("""
 <style>
@@ -65,17 +77,24 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # ===== GITHUB MANAGER CLASS =====
+# Dashboard Hành chính (dash_phonghc.py) ghi dữ liệu dạng cột nén gzip vào file .json.gz;
+# file .json cũ chỉ được đọc khi chưa có file mới
+CURRENT_DATA_FILES = ["current_dashboard_data.json.gz", "current_dashboard_data.json"]
+
 class GitHubDataManager:
-    def __init__(self):
+    def __init__(self, api_base=None):
         try:
             self.github_token = st.secrets.get("github_token", "")
             self.github_owner = st.secrets.get("github_owner", "")
             self.github_repo = st.secrets.get("github_repo", "")
+            api_base = api_base or st.secrets.get("github_api_base", "")
         except Exception:
             # Nếu không có secrets, sử dụng giá trị mặc định
             self.github_token = ""
             self.github_owner = ""
             self.github_repo = ""
+        # URL gốc GitHub API (ghi đè được để chạy với server giả lập)
+        self.api_base = resolve_api_base(api_base)
 
     def check_github_connection(self):
         """Kiểm tra kết nối GitHub"""
@@ -84,7 +103,7 @@ class GitHubDataManager:
 
         try:
             headers = {"Authorization": f"token {self.github_token}"}
-            url = f"https://api.github.com/repos/{self.github_owner}/{self.github_repo}"
+            url = f"{self.api_base}/repos/{self.github_owner}/{self.github_repo}"
             response = requests.get(url, headers=headers)
 
             if response.status_code == 200:
@@ -99,38 +118,40 @@ class GitHubDataManager:
         try:
             headers = {"Authorization": f"token {_self.github_token}"}
 
-            # Tải file current_dashboard_data.json
-            file_url = f"https://api.github.com/repos/{_self.github_owner}/{_self.github_repo}/contents/current_dashboard_data.json"
-            response = requests.get(file_url, headers=headers)
+            for filename in CURRENT_DATA_FILES:
+                file_url = f"{_self.api_base}/repos/{_self.github_owner}/{_self.github_repo}/contents/{filename}"
+                response = requests.get(file_url, headers=headers)
+                if response.status_code != 200:
+                    continue
 
-            if response.status_code == 200:
                 file_info = response.json()
                 download_url = file_info['download_url']
 
-                # Tải và đọc file JSON
+                # Tải file (JSON hoặc JSON nén gzip, tự nhận biết)
                 file_response = requests.get(download_url)
-                if file_response.status_code == 200:
-                    json_data = file_response.json()
-
-                    # Chuyển JSON thành DataFrame
-                    if isinstance(json_data, dict) and 'data' in json_data:
-                        df = pd.DataFrame(json_data['data'])
-                    elif isinstance(json_data, list):
-                        df = pd.DataFrame(json_data)
-                    else:
-                        df = pd.DataFrame(json_data)
-
-                    metadata = {
-                        'filename': 'current_dashboard_data.json',
-                        'source': 'GitHub',
-                        'sha': file_info['sha'],
-                        'last_modified': file_info.get('last_modified', 'N/A'),
-                        'size': file_info['size']
-                    }
-
-                    return df, metadata
-            else:
-                return None, None
+                if file_response.status_code != 200:
+                    return None, None
+                json_data = columnar_json.loads_payload(file_response.content)
+
+                # Chuyển thành DataFrame: định dạng cột mới hoặc các định dạng JSON cũ
+                if columnar_json.is_columnar(json_data):
+                    df = columnar_json.columnar_to_frame(json_data)
+                elif isinstance(json_data, dict) and 'data' in json_data:
+                    df = pd.DataFrame(json_data['data'], columns=json_data.get('columns'))
+                else:
+                    df = pd.DataFrame(json_data)
+
+                metadata = {
+                    'filename': filename,
+                    'source': 'GitHub',
+                    'sha': file_info['sha'],
+                    'last_modified': file_info.get('last_modified', 'N/A'),
+                    'size': file_info['size']
+                }
+
+                return df, metadata
+
+            return None, None
 
         except Exception as e:
             st.error(f"Lỗi tải dữ liệu từ GitHub: {str(e)}")
@@ -447,37 +468,17 @@ def save_cache_to_github(filename, data_df):
             "original_file": filename
         }
 
-        url = f"https://api.github.com/repos/{github_owner}/{github_repo}/contents/{cache_filename}"
-        headers = {"Authorization": f"token {github_token}"}
-
-        # Check if cache file exists
-        response = requests.get(url, headers=headers, verify=False)
-
-        content_encoded = base64.b64encode(json.dumps(cache_data).encode()).decode()
-
-        if response.status_code == 200:
-            # Update existing cache
-            sha = response.json()['sha']
-            payload = {
-                "message": f"🔄 Update cache for {filename}",
-                "content": content_encoded,
-                "sha": sha
-            }
-        else:
-            # Create new cache
-            payload = {
-                "message": f"💾 Create cache for {filename}",
-                "content": content_encoded
-            }
-
-        put_response = requests.put(url, headers=headers, json=payload, verify=False)
-        if put_response.status_code in [200, 201]:
-            return True
+        # Một commit qua Git Data API, không cần GET lấy SHA trước khi ghi
+        committer = GitHubBatchCommitter(github_token, github_owner, github_repo,
+                                         api_base=st.secrets.get("github_api_base", ""), verify=False)
+        committer.commit_files({cache_filename: json.dumps(cache_data)}, f"🔄 Update cache for {filename}")
+        return True
     except Exception as e:
         st.warning(f"⚠️ Không thể lưu cache: {str(e)}")
     return False
 
 # Hàm tiện ích để load dữ liệu từ GitHub với cache trên GitHub
+@timed_section()
 def load_data_from_github(filename, use_cache=True):
     """Load dữ liệu từ GitHub private repo với caching trên chính GitHub repo"""
     try:
@@ -489,12 +490,13 @@ def load_data_from_github(filename, use_cache=True):
             st.error(f"❌ Chưa cấu hình GitHub để load {filename}")
             return None
 
+        api_base = resolve_api_base(st.secrets.get("github_api_base", ""))
         headers = {"Authorization": f"token {github_token}"}
 
         # Try load from cache first
         if use_cache:
             cache_filename = f"cache_{filename}"
-            cache_url = f"https://api.github.com/repos/{github_owner}/{github_repo}/contents/{cache_filename}"
+            cache_url = f"{api_base}/repos/{github_owner}/{github_repo}/contents/{cache_filename}"
             cache_response = requests.get(cache_url, headers=headers, verify=False)
 
             if cache_response.status_code == 200:
@@ -506,8 +508,16 @@ def load_data_from_github(filename, use_cache=True):
                 st.info(f"💾 Loaded từ cache (cached at: {cache_data.get('cached_at', 'N/A')})")
                 return df
 
+        # Dữ liệu PHC lưu theo tháng (phc/<tên file>/YYYY-MM.json); chưa chia tháng thì đọc file gộp cũ
+        partitioned = APIHandler().download_phc_partitions(filename)
+        if partitioned is not None:
+            df = pd.DataFrame(partitioned["data"])
+            if use_cache:
+                save_cache_to_github(filename, df)
+            return df
+
         # Load from original file if no cache or use_cache=False
-        url = f"https://api.github.com/repos/{github_owner}/{github_repo}/contents/{filename}"
+        url = f"{api_base}/repos/{github_owner}/{github_repo}/contents/{filename}"
         response = requests.get(url, headers=headers, verify=False)
 
         if response.status_code == 200:
@@ -2856,7 +2866,7 @@ tab1, tab2, tab3, tab4, tab5, tab6, tab7, tab8, tab9, tab10, tab11, tab12 = st.t
 ])
 
 # Tab 1: Tổng quan
-with tab1:
+with tab1, timed_section("tab1 · Tổng quan"):
     st.markdown('<div class="tab-header">📊 Tổng quan Phòng Hành chính</div>', unsafe_allow_html=True)
     
     # Load dữ liệu từ GitHub
@@ -3010,7 +3020,7 @@ with tab1:
         st.info("📁 Đảm bảo file tonghop.json tồn tại trong thư mục gốc")
 
 # Tab 2: Văn bản đến
-with tab2:
+with tab2, timed_section("tab2 · VB Đến"):
     st.markdown('<div class="tab-header">📥 Quản lý Văn bản Đến</div>', unsafe_allow_html=True)
     
     # Load dữ liệu từ GitHub
@@ -3145,7 +3155,7 @@ with tab2:
         st.info("📁 Vui lòng upload file dữ liệu để xem thống kê chi tiết")
 
 # Tab 3: Văn bản đi
-with tab3:
+with tab3, timed_section("tab3 · VB Đi"):
     st.markdown('<div class="tab-header">📤 Quản lý Văn bản Đi</div>', unsafe_allow_html=True)
     
     # Load dữ liệu từ GitHub
@@ -3301,7 +3311,7 @@ with tab3:
         st.error("❌ Không có dữ liệu từ vbdi.json")
 
 # Tab 9: Quản lý công việc
-with tab9:
+with tab9, timed_section("tab9 · Công việc"):
     st.markdown('<div class="tab-header">📋 Quản lý Công Việc</div>', unsafe_allow_html=True)
     
     # Load dữ liệu từ GitHub
@@ -3507,7 +3517,7 @@ with tab9:
         st.info("📁 Vui lòng upload file dữ liệu để xem thống kê chi tiết")
 
 # Tab 10: Quản lý lịch họp
-with tab10:
+with tab10, timed_section("tab10 · Lịch họp"):
     st.markdown('<div class="tab-header">📅 Quản lý Lịch Họp</div>', unsafe_allow_html=True)
     
     # Load dữ liệu từ GitHub
@@ -3687,7 +3697,7 @@ with tab10:
         st.info("📁 Upload dữ liệu để quản lý lịch họp chi tiết")
 
 # Tab 11: Quản lý phòng họp
-with tab11:
+with tab11, timed_section("tab11 · Phòng họp"):
     st.markdown('<div class="tab-header">🏢 Quản lý Phòng Họp</div>', unsafe_allow_html=True)
     
     # Load dữ liệu từ GitHub
@@ -4777,7 +4787,7 @@ def create_vehicle_charts(df):
             st.plotly_chart(fig_km, use_container_width=True)
 
 # Tab 4: Tổ xe
-with tab4:
+with tab4, timed_section("tab4 · Tổ xe"):
     st.markdown('<div class="tab-header">🚗 Báo cáo Tổ xe</div>', unsafe_allow_html=True)
 
     def create_vehicle_data():
@@ -5284,7 +5294,7 @@ with tab4:
             st.dataframe(display_pivot, use_container_width=True, hide_index=True)
 
 # Tab 5: Tổng đài
-with tab5:
+with tab5, timed_section("tab5 · Tổng đài"):
     st.markdown('<div class="tab-header">📞 Báo cáo Tổng đài</div>', unsafe_allow_html=True)
 
     def create_call_center_data():
@@ -5695,7 +5705,7 @@ with tab5:
         st.info("📁 Upload dữ liệu hoặc kiểm tra kết nối GitHub để xem thống kê chi tiết")
 
 # Tab 6: Hệ thống thư ký
-with tab6:
+with tab6, timed_section("tab6 · Thư ký"):
     st.markdown('<div class="tab-header">👥 Hệ thống Thư ký Bệnh viện</div>', unsafe_allow_html=True)
 
     def create_secretary_data():
@@ -5986,7 +5996,7 @@ with tab6:
         st.info("📁 Upload dữ liệu hoặc kiểm tra kết nối GitHub để xem thống kê chi tiết")
 
 # Tab 7: Bãi giữ xe
-with tab7:
+with tab7, timed_section("tab7 · Bãi xe"):
     st.markdown('<div class="tab-header">🅿️ Báo cáo Bãi giữ xe</div>', unsafe_allow_html=True)
 
     def create_parking_data():
@@ -6454,7 +6464,7 @@ def create_event_pivot_table(df):
         return "<p style='text-align: center; color: #e74c3c;'>⚠️ Không có dữ liệu thời gian để tạo bảng pivot</p>"
 
 # Tab 8: Sự kiện
-with tab8:
+with tab8, timed_section("tab8 · Sự kiện"):
     st.markdown('<div class="tab-header">🎉 Báo cáo Sự kiện</div>', unsafe_allow_html=True)
 
     def create_events_data():
@@ -6745,7 +6755,7 @@ with tab8:
         st.info("📁 Upload dữ liệu hoặc kiểm tra kết nối GitHub để xem thống kê chi tiết")
 
 # Tab 12: Khác (cho các danh mục không phân loại)
-with tab12:
+with tab12, timed_section("tab12 · Khác"):
     st.markdown('<div class="tab-header">🔗 Dữ liệu khác</div>', unsafe_allow_html=True)
 
     st.info("📁 Tab này sẽ hiển thị các dữ liệu không thuộc các danh mục đã định nghĩa ở trên")
@@ -6815,3 +6825,8 @@ st.markdown("""
     <p>🔄 Dữ liệu cập nhật từ GitHub Repository</p>
 </div>
 """, unsafe_allow_html=True)
+
+# Bảng debug thời gian xử lý (không hiển thị khi tắt)
+perf_run = end_run()
+if perf_run is not None:
+    render_timing_panel(perf_run)
@@ -0,0 +1,114 @@
+import asyncio
+import importlib.util
+import os
+
+import pytest
+
+pytest.importorskip("requests")
+pytest.importorskip("streamlit")
+
+# api_handler.py nằm trong test/ (thư mục script Streamlit, không phải package)
+_spec = importlib.util.spec_from_file_location(
+    "api_handler",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "test", "api_handler.py"),
+)
+api_handler = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(api_handler)
+
+
+def row(year, month, day, **values):
+    return {"year": year, "month": month, "date": day, **values}
+
+
+def test_split_date_range_by_month_covers_range_inclusively():
+    assert api_handler.split_date_range_by_month("2024-01-15", "2024-03-10") == [
+        ("2024-01-15", "2024-01-31"),
+        ("2024-02-01", "2024-02-29"),
+        ("2024-03-01", "2024-03-10"),
+    ]
+
+
+def test_split_date_range_by_month_single_day_and_year_boundary():
+    assert api_handler.split_date_range_by_month("2024-05-05", "2024-05-05") == [("2024-05-05", "2024-05-05")]
+    assert api_handler.split_date_range_by_month("2023-12-20", "2024-01-02") == [
+        ("2023-12-20", "2023-12-31"),
+        ("2024-01-01", "2024-01-02"),
+    ]
+    assert api_handler.split_date_range_by_month("2024-02-01", "2024-01-01") == []
+
+
+def test_apply_phc_delta_replaces_days_in_window():
+    stored = {
+        "status": "success",
+        "data": [row(2024, 1, 30, v=1), row(2024, 1, 31, v=2), row(2024, 1, 31, v=3), row(2024, 2, 1, v=4)],
+    }
+    fresh = {"data": [row(2024, 2, 2, v=6), row(2024, 1, 31, v=5)]}
+
+    merged = api_handler.apply_phc_delta(stored, fresh, "2024-01-31", "2024-02-02")
+
+    assert merged["status"] == "success"
+    # Ngày 31/1 và 1/2 nằm trong khoảng nên bị thay toàn bộ, kể cả khi dữ liệu mới không có ngày đó
+    assert [r["v"] for r in merged["data"]] == [1, 5, 6]
+
+
+def test_apply_phc_delta_accepts_capitalized_keys():
+    stored = {"data": [{"Year": 2024, "Month": 3, "Date": 1, "v": 1}]}
+    fresh = {"data": [{"Year": 2024, "Month": 2, "Date": 28, "v": 0}]}
+
+    merged = api_handler.apply_phc_delta(stored, fresh, "2024-02-28", "2024-02-28")
+
+    assert [r["v"] for r in merged["data"]] == [0, 1]
+
+
+def test_partition_phc_payload_groups_rows_by_month():
+    payload = {"status": "success", "data": [row(2024, 2, 3), row(2024, 1, 9), row(2024, 2, 1)]}
+
+    partitions = api_handler.partition_phc_payload(payload)
+
+    assert list(partitions) == ["2024-01", "2024-02"]
+    assert partitions["2024-02"]["status"] == "success"
+    assert [r["date"] for r in partitions["2024-02"]["data"]] == [1, 3]
+    assert api_handler.partition_phc_payload(None) == {}
+
+
+def test_changed_phc_partitions_ignores_row_order():
+    stored = {"data": [row(2024, 1, 1, v=1), row(2024, 1, 1, v=2), row(2024, 2, 1, v=3)]}
+    merged = {"data": [row(2024, 1, 1, v=2), row(2024, 1, 1, v=1), row(2024, 3, 1, v=4)]}
+
+    changed, removed = api_handler.changed_phc_partitions(stored, merged)
+
+    assert list(changed) == ["2024-03"]
+    assert removed == ["2024-02"]
+
+
+def test_changed_phc_partitions_detects_value_change():
+    stored = {"data": [row(2024, 1, 1, v=1)]}
+    merged = {"data": [row(2024, 1, 1, v=9)]}
+
+    changed, removed = api_handler.changed_phc_partitions(stored, merged)
+
+    assert list(changed) == ["2024-01"]
+    assert removed == []
+
+
+def test_phc_partition_dir():
+    assert api_handler.phc_partition_dir("vanbanden.json") == "phc/vanbanden"
+
+
+def test_async_primitives_are_created_per_event_loop(monkeypatch):
+    monkeypatch.setattr(api_handler.st, "secrets", {})
+    handler = api_handler.AsyncAPIHandler()
+
+    async def primitives():
+        return handler._async_primitives()
+
+    async def same_loop_twice():
+        return handler._async_primitives(), handler._async_primitives()
+
+    # Tạo handler ngoài event loop vẫn dùng được trong nhiều lần asyncio.run
+    first = asyncio.run(primitives())
+    second = asyncio.run(primitives())
+    assert first[0] is not second[0]
+
+    again, repeated = asyncio.run(same_loop_twice())
+    assert again[0] is repeated[0] and again[1] is repeated[1]
@@ -0,0 +1,85 @@
+import datetime
+
+import pandas as pd
+
+import columnar_json
+
+
+def round_trip(df, **kwargs):
+    return columnar_json.columnar_to_frame(columnar_json.loads_payload(columnar_json.encode_frame(df, **kwargs)))
+
+
+def test_round_trip_basic_columns():
+    df = pd.DataFrame({
+        "Xe": ["51A-001", "51A-002", "51A-001", "51A-001"],
+        "Số chuyến": [1, 2, 3, 4],
+        "Km": [1.5, None, 3.25, 4.0],
+    })
+
+    result = round_trip(df)
+
+    pd.testing.assert_frame_equal(result, df, check_dtype=False)
+    assert result["Số chuyến"].dtype == "int64"
+
+
+def test_gzip_payload_is_detected_on_load():
+    df = pd.DataFrame({"a": [1, 2, 3]})
+    raw = columnar_json.encode_frame(df, metadata={"source": "test"}, compress=True)
+
+    assert raw[:2] == columnar_json.GZIP_MAGIC
+    payload = columnar_json.loads_payload(raw)
+    assert columnar_json.is_columnar(payload)
+    assert payload["metadata"] == {"source": "test"}
+
+
+def test_explicit_dictionary_columns():
+    df = pd.DataFrame({"Xe": ["a", "b", "c"], "Ghi chú": ["x", "x", "x"]})
+
+    payload = columnar_json.frame_to_columnar(df, dictionary_columns=["Xe"])
+
+    dtypes = {entry["name"]: entry["dtype"] for entry in payload["schema"]}
+    assert dtypes == {"Xe": "dictionary", "Ghi chú": "string"}
+    assert round_trip(df, dictionary_columns=["Xe"])["Xe"].tolist() == ["a", "b", "c"]
+
+
+def test_round_trip_date_objects():
+    dates = [datetime.date(2025, 1, 2), None, datetime.date(2025, 3, 4)]
+    df = pd.DataFrame({"Ngày": pd.Series(dates, dtype=object)})
+
+    result = round_trip(df, compress=True)
+
+    assert result["Ngày"].tolist() == dates
+
+
+def test_round_trip_timestamps_in_object_column():
+    stamps = [pd.Timestamp("2025-01-02 03:04:05"), pd.Timestamp("2025-02-03")]
+    df = pd.DataFrame({"Thời gian": pd.Series(stamps, dtype=object)})
+
+    result = round_trip(df)
+
+    assert pd.api.types.is_datetime64_any_dtype(result["Thời gian"])
+    assert result["Thời gian"].tolist() == stamps
+
+
+def test_mixed_date_column_still_serialises():
+    values = [datetime.date(2025, 1, 2), pd.Timestamp("2025-01-03 08:00"), "không rõ"]
+    df = pd.DataFrame({"Ngày": pd.Series(values, dtype=object)})
+
+    result = round_trip(df)
+
+    assert result["Ngày"].tolist() == ["2025-01-02", "2025-01-03T08:00:00", "không rõ"]
+
+
+def test_round_trip_bool_columns():
+    df = pd.DataFrame({
+        "Hoàn thành": [True, False, True],
+        "Có phí": pd.Series([True, None, False], dtype=object),
+    })
+
+    result = round_trip(df)
+
+    assert result["Hoàn thành"].dtype == bool
+    assert result["Hoàn thành"].tolist() == [True, False, True]
+    assert result["Có phí"].dtype == "boolean"
+    assert result["Có phí"].isna().tolist() == [False, True, False]
+    assert result["Có phí"].dropna().tolist() == [True, False]
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("streamlit")
+
+from benchmarks.generators import make_admin_weekly
+from dash_phonghc import PivotTableDashboard
+
+
+def make_dashboard(data):
+    dashboard = PivotTableDashboard()
+    dashboard.data = data
+    return dashboard
+
+
+def naive_filter(data, from_key, to_key, categories):
+    period = pd.to_numeric(data['Năm'], errors='coerce') * 10000 + data['Tháng'] * 100 + data['Tuần']
+    mask = period.between(from_key, to_key) & data['Danh mục'].isin(categories)
+    return data[mask]
+
+
+@pytest.fixture
+def data():
+    contents = {f"Danh mục {c}": [f"Nội dung {c}.{i}" for i in range(2)] for c in range(4)}
+    # Xáo trộn để thứ tự dữ liệu khác thứ tự kỳ (filter_data phải giữ thứ tự gốc)
+    return make_admin_weekly(scale=2, contents_by_category=contents).sample(frac=1, random_state=0).reset_index(drop=True)
+
+
+@pytest.mark.parametrize("period, categories", [
+    ((2024, 1, 1, 2025, 12, 52), ["Danh mục 0", "Danh mục 1", "Danh mục 2", "Danh mục 3"]),
+    ((2024, 3, 10, 2024, 6, 26), ["Danh mục 1", "Danh mục 3"]),
+    ((2025, 2, 5, 2025, 2, 5), ["Danh mục 2"]),
+    ((2024, 1, 1, 2025, 12, 52), ["Danh mục không tồn tại"]),
+    ((2026, 1, 1, 2026, 12, 52), ["Danh mục 0"]),
+])
+def test_filter_data_matches_naive_filter(data, period, categories):
+    dashboard = make_dashboard(data)
+    from_year, from_month, from_week, to_year, to_month, to_week = period
+
+    result = dashboard.filter_data(*period, categories)
+
+    expected = naive_filter(
+        data,
+        from_year * 10000 + from_month * 100 + from_week,
+        to_year * 10000 + to_month * 100 + to_week,
+        categories,
+    )
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_filter_data_without_filtering_returns_original_frame(data):
+    dashboard = make_dashboard(data)
+
+    result = dashboard.filter_data(2024, 1, 1, 2025, 12, 52, sorted(data['Danh mục'].unique()))
+
+    assert result is data
+
+
+def test_rows_missing_period_are_never_selected():
+    data = pd.DataFrame({
+        'Tuần': [1, 2, np.nan],
+        'Tháng': [1, 1, 1],
+        'Năm': [2025, None, 2025],
+        'Danh mục': ['A', 'A', 'A'],
+        'Nội dung': ['x', 'y', 'z'],
+        'Số liệu': [1, 2, 3],
+    })
+    dashboard = make_dashboard(data)
+
+    result = dashboard.filter_data(2025, 1, 1, 2025, 12, 52, ['A'])
+
+    assert result['Nội dung'].tolist() == ['x']
+
+
+def test_filter_index_is_rebuilt_when_data_changes(data):
+    dashboard = make_dashboard(data)
+    dashboard.filter_data(2024, 1, 1, 2025, 12, 52, ["Danh mục 0"])
+
+    dashboard.data = data.iloc[:10].reset_index(drop=True)
+    result = dashboard.filter_data(2024, 1, 1, 2025, 12, 52, ["Danh mục 0"])
+
+    expected = naive_filter(dashboard.data, 20240101, 20251252, ["Danh mục 0"])
+    pd.testing.assert_frame_equal(result, expected)
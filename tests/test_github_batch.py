@@ -0,0 +1,104 @@
+import json
+
+import pytest
+
+pytest.importorskip("requests")
+
+from benchmarks.fake_github import FakeGitHub
+from github_batch import GitHubBatchCommitter, GitHubBatchError, resolve_api_base
+
+
+OWNER, REPO = "owner", "repo"
+
+
+@pytest.fixture
+def fake():
+    with FakeGitHub() as server:
+        yield server
+
+
+@pytest.fixture
+def repo(fake):
+    return fake.add_repo(OWNER, REPO, {"README.md": "hello", "backups/backup_1.json": "{}"})
+
+
+@pytest.fixture
+def committer(fake, repo):
+    return GitHubBatchCommitter("token", OWNER, REPO, api_base=fake.base_url)
+
+
+def read_file(repo, path):
+    return repo.blobs[repo.flatten(repo.head_tree("main"))[path]]
+
+
+def test_resolve_api_base_prefers_argument_then_env(monkeypatch):
+    monkeypatch.setenv("GITHUB_API_BASE", "http://env.local/")
+    assert resolve_api_base("http://arg.local/") == "http://arg.local"
+    assert resolve_api_base() == "http://env.local"
+    monkeypatch.delenv("GITHUB_API_BASE")
+    assert resolve_api_base() == "https://api.github.com"
+
+
+def test_commit_files_writes_all_files_in_one_commit(committer, repo):
+    head_before = repo.refs["main"]
+
+    commit_sha = committer.commit_files({"data/a.json": {"x": 1}, "b.txt": "b"}, "Update")
+
+    assert repo.refs["main"] == commit_sha
+    assert repo.commits[commit_sha]["parents"] == [head_before]
+    assert json.loads(read_file(repo, "data/a.json")) == {"x": 1}
+    assert read_file(repo, "b.txt") == b"b"
+    assert read_file(repo, "README.md") == b"hello"
+
+
+def test_copies_and_deletions(committer, repo):
+    sha = committer.get_blob_sha("README.md")
+
+    committer.commit_files({}, "Move", copies={"docs/README.md": sha}, deletions=["README.md"])
+
+    files = repo.flatten(repo.head_tree("main"))
+    assert "README.md" not in files
+    assert files["docs/README.md"] == sha
+
+
+def test_list_tree_and_get_blob_sha(committer):
+    assert set(committer.list_tree()) == {"README.md", "backups"}
+    assert set(committer.list_tree("backups")) == {"backup_1.json"}
+    assert committer.list_tree("missing/dir") == {}
+    assert committer.get_blob_sha("backups/backup_1.json") is not None
+    assert committer.get_blob_sha("backups/missing.json") is None
+
+
+def test_commit_retries_when_branch_moves(committer, repo, monkeypatch):
+    original_get_head = committer.get_head
+    calls = []
+
+    def racing_get_head():
+        head = original_get_head()
+        if not calls:
+            # Một commit khác vào branch giữa lúc đọc head và cập nhật ref
+            repo.commit_paths("main", {"other.txt": repo.write_blob(b"other")}, "Concurrent")
+        calls.append(head)
+        return head
+
+    monkeypatch.setattr(committer, "get_head", racing_get_head)
+
+    committer.commit_files({"mine.txt": "mine"}, "Mine")
+
+    assert len(calls) == 2
+    files = repo.flatten(repo.head_tree("main"))
+    assert {"other.txt", "mine.txt"} <= set(files)
+
+
+def test_commit_gives_up_after_max_retries(committer, repo, monkeypatch):
+    original_get_head = committer.get_head
+
+    def always_stale_head():
+        head = original_get_head()
+        repo.commit_paths("main", {"other.txt": repo.write_blob(b"x")}, "Concurrent")
+        return head
+
+    monkeypatch.setattr(committer, "get_head", always_stale_head)
+
+    with pytest.raises(GitHubBatchError):
+        committer.commit_files({"mine.txt": "mine"}, "Mine", max_retries=2)